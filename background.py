@@ -0,0 +1,91 @@
+import numpy as np
+import pyxel
+
+
+class ScrollingBackground:
+    """
+    プレイヤーの位置に合わせてスクロールする点の格子の背景。
+
+    格子は 256 ピクセル周期で繰り返すので、1周期分をイメージバンクに一度だけ描いておき、
+    毎フレームはスクロール量に合わせて最大4回の blt で画面に貼り付ける。
+    間隔や色を変えたときだけイメージバンクを描き直す。
+
+    以前の「格子点ごとに (x - player_x) % 256 を pset する」描画と同じピクセルになるように、
+    各軸の点の位置は pyxel と同じ丸め（float32 にしてから 0.5 を 0 から遠い方へ）で求める。
+    丸めの誤差で間隔が揃わないときだけ、点を1つずつ pset で描く。
+    """
+    size = 256
+
+    def __init__(self, spacing=16, color=3, image=2):
+        self.image = image
+        self.spacing = None
+        self.color = None
+        self.set_pattern(spacing, color)
+
+    def set_pattern(self, spacing, color):
+        """
+        格子の間隔と色を設定する。変わったときだけイメージバンクを描き直す。
+        """
+        if spacing == self.spacing and color == self.color:
+            return
+        self.spacing = spacing
+        self.color = color
+        size = self.size
+        # 格子点の座標と、それをイメージ上の位置（256 で割った余り）にしたもの
+        self.lattice = np.arange(-size, size, spacing, dtype=np.float64)
+        self.lattice_mod = self.lattice.astype(np.int64) % size
+        image = pyxel.images[self.image]
+        image.cls(0)
+        for x in self.lattice_mod.tolist():
+            for y in self.lattice_mod.tolist():
+                image.pset(x, y, color)
+
+    def pixels(self, scroll):
+        """
+        1軸分の格子点が画面上で描かれるピクセル位置を返す（256 は画面外）
+        """
+        v = ((self.lattice - scroll) % self.size).astype(np.float32)
+        p = np.floor(v)
+        return (p + (v - p >= 0.5)).astype(np.int64)
+
+    def segments(self, scroll):
+        """
+        1軸分の貼り付け方を (画面上の位置, イメージ上の位置, 長さ) のリストで返す。
+        点の間隔が揃わないときは None。
+        """
+        size = self.size
+        p = self.pixels(scroll)
+        shifts = (p - self.lattice_mod) % size
+        shift = int(shifts[0])
+        if (shifts != shift).any():
+            return None
+        result = []
+        if shift < size:
+            result.append([shift, 0, size - shift])
+        if shift > 0:
+            result.append([0, size - shift, shift])
+        # 256 に丸められて画面外になった点は、画面の端（位置 0）には描かない
+        if (p == size).any() and not (p == 0).any():
+            for segment in result:
+                if segment[0] == 0:
+                    segment[0] += 1
+                    segment[1] += 1
+                    segment[2] -= 1
+        return [segment for segment in result if segment[2] > 0]
+
+    def draw(self, scroll_x, scroll_y):
+        """
+        (scroll_x, scroll_y) を画面の左上にしたときの背景を描く
+        """
+        columns = self.segments(scroll_x)
+        rows = self.segments(scroll_y)
+        if columns is None or rows is None:
+            xs = np.unique(self.pixels(scroll_x)).tolist()
+            ys = np.unique(self.pixels(scroll_y)).tolist()
+            for x in xs:
+                for y in ys:
+                    pyxel.pset(x, y, self.color)
+            return
+        for dst_y, src_y, height in rows:
+            for dst_x, src_x, width in columns:
+                pyxel.blt(dst_x, dst_y, self.image, src_x, src_y, width, height)
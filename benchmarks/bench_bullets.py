@@ -0,0 +1,79 @@
+"""
+弾幕のベンチマーク。
+青の敵を画面の周りに shooters 体置き、発射器（emitters.py）ごとに弾幕を撃たせ続けて、
+生存中の弾の数と、1ティックの更新時間・弾の区間（移動・画面外の削除・衝突判定）の時間を測る。
+敵は動かさず、プレイヤーは無敵にして弾を受け続ける。
+
+    python -m benchmarks.bench_bullets [--shooters 40] [--ticks 600]
+"""
+import argparse
+import math
+import time
+
+from benchmarks.bench_scenarios import percentile
+from benchmarks.scenarios import OrbitInput
+from emitters import Radial, Spiral, Spread
+from engine import Engine
+from profiler import FrameProfiler
+
+EMITTERS = {
+    'aimed': None,
+    'spread5': Spread(count=5, arc=math.pi / 3, speed=2),
+    'radial16': Radial(count=16, speed=1.5),
+    'spiral8': Spiral(arms=8, speed=1.5, step=0.2),
+    'radial64': Radial(count=64, speed=1),
+}
+
+
+def run(emitter, shooters, ticks, seed):
+    game = Engine(seed=seed, input_source=OrbitInput())
+    game.max_hp = game.player_hp = 10**9
+    game.next_skill_threshold = float('inf')
+    game.spawn_interval = game.green_ring_interval = game.cyan_wave_interval = 10**9
+    game.blue_emitter = emitter
+    game.enemy_speed = 0
+    game.profiler = FrameProfiler(capacity=ticks, enabled=True)
+    update_ms = []
+    peak = 0
+    for tick in range(ticks):
+        # 倒された青を補充して、常に shooters 体が撃つようにする
+        for k in range(shooters - len(game.enemies)):
+            angle = 2 * math.pi * k / shooters
+            game.enemies.spawn(game.player_x + math.cos(angle) * 110,
+                               game.player_y + math.sin(angle) * 110, 'blue')
+        start = time.perf_counter()
+        game.update()
+        update_ms.append((time.perf_counter() - start) * 1000)
+        peak = max(peak, len(game.enemy_bullets))
+    profiler = game.profiler
+    sections = profiler.times[:profiler.frames]
+    bullets_ms = sections[:, profiler.section_index['enemy_bullets']] + \
+        sections[:, profiler.section_index['bullets']]
+    return {
+        'peak_bullets': peak,
+        'update_p50_ms': percentile(update_ms, 0.5),
+        'update_p99_ms': percentile(update_ms, 0.99),
+        'bullets_p50_ms': percentile(bullets_ms.tolist(), 0.5),
+        'bullets_p99_ms': percentile(bullets_ms.tolist(), 0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="弾幕のベンチマーク")
+    parser.add_argument('--emitter', action='append', choices=list(EMITTERS),
+                        help="実行する発射器（複数指定可）")
+    parser.add_argument('--shooters', type=int, default=40, help="撃つ青の敵の数")
+    parser.add_argument('--ticks', type=int, default=600)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'emitter':<10} {'bullets':>7} {'upd p50':>8} {'upd p99':>8} {'blt p50':>8} {'blt p99':>8}")
+    for name in args.emitter or list(EMITTERS):
+        result = run(EMITTERS[name], args.shooters, args.ticks, args.seed)
+        print(f"{name:<10} {result['peak_bullets']:>7} {result['update_p50_ms']:>8.3f} "
+              f"{result['update_p99_ms']:>8.3f} {result['bullets_p50_ms']:>8.3f} "
+              f"{result['bullets_p99_ms']:>8.3f}")
+
+
+if __name__ == '__main__':
+    main()
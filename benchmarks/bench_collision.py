@@ -0,0 +1,99 @@
+"""
+弾 vs 敵の衝突判定ベンチマーク。
+総当たりと空間ハッシュ（SpatialHash）の1フレームあたりのコストを敵の数ごとに比較し、
+空間ハッシュの方が速くなる敵数（クロスオーバー点）を表示する。grid は常にグリッドを使った場合、
+auto は SpatialHash の既定（linear_query_below 以下の数では全件を線形に走査する）の場合。
+
+    python -m benchmarks.bench_collision [--bullets 10] [--repeat 200]
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+
+from spatial import SpatialHash
+
+ENEMY_SIZE = 8
+PLAYER_SIZE = 8
+# 画面（256x256）＋ 敵が消えるまでのマージン 180px
+WORLD_HALF = 128 + 180
+
+
+def make_scene(num_enemies, num_bullets, seed):
+    rng = np.random.default_rng(seed)
+    ex = rng.uniform(-WORLD_HALF, WORLD_HALF, num_enemies)
+    ey = rng.uniform(-WORLD_HALF, WORLD_HALF, num_enemies)
+    bullets = rng.uniform(-128, 128, (num_bullets, 2)).tolist()
+    return ex, ey, bullets
+
+
+def brute_force(ex, ey, bullets):
+    hits = []
+    for bx, by in bullets:
+        hit = np.flatnonzero(np.hypot(bx - ex, by - ey) < ENEMY_SIZE)
+        hits.append(int(hit[0]) if hit.size else None)
+    hit = np.flatnonzero(np.hypot(ex, ey) < PLAYER_SIZE)
+    contact = int(hit[0]) if hit.size else None
+    return hits, contact
+
+
+def with_grid(grid, ex, ey, bullets):
+    grid.rebuild(ex, ey)
+    hits = []
+    for bx, by in bullets:
+        for i in grid.query(bx, by, ENEMY_SIZE).tolist():
+            if math.hypot(bx - ex[i], by - ey[i]) < ENEMY_SIZE:
+                hits.append(i)
+                break
+        else:
+            hits.append(None)
+    contact = None
+    for i in grid.query(0, 0, PLAYER_SIZE).tolist():
+        if math.hypot(ex[i], ey[i]) < PLAYER_SIZE:
+            contact = i
+            break
+    return hits, contact
+
+
+def measure(func, repeat, *args):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(*args)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--bullets', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    grid = SpatialHash(ENEMY_SIZE)
+    grid.linear_query_below = 0
+    auto = SpatialHash(ENEMY_SIZE)
+    crossover = None
+    print(f"{'enemies':>8} {'brute(us)':>10} {'grid(us)':>10} {'speedup':>8} {'auto(us)':>10} {'speedup':>8}")
+    for num_enemies in (10, 25, 50, 100, 200, 400, 800, 1600, 3200, 6400, 12800):
+        ex, ey, bullets = make_scene(num_enemies, args.bullets, args.seed)
+        # 結果が総当たりと一致することを確認してから計測する
+        expected = brute_force(ex, ey, bullets)
+        if expected != with_grid(grid, ex, ey, bullets) or expected != with_grid(auto, ex, ey, bullets):
+            raise SystemExit(f"collision mismatch at {num_enemies} enemies")
+        brute_us = measure(brute_force, args.repeat, ex, ey, bullets)
+        grid_us = measure(with_grid, args.repeat, grid, ex, ey, bullets)
+        auto_us = measure(with_grid, args.repeat, auto, ex, ey, bullets)
+        if crossover is None and grid_us < brute_us:
+            crossover = num_enemies
+        print(f"{num_enemies:>8} {brute_us:>10.1f} {grid_us:>10.1f} {brute_us / grid_us:>7.2f}x "
+              f"{auto_us:>10.1f} {brute_us / auto_us:>7.2f}x")
+
+    if crossover is None:
+        print("crossover: grid was never faster")
+    else:
+        print(f"crossover: grid is faster from {crossover} enemies ({args.bullets} bullets)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+描画だけのベンチマーク。
+敵・弾・経験値トークンを合わせて 1000 体以上、画面外のマージン（180px）まで含めてばらまき、
+App.draw_entities（画面外を除いてアトラスから blt）と、以前の1体ごとの rect / circ による描画を比べる。
+重なったときの描画順だけが違うので、違ったピクセルの数も表示する。
+
+    python -m benchmarks.bench_draw [--sizes 250,1000,4000] [--repeat 50]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# 画面（256x256）＋ 敵が消えるまでのマージン 180px
+WORLD_HALF = 128 + 180
+
+
+def create_app():
+    if sys.platform.startswith('linux') and not (os.environ.get('DISPLAY') or
+                                                 os.environ.get('WAYLAND_DISPLAY')):
+        os.environ.setdefault('SDL_VIDEODRIVER', 'offscreen')
+        os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    from main import App
+    return App()
+
+
+def populate(game, total, seed):
+    """
+    敵 60%・弾 25%・トークン 15% の割合で total 体を置き、衛星を8基つける
+    """
+    rng = np.random.default_rng(seed)
+    game.reset_game()
+    for x, y, type_name in zip(*rng.uniform(-WORLD_HALF, WORLD_HALF, (2, int(total * 0.6))).tolist(),
+                               rng.choice(['red', 'blue', 'green', 'cyan'], int(total * 0.6)).tolist()):
+        game.enemies.spawn(x, y, type_name)
+    for x, y, from_enemy in zip(*rng.uniform(-WORLD_HALF, WORLD_HALF, (2, int(total * 0.25))).tolist(),
+                                (rng.random(int(total * 0.25)) < 0.5).tolist()):
+        (game.enemy_bullets if from_enemy else game.player_bullets).spawn(x, y, 0.0, 0.0)
+    for x, y in zip(*rng.uniform(-WORLD_HALF, WORLD_HALF, (2, int(total * 0.15))).tolist()):
+        game.exp_tokens.spawn(x, y)
+    for _ in range(8):
+        game.grant_skill('satellites')
+
+
+def draw_reference(game):
+    """
+    以前の描画：全エンティティを1体ずつ pyxel.rect / pyxel.circ で描く
+    """
+    import pyxel
+
+    from entities import ENEMY_COLORS
+
+    n = game.enemies.count
+    half = game.enemy_size // 2
+    xs = (game.enemies.x[:n] - game.player_x + 128 - half).tolist()
+    ys = (game.enemies.y[:n] - game.player_y + 128 - half).tolist()
+    for ex, ey, type_id in zip(xs, ys, game.enemies.type_id[:n].tolist()):
+        pyxel.rect(ex, ey, game.enemy_size, game.enemy_size, ENEMY_COLORS[type_id])
+
+    half = game.bullet_size // 2
+    for bullets, color in ((game.player_bullets, 8), (game.enemy_bullets, 12)):
+        n = bullets.count
+        xs = (bullets.x[:n] - game.player_x + 128 - half).tolist()
+        ys = (bullets.y[:n] - game.player_y + 128 - half).tolist()
+        for bx, by in zip(xs, ys):
+            pyxel.rect(bx, by, game.bullet_size, game.bullet_size, color)
+
+    n = game.exp_tokens.count
+    xs = (game.exp_tokens.x[:n] - game.player_x + 128).tolist()
+    ys = (game.exp_tokens.y[:n] - game.player_y + 128).tolist()
+    for tx, ty in zip(xs, ys):
+        pyxel.circ(tx, ty, game.exp_token_size, 10)
+
+    satellites = game.satellites
+    n = satellites.count
+    for sx, sy, size, color in zip(satellites.x[:n].tolist(), satellites.y[:n].tolist(),
+                                   satellites.size[:n].tolist(), satellites.color[:n].tolist()):
+        pyxel.circ(sx - game.player_x + 128, sy - game.player_y + 128, size, color)
+
+
+def time_draw(draw, repeat):
+    import pyxel
+    samples = []
+    for _ in range(repeat):
+        pyxel.cls(0)
+        start = time.perf_counter()
+        draw()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2], bytes(pyxel.screen.data_ptr())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="描画だけのベンチマーク")
+    parser.add_argument('--sizes', default='250,1000,2000,4000',
+                        help="エンティティの総数（カンマ区切り）")
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    app = create_app()
+    game = app.game
+    print(f"{'entities':>8} {'on screen':>9} {'per-entity ms':>14} {'atlas ms':>9} {'speedup':>8} {'diff px':>8}")
+    for total in [int(v) for v in args.sizes.split(',')]:
+        populate(game, total, args.seed)
+        on_screen = sum(
+            int(np.count_nonzero((np.abs(store.x[:store.count] - game.player_x) < 132) &
+                                 (np.abs(store.y[:store.count] - game.player_y) < 132)))
+            for store in (game.enemies, game.player_bullets, game.enemy_bullets, game.exp_tokens))
+        reference_ms, reference_pixels = time_draw(lambda: draw_reference(game), args.repeat)
+        atlas_ms, atlas_pixels = time_draw(app.draw_entities, args.repeat)
+        diff = sum(a != b for a, b in zip(reference_pixels, atlas_pixels))
+        print(f"{total:>8} {on_screen:>9} {reference_ms:>14.3f} {atlas_ms:>9.3f} "
+              f"{reference_ms / atlas_ms:>7.1f}x {diff:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+流れ場（flowfield.py）のベンチマーク。
+同じ seed のシナリオを、敵がそれぞれプレイヤーへの向きを計算する Engine（flow_field = None）と
+流れ場から向きを引く Engine で並べて動かし、敵の区間の時間（p50/p99）と精度を比べる。
+精度の指標は bench_lod と同じ（画面内の同じ敵の位置のずれ、スコア、受けたダメージ）。
+
+あわせて、地形（格子状に並べた柱）があるときに距離場を作り直す時間と、
+1ティックあたりの作り直しの回数（プレイヤーがセルをまたいだ割合）を表示する。
+
+    python -m benchmarks.bench_flowfield [--scenario late_game] [--cell 16]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks import scenarios
+from benchmarks.bench_lod import DEFAULT_SCENARIOS, on_screen_error, record_spawns
+from benchmarks.bench_scenarios import percentile
+from flowfield import FlowField
+from profiler import FrameProfiler
+
+
+def pillars(cell_x, cell_y):
+    """
+    8セルごとに 2x2 セルの柱を置いた地形
+    """
+    return (cell_x % 8 < 2) & (cell_y % 8 < 2)
+
+
+def run(scenario, seed, ticks, cell_size):
+    direct = scenario.create(seed)
+    direct.flow_field = None
+    field = scenario.create(seed)
+    field.flow_field = FlowField(cell_size=cell_size, half_cells=round(320 / cell_size))
+    direct_handles = record_spawns(direct)
+    field_handles = record_spawns(field)
+    for game in (direct, field):
+        game.profiler = FrameProfiler(capacity=ticks, enabled=True)
+
+    errors = []
+    max_error = 0.0
+    for tick in range(ticks):
+        for game in (direct, field):
+            if scenario.on_tick:
+                scenario.on_tick(game, tick)
+            game.update()
+        error = on_screen_error(direct, direct_handles, field, field_handles)
+        if len(error):
+            errors.append(float(error.mean()))
+            max_error = max(max_error, float(error.max()))
+
+    def section(game):
+        profiler = game.profiler
+        return profiler.times[:profiler.frames, profiler.section_index['enemies']].tolist()
+
+    return {
+        'direct_p50_ms': percentile(section(direct), 0.5),
+        'direct_p99_ms': percentile(section(direct), 0.99),
+        'field_p50_ms': percentile(section(field), 0.5),
+        'field_p99_ms': percentile(section(field), 0.99),
+        'rebuilds_per_tick': field.flow_field.rebuilds / ticks,
+        'mean_error_px': float(np.mean(errors)) if errors else 0.0,
+        'max_error_px': max_error,
+        'direct_score': direct.score,
+        'field_score': field.score,
+        'direct_damage': direct.max_hp - direct.player_hp,
+        'field_damage': field.max_hp - field.player_hp,
+    }
+
+
+def terrain_rebuild_ms(cell_size, repeat=20):
+    """
+    柱の地形で距離場を作り直す時間（中央値）[ms]
+    """
+    field = FlowField(cell_size=cell_size, half_cells=round(320 / cell_size))
+    field.blocked = pillars
+    samples = []
+    for k in range(repeat):
+        start = time.perf_counter()
+        field.rebuild(k, 3 * k)
+        samples.append((time.perf_counter() - start) * 1000)
+    return percentile(samples, 0.5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="流れ場の精度とコストのベンチマーク")
+    parser.add_argument('--scenario', action='append',
+                        help="実行するシナリオ名（複数指定可。省略時は敵の多いシナリオ）")
+    parser.add_argument('--ticks', type=int, help="ティック数（省略時はシナリオの既定値）")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--cell', type=int, default=16, help="流れ場のセルの大きさ [px]")
+    args = parser.parse_args()
+
+    print(f"{'scenario':<22} {'dir p50':>8} {'dir p99':>8} {'ff p50':>8} {'ff p99':>8} {'rebuild':>7} "
+          f"{'err px':>7} {'max px':>7} {'score':>11} {'damage':>9}")
+    for name in args.scenario or DEFAULT_SCENARIOS:
+        scenario = scenarios.get(name)
+        result = run(scenario, args.seed, args.ticks or scenario.ticks, args.cell)
+        print(f"{name:<22} {result['direct_p50_ms']:>8.3f} {result['direct_p99_ms']:>8.3f} "
+              f"{result['field_p50_ms']:>8.3f} {result['field_p99_ms']:>8.3f} "
+              f"{result['rebuilds_per_tick']:>7.2f} "
+              f"{result['mean_error_px']:>7.2f} {result['max_error_px']:>7.2f} "
+              f"{result['direct_score']:>5}/{result['field_score']:<5} "
+              f"{result['direct_damage']:>4}/{result['field_damage']:<4}")
+    print(f"\nterrain (pillars) rebuild: {terrain_rebuild_ms(args.cell):.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
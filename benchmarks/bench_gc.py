@@ -0,0 +1,62 @@
+"""
+GC の管理（memory.py の MemoryMode）のベンチマーク。
+各シナリオを、GC を自動のままにした場合と、止めてゲームが止まっている間にだけ回収する場合で実行し、
+1ティックあたりに増えた GC 対象のオブジェクト数・メモリブロック数（正味）、ゲーム中に起きた GC の回数と
+最長の停止時間、更新時間の p99 を比べる。
+pause_every ティックごとに1ティックだけ「ゲームが止まっている」ことにして、スキル選択画面の代わりにする。
+
+    python -m benchmarks.bench_gc [--scenario late_game] [--pause-every 1800]
+"""
+import argparse
+import gc
+import time
+
+from benchmarks import scenarios
+from benchmarks.bench_scenarios import percentile
+from memory import MemoryMode
+
+
+def run(scenario, seed, ticks, enabled, pause_every):
+    game = scenario.create(seed)
+    memory = MemoryMode(enabled=enabled, capacity=ticks)
+    memory.start(game)
+    update_ms = []
+    try:
+        for tick in range(ticks):
+            if scenario.on_tick:
+                scenario.on_tick(game, tick)
+            start = time.perf_counter()
+            game.update()
+            memory.tick(pause_every > 0 and tick % pause_every == pause_every - 1)
+            update_ms.append((time.perf_counter() - start) * 1000)
+    finally:
+        memory.stop()
+    result = memory.report()
+    result['update_p99_ms'] = percentile(update_ms, 0.99)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GC の管理のベンチマーク")
+    parser.add_argument('--scenario', action='append', help="実行するシナリオ名（複数指定可）")
+    parser.add_argument('--ticks', type=int, help="ティック数（省略時はシナリオの既定値）")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--pause-every', type=int, default=600,
+                        help="この間隔でゲームが止まったことにする（0 なら止めない）")
+    args = parser.parse_args()
+
+    print(f"{'scenario':<22} {'gc':<6} {'obj/tick':>8} {'obj max':>7} {'blk/tick':>8} {'in play':>7} "
+          f"{'play ms':>8} {'total':>5} {'max ms':>7} {'upd p99':>8}")
+    for name in args.scenario or [scenario.name for scenario in scenarios.SCENARIOS]:
+        scenario = scenarios.get(name)
+        for enabled in (False, True):
+            gc.collect()
+            result = run(scenario, args.seed, args.ticks or scenario.ticks, enabled, args.pause_every)
+            print(f"{name:<22} {'manual' if enabled else 'auto':<6} {result['objects_per_tick']:>8.2f} "
+                  f"{result['objects_max']:>7} {result['blocks_per_tick']:>8.2f} "
+                  f"{result['collections_in_play']:>7} {result['gc_max_in_play_ms']:>8.3f} "
+                  f"{result['collections']:>5} {result['gc_max_ms']:>7.3f} {result['update_p99_ms']:>8.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""
+敵の更新の詳細度（LOD）の精度とコストのベンチマーク。
+同じ seed のシナリオを、全員を毎ティック進める Engine と LOD を有効にした Engine で並べて動かし、
+1ティックあたりの更新時間（p50/p99）と、精度の指標を比べる。
+
+精度の指標：
+- 画面内の誤差：全員を毎ティック進めた側で画面内にいる敵のうち、LOD 側にも同じ敵
+  （同じ順番に湧いた敵）が生きているものについての位置のずれ [px]（全ティックの平均と最大）
+- スコアとプレイヤーが受けたダメージ（シナリオでは死なないように HP を大きくしている）
+
+    python -m benchmarks.bench_lod [--scenario late_game] [--bands 200:2,300:4] [--budget 400]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks import scenarios
+from benchmarks.bench_scenarios import percentile
+
+DEFAULT_SCENARIOS = ('spawn_min_interval', 'cyan_wave_stack', 'green_ring_surround', 'ring_flood', 'late_game')
+
+
+def parse_bands(text):
+    """
+    "200:2,300:4" を ((200, 2), (300, 4)) にする（空文字列なら LOD なし）
+    """
+    if not text:
+        return ()
+    return tuple((float(distance), int(period))
+                 for distance, period in (band.split(':') for band in text.split(',')))
+
+
+def record_spawns(game):
+    """
+    game で湧いた敵の世代付きハンドルを湧いた順に記録するリストを返す。
+    どちらの Engine でも同じ順に湧くので、リストの同じ位置が同じ敵になる。
+    """
+    enemies = game.enemies
+    spawn = enemies.spawn
+    handles = []
+
+    def recording_spawn(*args, **kwargs):
+        i = spawn(*args, **kwargs)
+        handles.append(enemies.handle(i))
+        return i
+
+    enemies.spawn = recording_spawn
+    return handles
+
+
+def resolve_all(enemies, handles):
+    """
+    ハンドルの配列を添字の配列にする（削除済みは -1）
+    """
+    entity_ids = handles & 0xFFFFFFFF
+    i = enemies.where[entity_ids]
+    valid = ((enemies.generation[entity_ids] == handles >> 32) &
+             (i < enemies.count) & enemies.alive[i] & (enemies.ids[i] == entity_ids))
+    return np.where(valid, i, -1)
+
+
+def on_screen_error(full, full_handles, lod, lod_handles):
+    """
+    full で画面内にいる敵のうち lod にも生きている敵について、位置のずれの配列を返す
+    """
+    count = min(len(full_handles), len(lod_handles))
+    i = resolve_all(full.enemies, np.array(full_handles[:count], dtype=np.int64))
+    j = resolve_all(lod.enemies, np.array(lod_handles[:count], dtype=np.int64))
+    both = (i >= 0) & (j >= 0)
+    i = i[both]
+    j = j[both]
+    x = full.enemies.x[i]
+    y = full.enemies.y[i]
+    visible = (np.abs(x - full.player_x) < 128) & (np.abs(y - full.player_y) < 128)
+    return np.hypot(x[visible] - lod.enemies.x[j[visible]], y[visible] - lod.enemies.y[j[visible]])
+
+
+def run(scenario, seed, ticks, bands, budget):
+    full = scenario.create(seed)
+    full.enemy_lod_bands = ()
+    full.enemy_lod_budget = None
+    lod = scenario.create(seed)
+    lod.enemy_lod_bands = bands
+    lod.enemy_lod_budget = budget
+    full_handles = record_spawns(full)
+    lod_handles = record_spawns(lod)
+
+    full_ms = []
+    lod_ms = []
+    errors = []
+    max_error = 0.0
+    for tick in range(ticks):
+        for game, samples in ((full, full_ms), (lod, lod_ms)):
+            if scenario.on_tick:
+                scenario.on_tick(game, tick)
+            start = time.perf_counter()
+            game.update()
+            samples.append((time.perf_counter() - start) * 1000)
+        error = on_screen_error(full, full_handles, lod, lod_handles)
+        if len(error):
+            errors.append(float(error.mean()))
+            max_error = max(max_error, float(error.max()))
+    return {
+        'full_p50_ms': percentile(full_ms, 0.5),
+        'full_p99_ms': percentile(full_ms, 0.99),
+        'lod_p50_ms': percentile(lod_ms, 0.5),
+        'lod_p99_ms': percentile(lod_ms, 0.99),
+        'mean_error_px': float(np.mean(errors)) if errors else 0.0,
+        'max_error_px': max_error,
+        'full_score': full.score,
+        'lod_score': lod.score,
+        'full_damage': full.max_hp - full.player_hp,
+        'lod_damage': lod.max_hp - lod.player_hp,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="敵の更新 LOD の精度とコストのベンチマーク")
+    parser.add_argument('--scenario', action='append',
+                        help="実行するシナリオ名（複数指定可。省略時は敵の多いシナリオ）")
+    parser.add_argument('--ticks', type=int, help="ティック数（省略時はシナリオの既定値）")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--bands', default='200:2,300:4', help="距離:周期 をカンマ区切りで")
+    parser.add_argument('--budget', type=int, default=400,
+                        help="1ティックに進める敵の数の上限（0 なら無制限）")
+    args = parser.parse_args()
+
+    bands = parse_bands(args.bands)
+    budget = args.budget or None
+    print(f"{'scenario':<22} {'full p50':>8} {'full p99':>8} {'lod p50':>8} {'lod p99':>8} "
+          f"{'err px':>7} {'max px':>7} {'score':>11} {'damage':>9}")
+    for name in args.scenario or DEFAULT_SCENARIOS:
+        scenario = scenarios.get(name)
+        result = run(scenario, args.seed, args.ticks or scenario.ticks, bands, budget)
+        print(f"{name:<22} {result['full_p50_ms']:>8.3f} {result['full_p99_ms']:>8.3f} "
+              f"{result['lod_p50_ms']:>8.3f} {result['lod_p99_ms']:>8.3f} "
+              f"{result['mean_error_px']:>7.2f} {result['max_error_px']:>7.2f} "
+              f"{result['full_score']:>5}/{result['lod_score']:<5} "
+              f"{result['full_damage']:>4}/{result['lod_damage']:<4}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+最近傍の敵の検索ベンチマーク。
+自動照準・誘導弾で使う「点に最も近い敵」を、全件の線形走査（EnemyStore.nearest）と
+空間ハッシュの範囲拡大探索（SpatialHash.nearest）で比較し、結果が一致することも確認する。
+空間ハッシュは衝突判定のために毎フレーム作り直しているので、検索だけの時間を測る。
+
+    python -m benchmarks.bench_nearest [--queries 20] [--repeat 50]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from entities import EnemyStore
+from spatial import SpatialHash
+
+ENEMY_SIZE = 8
+# 画面（256x256）＋ 敵が消えるまでのマージン 180px
+WORLD_HALF = 128 + 180
+
+
+def make_scene(num_enemies, num_queries, seed):
+    rng = np.random.default_rng(seed)
+    enemies = EnemyStore()
+    for x, y in rng.uniform(-WORLD_HALF, WORLD_HALF, (num_enemies, 2)).tolist():
+        enemies.spawn(x, y, 'red')
+    # 問い合わせ点はプレイヤー（原点）と画面内の弾の位置
+    points = [(0.0, 0.0)] + rng.uniform(-128, 128, (num_queries - 1, 2)).tolist()
+    return enemies, points
+
+
+def linear(enemies, points):
+    return [enemies.nearest(x, y) for x, y in points]
+
+
+def with_grid(grid, points):
+    return [grid.nearest(x, y) for x, y in points]
+
+
+def measure(func, repeat, *args):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(*args)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--queries', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    grid = SpatialHash(ENEMY_SIZE)
+    print(f"{'enemies':>8} {'linear(us)':>11} {'grid(us)':>10} {'speedup':>8}")
+    for num_enemies in (10, 100, 400, 1600, 3200, 6400, 12800):
+        enemies, points = make_scene(num_enemies, args.queries, args.seed)
+        grid.rebuild(enemies.x[:enemies.count], enemies.y[:enemies.count])
+        if linear(enemies, points) != with_grid(grid, points):
+            raise SystemExit(f"nearest mismatch at {num_enemies} enemies")
+        linear_us = measure(linear, args.repeat, enemies, points)
+        grid_us = measure(with_grid, args.repeat, grid, points)
+        print(f"{num_enemies:>8} {linear_us:>11.1f} {grid_us:>10.1f} {linear_us / grid_us:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
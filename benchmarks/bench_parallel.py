@@ -0,0 +1,105 @@
+"""
+セクターに分けた並列の更新（sectors.py の SectorPool）のベンチマーク。
+敵を 2000 / 5000 / 10000 体に保ち（倒された分と画面外に消えた分は毎ティック補充する）、プレイヤーの弾も
+bullets 発に保った場面を、1スレッドの Engine と、スレッド数を変えた SectorPool 付きの Engine で動かす。
+敵の区間と弾の区間の時間（p50）と1スレッドに対する速度比、1ティックの更新時間を表示する。
+どのスレッド数でも、毎ティックのチェックサムが1スレッドの場合と一致するかも確かめる。
+
+速度比は CPU のコア数までしか伸びないので、表の先頭にコア数を表示する。
+
+    python -m benchmarks.bench_parallel [--enemies 10000] [--workers 4] [--ticks 300]
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from benchmarks.bench_scenarios import percentile
+from benchmarks.scenarios import OrbitInput
+from engine import Engine
+from entities import ENEMY_TYPES
+from profiler import FrameProfiler
+from sectors import SectorPool
+
+# 敵を置く範囲（プレイヤーからの距離、画面外に消えない範囲の内側）
+SPAWN_HALF = 300
+
+
+def refill(game, rng, enemies, bullets):
+    """
+    敵を enemies 体、プレイヤーの弾を bullets 発になるまで、プレイヤーの周りに乱数で補充する
+    """
+    k = enemies - len(game.enemies)
+    if k > 0:
+        xs = game.player_x + rng.uniform(-SPAWN_HALF, SPAWN_HALF, k)
+        ys = game.player_y + rng.uniform(-SPAWN_HALF, SPAWN_HALF, k)
+        for x, y, type_id in zip(xs.tolist(), ys.tolist(), rng.integers(0, 3, k).tolist()):
+            game.enemies.spawn(x, y, ENEMY_TYPES[type_id])
+    k = bullets - len(game.player_bullets)
+    if k > 0:
+        angle = rng.uniform(0, 2 * np.pi, k)
+        game.player_bullets.spawn_many(game.player_x + rng.uniform(-128, 128, k),
+                                       game.player_y + rng.uniform(-128, 128, k),
+                                       np.cos(angle) * game.player_bullet_speed,
+                                       np.sin(angle) * game.player_bullet_speed)
+
+
+def run(enemies, bullets, ticks, seed, pool):
+    game = Engine(seed=seed, input_source=OrbitInput())
+    game.max_hp = game.player_hp = 10**9
+    game.next_skill_threshold = float('inf')
+    game.spawn_interval = game.green_ring_interval = game.cyan_wave_interval = 10**9
+    game.sector_pool = pool
+    game.profiler = FrameProfiler(capacity=ticks, enabled=True)
+    rng = np.random.default_rng(seed)
+    update_ms = []
+    checksums = []
+    for _ in range(ticks):
+        refill(game, rng, enemies, bullets)
+        start = time.perf_counter()
+        game.update()
+        update_ms.append((time.perf_counter() - start) * 1000)
+        checksums.append(game.checksum())
+    profiler = game.profiler
+    sections = profiler.times[:profiler.frames]
+    return {
+        'enemies_ms': percentile(sections[:, profiler.section_index['enemies']].tolist(), 0.5),
+        'bullets_ms': percentile(sections[:, profiler.section_index['bullets']].tolist(), 0.5),
+        'update_ms': percentile(update_ms, 0.5),
+        'checksums': checksums,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="セクターに分けた並列の更新のベンチマーク")
+    parser.add_argument('--enemies', type=int, action='append', help="敵の数（複数指定可）")
+    parser.add_argument('--workers', type=int, action='append', help="スレッドの数（複数指定可）")
+    parser.add_argument('--bullets', type=int, default=256, help="保つプレイヤーの弾の数")
+    parser.add_argument('--ticks', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"cores: {os.cpu_count()}")
+    print(f"{'enemies':>7} {'workers':>7} {'enemy ms':>8} {'x':>5} {'bullet ms':>9} {'x':>5} "
+          f"{'update ms':>9} {'x':>5}  match")
+    for enemies in args.enemies or [2000, 5000, 10000]:
+        serial = run(enemies, args.bullets, args.ticks, args.seed, None)
+        print(f"{enemies:>7} {'serial':>7} {serial['enemies_ms']:>8.3f} {1:>5.2f} {serial['bullets_ms']:>9.3f} "
+              f"{1:>5.2f} {serial['update_ms']:>9.3f} {1:>5.2f}")
+        for workers in args.workers or [1, 2, 4, 8]:
+            pool = SectorPool(workers=workers)
+            try:
+                result = run(enemies, args.bullets, args.ticks, args.seed, pool)
+            finally:
+                pool.close()
+            match = result['checksums'] == serial['checksums']
+            print(f"{enemies:>7} {workers:>7} "
+                  f"{result['enemies_ms']:>8.3f} {serial['enemies_ms'] / result['enemies_ms']:>5.2f} "
+                  f"{result['bullets_ms']:>9.3f} {serial['bullets_ms'] / result['bullets_ms']:>5.2f} "
+                  f"{result['update_ms']:>9.3f} {serial['update_ms'] / result['update_ms']:>5.2f}  "
+                  f"{'ok' if match else 'MISMATCH'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+"""
+シナリオベンチマーク。
+benchmarks/scenarios.py の各シナリオを seed 固定で実行し、1ティックあたりの更新時間（p50/p99）、
+描画時間、エンティティ数のピーク、メモリ確保量を計測して JSON に書き出す。
+--compare で以前の結果と比べ、しきい値を超えて遅くなったシナリオがあれば終了コード1で失敗する。
+
+    python -m benchmarks.bench_scenarios --json results.json
+    python -m benchmarks.bench_scenarios --compare baseline.json --threshold 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks import scenarios
+
+# --compare で比べる指標
+COMPARED_METRICS = ('update_p50_ms', 'update_p99_ms', 'draw_p50_ms', 'draw_p99_ms')
+
+
+def percentile(samples, q):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def create_app():
+    """
+    描画時間を測るための App を作る。ディスプレイがない環境では SDL のオフスクリーン描画を使う。
+    """
+    if sys.platform.startswith('linux') and not (os.environ.get('DISPLAY') or
+                                                 os.environ.get('WAYLAND_DISPLAY')):
+        os.environ.setdefault('SDL_VIDEODRIVER', 'offscreen')
+        os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    from main import App
+    return App()
+
+
+def run_timing(scenario, seed, ticks, app):
+    game = scenario.create(seed)
+    if app is not None:
+        app.game = game
+    update_ms = []
+    draw_ms = []
+    peaks = {'enemies': 0, 'bullets': 0, 'exp_tokens': 0}
+    for tick in range(ticks):
+        if scenario.on_tick:
+            scenario.on_tick(game, tick)
+        start = time.perf_counter()
+        game.update()
+        update_ms.append((time.perf_counter() - start) * 1000)
+        if app is not None:
+            start = time.perf_counter()
+            app.draw()
+            draw_ms.append((time.perf_counter() - start) * 1000)
+        peaks['enemies'] = max(peaks['enemies'], len(game.enemies))
+        peaks['bullets'] = max(peaks['bullets'], len(game.player_bullets) + len(game.enemy_bullets))
+        peaks['exp_tokens'] = max(peaks['exp_tokens'], len(game.exp_tokens))
+
+    result = {
+        'ticks': ticks,
+        'update_mean_ms': sum(update_ms) / ticks,
+        'update_p50_ms': percentile(update_ms, 0.50),
+        'update_p99_ms': percentile(update_ms, 0.99),
+        'update_max_ms': max(update_ms),
+        'peak_enemies': peaks['enemies'],
+        'peak_bullets': peaks['bullets'],
+        'peak_exp_tokens': peaks['exp_tokens'],
+        'final_score': game.score,
+    }
+    if draw_ms:
+        result.update({
+            'draw_mean_ms': sum(draw_ms) / ticks,
+            'draw_p50_ms': percentile(draw_ms, 0.50),
+            'draw_p99_ms': percentile(draw_ms, 0.99),
+            'draw_max_ms': max(draw_ms),
+        })
+    return result
+
+
+def run_memory(scenario, seed, ticks):
+    """
+    同じシナリオを tracemalloc 付きでもう一度実行し、メモリ確保量を測る。
+    （tracemalloc は遅いので、時間の計測とは別に回す）
+    """
+    game = scenario.create(seed)
+    tracemalloc.start()
+    blocks_before = sys.getallocatedblocks()
+    base, _ = tracemalloc.get_traced_memory()
+    for tick in range(ticks):
+        if scenario.on_tick:
+            scenario.on_tick(game, tick)
+        game.update()
+    current, peak = tracemalloc.get_traced_memory()
+    blocks_after = sys.getallocatedblocks()
+    tracemalloc.stop()
+    return {
+        'mem_peak_kb': (peak - base) / 1024,
+        'mem_retained_kb': (current - base) / 1024,
+        'blocks_retained': blocks_after - blocks_before,
+    }
+
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """
+    baseline より threshold（割合）かつ min_delta_ms 以上遅くなった指標を返す
+    """
+    regressions = []
+    for name, current in results['scenarios'].items():
+        before = baseline['scenarios'].get(name)
+        if before is None:
+            continue
+        for metric in COMPARED_METRICS:
+            if metric not in current or metric not in before:
+                continue
+            old = before[metric]
+            new = current[metric]
+            if new > old * (1 + threshold) and new - old >= min_delta_ms:
+                regressions.append((name, metric, old, new))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="シナリオベンチマーク")
+    parser.add_argument('--scenario', action='append',
+                        help="実行するシナリオ名（複数指定可、省略時はすべて）")
+    parser.add_argument('--ticks', type=int, default=None,
+                        help="シナリオごとのティック数（省略時はシナリオの既定値）")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-draw', action='store_true', help="描画時間を測らない")
+    parser.add_argument('--no-memory', action='store_true', help="メモリ確保量を測らない")
+    parser.add_argument('--json', help="結果を書き出す JSON ファイル")
+    parser.add_argument('--compare', help="比較する以前の結果（JSON）")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="失敗とみなす悪化の割合（0.2 = 20%%）")
+    parser.add_argument('--min-delta-ms', type=float, default=0.05,
+                        help="これより小さい悪化はノイズとして無視する")
+    args = parser.parse_args()
+
+    selected = [scenarios.get(name) for name in args.scenario] if args.scenario else scenarios.SCENARIOS
+    app = None if args.no_draw else create_app()
+
+    results = {
+        'meta': {
+            'seed': args.seed,
+            'draw': app is not None,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+        },
+        'scenarios': {},
+    }
+    header = f"{'scenario':<22} {'upd p50':>8} {'upd p99':>8} {'drw p50':>8} {'drw p99':>8} " \
+             f"{'enemies':>8} {'bullets':>8} {'tokens':>7} {'mem KB':>8}"
+    print(header)
+    for scenario in selected:
+        ticks = args.ticks or scenario.ticks
+        result = run_timing(scenario, args.seed, ticks, app)
+        if not args.no_memory:
+            result.update(run_memory(scenario, args.seed, ticks))
+        results['scenarios'][scenario.name] = result
+        print(f"{scenario.name:<22} {result['update_p50_ms']:>8.3f} {result['update_p99_ms']:>8.3f} "
+              f"{result.get('draw_p50_ms', 0):>8.3f} {result.get('draw_p99_ms', 0):>8.3f} "
+              f"{result['peak_enemies']:>8} {result['peak_bullets']:>8} {result['peak_exp_tokens']:>7} "
+              f"{result.get('mem_peak_kb', 0):>8.0f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+        for name, metric, old, new in regressions:
+            print(f"REGRESSION {name} {metric}: {old:.3f} -> {new:.3f} ms ({new / old - 1:+.0%})")
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == '__main__':
+    main()
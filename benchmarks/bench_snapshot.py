@@ -0,0 +1,65 @@
+"""
+状態のスナップショット（Engine.snapshot / restore）のベンチマーク。
+各シナリオを途中まで進めてスナップショットを取り、サイズと snapshot / restore の時間（中央値）を測る。
+別の seed で作った Engine に restore してから両方を同じだけ進め、チェックサムが一致し続けるかも確かめる。
+
+    python -m benchmarks.bench_snapshot [--ticks 900] [--after 600] [--repeat 200]
+"""
+import argparse
+import time
+
+from benchmarks import scenarios
+from benchmarks.bench_scenarios import percentile
+
+
+def advance(scenario, game, start, end):
+    for tick in range(start, end):
+        if scenario.on_tick:
+            scenario.on_tick(game, tick)
+        game.update()
+
+
+def measure(call, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        samples.append((time.perf_counter() - start) * 1000)
+    return percentile(samples, 0.5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="状態のスナップショットのベンチマーク")
+    parser.add_argument('--scenario', action='append', help="実行するシナリオ名（複数指定可）")
+    parser.add_argument('--ticks', type=int, default=900, help="スナップショットを取るまでのティック数")
+    parser.add_argument('--after', type=int, default=600, help="restore してから比べるティック数")
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'scenario':<22} {'entities':>8} {'KB':>7} {'snapshot ms':>12} {'restore ms':>11} {'replayed':>9}")
+    failed = False
+    for name in args.scenario or [scenario.name for scenario in scenarios.SCENARIOS]:
+        scenario = scenarios.get(name)
+        game = scenario.create(args.seed)
+        advance(scenario, game, 0, args.ticks)
+        data = game.snapshot()
+        copy = scenario.create(args.seed + 1)
+        snapshot_ms = measure(game.snapshot, args.repeat)
+        restore_ms = measure(lambda copy=copy, data=data: copy.restore(data), args.repeat)
+
+        # 入力ソースの位置もそろえてから、両方を同じだけ進める
+        copy.input_source.tick = game.input_source.tick
+        advance(scenario, game, args.ticks, args.ticks + args.after)
+        advance(scenario, copy, args.ticks, args.ticks + args.after)
+        same = game.checksum() == copy.checksum()
+        failed |= not same
+        entities = sum(len(store) for store in game.entity_stores())
+        print(f"{name:<22} {entities:>8} {len(data) / 1024:>7.1f} {snapshot_ms:>12.3f} {restore_ms:>11.3f} "
+              f"{'ok' if same else 'DIVERGED':>9}")
+    if failed:
+        raise SystemExit("restored state diverged")
+
+
+if __name__ == '__main__':
+    main()
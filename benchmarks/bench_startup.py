@@ -0,0 +1,87 @@
+"""
+起動時間とフォントのサイズのベンチマーク。
+元の BDF（assets/k8x12.bdf）と build_font.py で作った圧縮フォント（assets/k8x12.pxf）について、
+新しいプロセスで App を作って最初のフレームを描き終えるまでの時間（中央値。うちフォントの
+読み込みと最初の描画の時間）と、
+パッケージに入るファイルのサイズ（そのまま・zip 圧縮後・index.html に埋め込む base64）を比べる。
+最初のフレームにはスキル選択画面を出して、日本語の文字列を描く時間も含める。
+
+    python -m benchmarks.bench_startup [--runs 5]
+"""
+import argparse
+import base64
+import os
+import subprocess
+import sys
+import time
+import zlib
+
+FONTS = ('assets/k8x12.bdf', 'assets/k8x12.pxf')
+
+
+def first_frame(font_path):
+    """
+    （子プロセス側）import から最初のフレームの描画までの時間、フォントの読み込み時間、
+    最初のフレームの描画時間 [ms] を表示する
+    """
+    start = time.perf_counter()
+    if sys.platform.startswith('linux') and not (os.environ.get('DISPLAY') or
+                                                 os.environ.get('WAYLAND_DISPLAY')):
+        os.environ.setdefault('SDL_VIDEODRIVER', 'offscreen')
+        os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    import pyxel
+
+    from main import App
+    from packedfont import PackedFont
+    App.font_path = font_path
+    app = App()
+    # App と同じ読み込みをもう一度行って、フォントの読み込みだけの時間を測る
+    load_start = time.perf_counter()
+    pyxel.Font(font_path) if font_path.endswith('.bdf') else PackedFont(font_path)
+    load_ms = (time.perf_counter() - load_start) * 1000
+    app.game.generate_skill_options()
+    app.game.show_skill_select = True
+    draw_start = time.perf_counter()
+    app.draw()
+    end = time.perf_counter()
+    print(f"{(end - start) * 1000:.3f} {load_ms:.3f} {(end - draw_start) * 1000:.3f}")
+
+
+def measure(font_path, runs):
+    """
+    新しいプロセスで runs 回測り、(合計, フォントの読み込み, 最初の描画) それぞれの中央値を返す
+    """
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_startup', '--child', font_path],
+            capture_output=True, text=True, check=True).stdout
+        samples.append([float(v) for v in output.split()[-3:]])
+    return [sorted(column)[len(column) // 2] for column in zip(*samples)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="起動時間とフォントサイズのベンチマーク")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        first_frame(args.child)
+        return
+
+    print(f"{'font':<20} {'first frame':>12} {'font load':>10} {'1st draw':>9} "
+          f"{'size KB':>8} {'zip KB':>7} {'base64 KB':>10}")
+    for font_path in FONTS:
+        if not os.path.exists(font_path):
+            print(f"{font_path:<20} (not found, run build_font.py)")
+            continue
+        with open(font_path, 'rb') as f:
+            data = f.read()
+        total_ms, load_ms, draw_ms = measure(font_path, args.runs)
+        print(f"{font_path:<20} {total_ms:>9.1f} ms {load_ms:>7.2f} ms {draw_ms:>6.2f} ms "
+              f"{len(data) / 1024:>8.1f} {len(zlib.compress(data, 9)) / 1024:>7.1f} "
+              f"{len(base64.b64encode(data)) / 1024:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+群れのスポーン（timeline.py の予定表と Engine.spawn_budget）のベンチマーク。
+緑の包囲と水色の帯の間隔を縮めて（既定では 300 / 450 ティック。900 ティックごとに同じティックに重なる）、
+1ティックに出す敵の上限 spawn_budget を変えながら同じ seed で動かし、
+1ティックの更新時間とスポーンの区間の時間の最悪値・p99、群れが湧いたティックの更新時間の最悪値（wave max）を比べる
+（budget なし = 群れを湧いたティックに全員出す）。同じ seed で --repeat 回動かし、ティックごとに最小の時間を使う。
+
+    python -m benchmarks.bench_waves [--budget 8 --budget 16] [--ring-size 30] [--wave-size 50] [--repeat 5]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.bench_scenarios import percentile
+from benchmarks.scenarios import OrbitInput
+from engine import Engine
+from profiler import FrameProfiler
+
+
+def run_once(budget, args):
+    """
+    1回動かし、ティックごとの (更新時間, スポーンの区間の時間, 群れが湧いたか) を返す
+    """
+    game = Engine(seed=args.seed, input_source=OrbitInput())
+    game.max_hp = game.player_hp = 10**9
+    game.next_skill_threshold = float('inf')
+    game.green_ring_interval = args.ring_interval
+    game.green_ring_size = args.ring_size
+    game.cyan_wave_interval = args.wave_interval
+    game.cyan_wave_size = args.wave_size
+    game.spawn_budget = budget
+    game.profiler = FrameProfiler(capacity=args.ticks, enabled=True)
+    update_ms = []
+    fired = []
+    for _ in range(args.ticks):
+        sequence = game.timeline.sequence
+        start = time.perf_counter()
+        game.update()
+        update_ms.append((time.perf_counter() - start) * 1000)
+        # 繰り返す群れは湧いたティックに次の予定が入る
+        fired.append(game.timeline.sequence != sequence)
+    profiler = game.profiler
+    spawn_ms = profiler.times[:profiler.frames, profiler.section_index['spawn']]
+    return np.array(update_ms), spawn_ms, np.array(fired), game.score
+
+
+def run(budget, args):
+    """
+    同じ seed で repeat 回動かす。シミュレーションは毎回同じなので、ティックごとに最小の時間を取って
+    OS の割り込みなどによる外れ値を除いてから、最悪値・p99 を求める
+    """
+    runs = [run_once(budget, args) for _ in range(args.repeat)]
+    update_ms = np.min([r[0] for r in runs], axis=0)
+    spawn_ms = np.min([r[1] for r in runs], axis=0)
+    fired = runs[0][2]
+    return {
+        'update_max_ms': float(update_ms.max()),
+        'update_p99_ms': percentile(update_ms.tolist(), 0.99),
+        'update_p50_ms': percentile(update_ms.tolist(), 0.5),
+        'wave_max_ms': float(update_ms[fired].max()) if fired.any() else 0.0,
+        'spawn_max_ms': float(spawn_ms.max()),
+        'spawn_p99_ms': percentile(spawn_ms.tolist(), 0.99),
+        'score': runs[0][3],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="群れのスポーンのベンチマーク")
+    parser.add_argument('--budget', type=int, action='append',
+                        help="1ティックに出す敵の上限（複数指定可。0 なら上限なし）")
+    parser.add_argument('--ring-interval', type=int, default=300)
+    parser.add_argument('--ring-size', type=int, default=30)
+    parser.add_argument('--wave-interval', type=int, default=450)
+    parser.add_argument('--wave-size', type=int, default=50)
+    parser.add_argument('--ticks', type=int, default=2700)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'budget':>6} {'upd max':>8} {'upd p99':>8} {'upd p50':>8} {'wave max':>8} "
+          f"{'spn max':>8} {'spn p99':>8} {'score':>6}")
+    for budget in args.budget or [0, 8, 16, 32]:
+        result = run(budget or None, args)
+        print(f"{budget or 'none':>6} {result['update_max_ms']:>8.3f} {result['update_p99_ms']:>8.3f} "
+              f"{result['update_p50_ms']:>8.3f} {result['wave_max_ms']:>8.3f} {result['spawn_max_ms']:>8.3f} "
+              f"{result['spawn_p99_ms']:>8.3f} {result['score']:>6}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+ベンチマーク用のシナリオ定義。
+どのシナリオもゲーム本体のスポーン関数やスキルを使って負荷を作り、
+seed を固定した Engine で再現できるようにしている。
+"""
+import math
+
+from emitters import Spiral
+from engine import Engine, InputState
+
+
+class OrbitInput:
+    """
+    マウスを押しっぱなしにして、プレイヤーをゆっくり円を描くように動かす入力ソース
+    """
+    def __init__(self, radius=60, step=0.01):
+        self.radius = radius
+        self.step = step
+        self.tick = 0
+
+    def read(self):
+        angle = self.tick * self.step
+        self.tick += 1
+        return InputState(
+            mouse_x=128 + int(self.radius * math.cos(angle)),
+            mouse_y=128 + int(self.radius * math.sin(angle)),
+            move=True,
+        )
+
+
+class Scenario:
+    """
+    ベンチマークの1シナリオ。
+    setup(game) は開始前に1回、on_tick(game, tick) は毎ティックの update() の前に呼ばれる。
+    """
+    def __init__(self, name, description, setup=None, on_tick=None, ticks=1200):
+        self.name = name
+        self.description = description
+        self.setup = setup
+        self.on_tick = on_tick
+        self.ticks = ticks
+
+    def create(self, seed):
+        """
+        シナリオの初期状態を作った Engine を返す
+        """
+        game = Engine(seed=seed, input_source=OrbitInput())
+        # 死亡やスキル選択画面で計測が止まらないようにする
+        game.max_hp = game.player_hp = 10**9
+        game.next_skill_threshold = float('inf')
+        if self.setup:
+            self.setup(game)
+        return game
+
+
+def min_spawn_interval(game):
+    game.base_spawn_interval = 10
+    game.spawn_interval = 10
+
+
+def add_satellites(game, count=8):
+    for _ in range(count):
+        game.grant_skill('satellites')
+
+
+def homing_min_cooldown(game):
+    game.grant_skill('homing_bullets')
+    game.homing_bullet_speed = game.player_bullet_speed
+    game.cooldown_time = game.min_cooldown
+
+
+def cyan_waves(game, tick):
+    if tick % 30 == 0:
+        game.spawn_cyan_wave(120)
+
+
+def green_rings(game, tick):
+    if tick % 300 == 0:
+        game.spawn_green_ring(num_enemies=30, distance=150)
+
+
+def ring_flood(game, tick):
+    if tick % 20 == 0:
+        game.spawn_green_ring(num_enemies=60, distance=290)
+
+
+def spiral_emitter(game):
+    game.blue_emitter = Spiral(arms=8, speed=1.5, step=0.2)
+
+
+def blue_rings(game, tick):
+    if tick % 60 == 0:
+        for k in range(12):
+            angle = 2 * math.pi * k / 12
+            game.enemies.spawn(game.player_x + math.cos(angle) * 150,
+                               game.player_y + math.sin(angle) * 150, 'blue')
+
+
+def late_game(game):
+    min_spawn_interval(game)
+    add_satellites(game)
+    game.grant_skill('electric_field')
+    homing_min_cooldown(game)
+
+
+def late_game_events(game, tick):
+    cyan_waves(game, tick)
+    green_rings(game, tick)
+
+
+SCENARIOS = [
+    Scenario('spawn_min_interval', '最短間隔（10）で spawn_enemy し続ける',
+             setup=min_spawn_interval),
+    Scenario('cyan_wave_stack', '30ティックごとに spawn_cyan_wave(120) を重ねる',
+             on_tick=cyan_waves),
+    Scenario('green_ring_surround', '300ティックごとに spawn_green_ring(30) で包囲する',
+             setup=min_spawn_interval, on_tick=green_rings),
+    Scenario('ring_flood', '20ティックごとに画面外の遠く（290px）へ spawn_green_ring(60) を湧かせる',
+             setup=min_spawn_interval, on_tick=ring_flood),
+    Scenario('satellites_8', '衛星8基 + 最短間隔のスポーン',
+             setup=lambda game: (min_spawn_interval(game), add_satellites(game))),
+    Scenario('satellites_32', '衛星32基 + 最短間隔のスポーン + 水色の大群',
+             setup=lambda game: (min_spawn_interval(game), add_satellites(game, 32)),
+             on_tick=cyan_waves),
+    Scenario('electric_field', '電撃フィールド有効 + 最短間隔のスポーン',
+             setup=lambda game: (min_spawn_interval(game), game.grant_skill('electric_field'))),
+    Scenario('homing_min_cooldown', '誘導弾を最短クールダウンで撃ち続ける',
+             setup=lambda game: (min_spawn_interval(game), homing_min_cooldown(game))),
+    Scenario('bullet_hell', '60ティックごとに青12体を湧かせ、8本腕の渦巻き弾幕を撃たせる',
+             setup=spiral_emitter, on_tick=blue_rings),
+    Scenario('late_game', '上記すべてを同時に有効にする',
+             setup=late_game, on_tick=late_game_events),
+]
+
+
+def get(name):
+    for scenario in SCENARIOS:
+        if scenario.name == name:
+            return scenario
+    raise KeyError(name)
@@ -0,0 +1,283 @@
+"""
+Web 版のビルドツール（package_and_convert.ps1 の置き換え。Windows 以外でも動く）。
+ディレクトリ全体ではなく MANIFEST に書いたファイルだけを pyxapp に詰め、
+base64 で埋め込んだ index.html を書き出す（ゲームパッドは無効、numpy を読み込む）。
+
+- 最初に build_font.py でフォントを作り直す（BDF がなければ作ってある .pxf を使う）。どちらでも、
+  フォントを読み込むスクリプト（main.py, japanese_demo.py）が表示する文字がそろっているかを確かめ、
+  足りなければエラーにする
+- main.py から import しているのに MANIFEST にないモジュールがあればエラーにし、
+  MANIFEST にあっても使われていないモジュールは警告して入れない
+- 入れる前にすべてのモジュールをコンパイルして構文エラーを検出する。--bytecode を付けると
+  ビルドした Python 用の .pyc（ハッシュ検証なし）も入れる（Web 版の Pyodide は版が違うので使われない）
+- 圧縮方式は「読み込み時間 = 転送時間（--bandwidth）+ 展開時間」が最短のものを選ぶ
+  （Pyodide で必ず使える無圧縮と deflate の各レベルから）
+- ファイルごとのサイズと、アーカイブの読み込みから最初のフレームを描き終えるまでの時間を表示する。
+  --budget を超える index.html になったら終了コード1で失敗する
+
+    python build.py [--bandwidth 10] [--budget 200] [--runs 3]
+"""
+import argparse
+import base64
+import importlib.util
+import io
+import os
+import py_compile
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+
+import build_font
+
+# pyxapp の中のディレクトリ名（index.html から参照する名前になる）
+APP_NAME = 'pyxel_test'
+STARTUP_SCRIPT = 'main.py'
+# pyxel.APP_STARTUP_SCRIPT_FILE と同じ名前
+STARTUP_SCRIPT_FILE = '.pyxapp_startup_script'
+
+# パッケージに入れるファイル（フォントは build_font.py で作った .pxf だけを入れる）
+MANIFEST = (
+    'main.py',
+    'background.py',
+    'clock.py',
+    'engine.py',
+    'entities.py',
+    'flowfield.py',
+    'memory.py',
+    'packedfont.py',
+    'profiler.py',
+    'replay.py',
+    'sectors.py',
+    'skills.py',
+    'spatial.py',
+    'sprites.py',
+    'textcache.py',
+    'timeline.py',
+    'assets/k8x12.pxf',
+)
+
+# Web 版で追加で読み込む Pyodide のパッケージ
+WEB_PACKAGES = ('numpy',)
+
+# (名前, zipfile の圧縮方式, 圧縮レベル)
+COMPRESSIONS = [('stored', zipfile.ZIP_STORED, None)] + [
+    (f'deflate-{level}', zipfile.ZIP_DEFLATED, level) for level in (1, 6, 9)]
+
+
+def check_manifest():
+    """
+    STARTUP_SCRIPT から import をたどり、入れるファイルの一覧を返す。
+    たどり着くモジュールが MANIFEST になければ SystemExit、使われないモジュールは警告して除く。
+    """
+    reachable = build_font.reachable_modules(STARTUP_SCRIPT)
+    missing = sorted(reachable - set(MANIFEST))
+    if missing:
+        raise SystemExit(f"imported but not in MANIFEST: {', '.join(missing)}")
+    files = []
+    for path in MANIFEST:
+        if not os.path.exists(path):
+            raise SystemExit(f"missing file in MANIFEST: {path}")
+        if path.endswith('.py') and path not in reachable:
+            print(f"warning: {path} is not imported from {STARTUP_SCRIPT}; skipped")
+            continue
+        files.append(path)
+    return files
+
+
+def update_font():
+    """
+    build_font.py で圧縮フォントを作り直す（BDF がないときは作ってあるものを使う）。
+    フォントを読み込むスクリプト（build_font.FONT_CONSUMERS）の描く文字がそろっていなければ SystemExit
+    """
+    rebuilt = os.path.exists(build_font.DEFAULT_BDF)
+    if rebuilt:
+        build_font.build(build_font.default_sources())
+    missing = build_font.missing_by_consumer()
+    if missing:
+        details = ', '.join(f"{consumer}: {chars}" for consumer, chars in missing.items())
+        reason = "not in the BDF" if rebuilt else f"{build_font.DEFAULT_BDF} is not available to rebuild it"
+        raise SystemExit(f"{build_font.DEFAULT_OUT} is missing glyphs ({details}); {reason}")
+    if not rebuilt:
+        print(f"{build_font.DEFAULT_OUT} is up to date ({build_font.DEFAULT_BDF} not found, not rebuilt)")
+
+
+def collect_entries(files, bytecode):
+    """
+    アーカイブに入れる (アーカイブ内の名前, 中身) のリストを返す。モジュールはここでコンパイルして確かめる。
+    """
+    entries = [(f'{APP_NAME}/{STARTUP_SCRIPT_FILE}', STARTUP_SCRIPT.encode('utf-8'))]
+    with tempfile.TemporaryDirectory() as tmp:
+        for path in files:
+            with open(path, 'rb') as f:
+                data = f.read()
+            entries.append((f'{APP_NAME}/{path}', data))
+            if not path.endswith('.py'):
+                continue
+            compiled = os.path.join(tmp, os.path.basename(path) + 'c')
+            try:
+                py_compile.compile(path, cfile=compiled, doraise=True,
+                                   invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH)
+            except py_compile.PyCompileError as e:
+                raise SystemExit(str(e))
+            # 起動スクリプトは runpy で実行されて .pyc を使わないので入れない
+            if bytecode and path != STARTUP_SCRIPT:
+                cache = importlib.util.cache_from_source(path)
+                with open(compiled, 'rb') as f:
+                    entries.append((f'{APP_NAME}/{cache}', f.read()))
+    return entries
+
+
+def write_archive(entries, compression, level):
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, 'w', compression=compression, compresslevel=level) as zf:
+        for name, data in entries:
+            zf.writestr(name, data)
+    return out.getvalue()
+
+
+def decode_ms(archive, repeat=20):
+    """
+    アーカイブの全ファイルを読み出す時間（中央値）[ms]
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with zipfile.ZipFile(io.BytesIO(archive)) as zf:
+            for name in zf.namelist():
+                zf.read(name)
+        samples.append((time.perf_counter() - start) * 1000)
+    return sorted(samples)[len(samples) // 2]
+
+
+def choose_compression(entries, bandwidth_mbps):
+    """
+    各圧縮方式で作ってみて、表を表示し、読み込み時間が最短の (名前, アーカイブ) を返す
+    """
+    print(f"{'compression':<12} {'archive KB':>10} {'html KB':>8} {'decode ms':>10} {'load ms':>8}")
+    best = None
+    for name, compression, level in COMPRESSIONS:
+        archive = write_archive(entries, compression, level)
+        html_bytes = len(base64.b64encode(archive))
+        decode = decode_ms(archive)
+        load = html_bytes * 8 / (bandwidth_mbps * 1e6) * 1000 + decode
+        print(f"{name:<12} {len(archive) / 1024:>10.1f} {html_bytes / 1024:>8.1f} {decode:>10.3f} {load:>8.1f}")
+        if best is None or load < best[0]:
+            best = (load, name, archive)
+    return best[1], best[2]
+
+
+def print_sizes(archive):
+    """
+    アーカイブ内のファイルごとのサイズを大きい順に表示する
+    """
+    with zipfile.ZipFile(io.BytesIO(archive)) as zf:
+        infos = sorted(zf.infolist(), key=lambda info: -info.compress_size)
+    total = sum(info.compress_size for info in infos)
+    print(f"{'file':<40} {'size KB':>8} {'packed KB':>9} {'share':>6}")
+    for info in infos:
+        print(f"{info.filename:<40} {info.file_size / 1024:>8.1f} {info.compress_size / 1024:>9.1f} "
+              f"{info.compress_size / total:>6.1%}")
+
+
+def write_html(archive, path):
+    """
+    pyxel app2html と同じ形の HTML を書く（ゲームパッドは無効、WEB_PACKAGES を読み込む）
+    """
+    import pyxel
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(
+            "<!DOCTYPE html>\n"
+            f'<script src="https://cdn.jsdelivr.net/gh/kitao/pyxel@{pyxel.VERSION}/wasm/pyxel.js"></script>\n'
+            "<script>\n"
+            f'launchPyxel({{ command: "play", name: "{APP_NAME}.pyxapp", gamepad: "disabled", '
+            f'packages: "{",".join(WEB_PACKAGES)}", base64: "{base64.b64encode(archive).decode()}" }});\n'
+            "</script>\n")
+
+
+def first_frame(archive_path):
+    """
+    （子プロセス側）pyxel play と同じようにアーカイブを展開して起動スクリプトを実行し、
+    最初のフレームを描き終えるまでの時間 [ms] を表示して終了する
+    """
+    start = time.perf_counter()
+    if sys.platform.startswith('linux') and not (os.environ.get('DISPLAY') or
+                                                 os.environ.get('WAYLAND_DISPLAY')):
+        os.environ.setdefault('SDL_VIDEODRIVER', 'offscreen')
+        os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    import runpy
+
+    import pyxel
+
+    app_dir = tempfile.mkdtemp()
+    try:
+        with zipfile.ZipFile(archive_path) as zf:
+            zf.extractall(app_dir)
+        script = os.path.join(app_dir, APP_NAME, STARTUP_SCRIPT)
+
+        def run(update, draw):
+            update()
+            draw()
+            print(f"{(time.perf_counter() - start) * 1000:.3f}")
+            raise SystemExit
+
+        pyxel.run = run
+        sys.argv = [script]
+        sys.path.insert(0, os.path.dirname(script))
+        try:
+            runpy.run_path(script, run_name='__main__')
+        except SystemExit:
+            pass
+    finally:
+        shutil.rmtree(app_dir, ignore_errors=True)
+
+
+def measure_first_frame(archive_path, runs):
+    """
+    新しいプロセスで runs 回測り、中央値 [ms] を返す
+    """
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, __file__, '--child', archive_path],
+                                capture_output=True, text=True, check=True).stdout
+        samples.append(float(output.split()[-1]))
+    return sorted(samples)[len(samples) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Web 版の pyxapp と index.html を作る")
+    parser.add_argument('--html', default='index.html')
+    parser.add_argument('--bandwidth', type=float, default=10,
+                        help="圧縮方式を選ぶときに仮定する回線速度 [Mbps]")
+    parser.add_argument('--bytecode', action='store_true', help="ビルドした Python 用の .pyc も入れる")
+    parser.add_argument('--budget', type=float, help="index.html の上限 [KB]")
+    parser.add_argument('--runs', type=int, default=3, help="最初のフレームまでの時間を測る回数（0 で測らない）")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        first_frame(args.child)
+        return
+
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    update_font()
+    entries = collect_entries(check_manifest(), args.bytecode)
+    name, archive = choose_compression(entries, args.bandwidth)
+    print(f"using {name}\n")
+    print_sizes(archive)
+
+    archive_path = f'{APP_NAME}.pyxapp'
+    with open(archive_path, 'wb') as f:
+        f.write(archive)
+    write_html(archive, args.html)
+    html_kb = os.path.getsize(args.html) / 1024
+    print(f"\nwrote {archive_path} ({len(archive) / 1024:.1f} KB) and {args.html} ({html_kb:.1f} KB)")
+    if args.runs:
+        print(f"archive load to first frame: {measure_first_frame(archive_path, args.runs):.1f} ms")
+    if args.budget is not None and html_kb > args.budget:
+        raise SystemExit(f"{args.html} is {html_kb:.1f} KB, over the budget of {args.budget:.1f} KB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+"""
+フォントのビルドツール。
+フォントを読み込むスクリプト（FONT_CONSUMERS）から import をたどって届くモジュールの文字列リテラルで使われている文字と
+ASCII の表示可能文字だけを
+BDF フォントから取り出し、packedfont.PackedFont で読めるバイナリ形式に詰めて書き出す。
+表示する文字列を変えたら実行し直す（build.py は Web 版を作る前にこれを実行する）。
+
+    python build_font.py
+    python build_font.py --bdf assets/k8x12.bdf --out assets/k8x12.pxf main.py engine.py
+
+バイナリ形式（リトルエンディアン）:
+    ヘッダ   : マジック b'PXF1', フォントの高さ, アセント, グリフ数
+    索引     : グリフごとに (コードポイント, 送り幅, 幅, 高さ, x オフセット, y オフセット, ビットマップの位置)
+    ビットマップ: グリフごとに1行 ceil(幅 / 8) バイトを高さの分だけ並べたもの（BDF の BITMAP と同じ並び）
+"""
+import argparse
+import ast
+import os
+import time
+
+from packedfont import HEADER, INDEX_ENTRY, MAGIC
+
+DEFAULT_BDF = os.path.join('assets', 'k8x12.bdf')
+DEFAULT_OUT = os.path.join('assets', 'k8x12.pxf')
+STARTUP_SCRIPT = 'main.py'
+# 圧縮フォントを読み込んで文字を描くスクリプト。グリフはここから届くモジュールの文字列から集める
+FONT_CONSUMERS = (STARTUP_SCRIPT, 'japanese_demo.py')
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def collect_characters(paths):
+    """
+    Python ソースの文字列リテラル（docstring を除く）に出てくる文字の集合を返す。
+    ASCII の表示可能文字は数値の表示などで使うので常に含める。
+    """
+    chars = {chr(c) for c in range(0x20, 0x7F)}
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            tree = ast.parse(f.read(), filename=path)
+        docstrings = set()
+        for node in ast.walk(tree):
+            if (isinstance(node, (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)) and
+                    node.body and isinstance(node.body[0], ast.Expr) and
+                    isinstance(node.body[0].value, ast.Constant)):
+                docstrings.add(id(node.body[0].value))
+        for node in ast.walk(tree):
+            if (isinstance(node, ast.Constant) and isinstance(node.value, str) and
+                    id(node) not in docstrings):
+                chars.update(node.value)
+    # 改行や区切りの NUL などの制御文字は描かない
+    return {c for c in chars if c.isprintable()}
+
+
+def parse_bdf(path, wanted):
+    """
+    BDF から wanted に含まれる文字のグリフだけを読み、
+    (フォントの高さ, アセント, {コードポイント: (送り幅, 幅, 高さ, x オフセット, y オフセット, ビットマップ)}) を返す
+    """
+    height = ascent = 0
+    glyphs = {}
+    codepoints = {ord(c) for c in wanted}
+    with open(path, encoding='utf-8') as f:
+        lines = iter(f)
+        for line in lines:
+            if line.startswith('FONTBOUNDINGBOX'):
+                _, _, h, _, yoff = line.split()
+                height = int(h)
+                ascent = int(h) + int(yoff)
+            elif line.startswith('STARTCHAR'):
+                codepoint = dwidth = None
+                bbx = (0, 0, 0, 0)
+                for line in lines:
+                    if line.startswith('ENCODING'):
+                        codepoint = int(line.split()[1])
+                    elif line.startswith('DWIDTH'):
+                        dwidth = int(line.split()[1])
+                    elif line.startswith('BBX'):
+                        bbx = tuple(int(v) for v in line.split()[1:5])
+                    elif line.startswith('BITMAP'):
+                        break
+                rows = []
+                for line in lines:
+                    if line.startswith('ENDCHAR'):
+                        break
+                    rows.append(line.strip())
+                if codepoint in codepoints:
+                    width, glyph_height, xoff, yoff = bbx
+                    row_bytes = (width + 7) // 8
+                    bitmap = b''.join(bytes.fromhex(row)[:row_bytes].ljust(row_bytes, b'\0')
+                                      for row in rows[:glyph_height])
+                    glyphs[codepoint] = (dwidth if dwidth is not None else width,
+                                         width, glyph_height, xoff, yoff, bitmap)
+    return height, ascent, glyphs
+
+
+def pack(height, ascent, glyphs):
+    """
+    グリフをバイナリ形式に詰めたバイト列を返す
+    """
+    index = []
+    bitmaps = []
+    offset = 0
+    for codepoint in sorted(glyphs):
+        dwidth, width, glyph_height, xoff, yoff, bitmap = glyphs[codepoint]
+        index.append(INDEX_ENTRY.pack(codepoint, dwidth, width, glyph_height, xoff, yoff, offset))
+        bitmaps.append(bitmap)
+        offset += len(bitmap)
+    header = HEADER.pack(MAGIC, height, ascent, len(glyphs))
+    return header + b''.join(index) + b''.join(bitmaps)
+
+
+def local_imports(path, root=ROOT):
+    """
+    Python ソースが import しているモジュールのうち、root 直下にあるものの名前の集合を返す
+    """
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), path)
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split('.')[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+            names.add(node.module.split('.')[0])
+    return {name for name in names if os.path.exists(os.path.join(root, f'{name}.py'))}
+
+
+def reachable_modules(startup=STARTUP_SCRIPT, root=ROOT):
+    """
+    startup から import をたどって届く root 直下の .py の集合を返す（root からの相対パス）
+    """
+    reachable = set()
+    pending = [startup]
+    while pending:
+        path = pending.pop()
+        if path in reachable:
+            continue
+        reachable.add(path)
+        pending.extend(f'{name}.py' for name in local_imports(os.path.join(root, path), root))
+    return reachable
+
+
+def consumer_sources(consumer, root=ROOT):
+    """
+    スクリプト consumer が描く文字列を集めるファイル（consumer から届くモジュール）
+    """
+    return sorted(os.path.join(root, path) for path in reachable_modules(consumer, root))
+
+
+def default_sources():
+    """
+    文字列を集めるファイル（FONT_CONSUMERS から届くモジュール。build.py などツールの文字列は描かないので含めない）
+    """
+    return sorted({path for consumer in FONT_CONSUMERS for path in consumer_sources(consumer)})
+
+
+def build(sources, bdf=DEFAULT_BDF, out=DEFAULT_OUT):
+    """
+    sources の文字列で使う文字のグリフを bdf から取り出して out に書き、結果を1行表示する
+    """
+    start = time.perf_counter()
+    chars = collect_characters(sources)
+    height, ascent, glyphs = parse_bdf(bdf, chars)
+    data = pack(height, ascent, glyphs)
+    with open(out, 'wb') as f:
+        f.write(data)
+    missing = sorted(c for c in chars if ord(c) not in glyphs)
+    print(f"{len(glyphs)} glyphs from {len(sources)} files -> {out} "
+          f"({os.path.getsize(bdf) / 1024:.0f} KB -> {len(data) / 1024:.1f} KB, "
+          f"{time.perf_counter() - start:.2f}s)")
+    if missing:
+        print("not in font: " + ''.join(missing))
+
+
+def missing_glyphs(sources, path=DEFAULT_OUT):
+    """
+    sources の文字列で使う文字のうち、作ってある圧縮フォント path にない文字を並べた文字列を返す
+    （BDF にもない文字も含む）
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    count = HEADER.unpack_from(data, 0)[3]
+    codepoints = {entry[0] for entry in
+                  INDEX_ENTRY.iter_unpack(data[HEADER.size:HEADER.size + INDEX_ENTRY.size * count])}
+    return ''.join(sorted(c for c in collect_characters(sources) if ord(c) not in codepoints))
+
+
+def missing_by_consumer(path=None):
+    """
+    FONT_CONSUMERS のうち、作ってある圧縮フォント path（省略時は DEFAULT_OUT）にない文字を描くものについて
+    {スクリプト: 足りない文字} を返す
+    """
+    if path is None:
+        path = os.path.join(ROOT, DEFAULT_OUT)
+    missing = {consumer: missing_glyphs(consumer_sources(consumer), path) for consumer in FONT_CONSUMERS}
+    return {consumer: chars for consumer, chars in missing.items() if chars}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="使用文字だけに絞った圧縮フォントを作る")
+    parser.add_argument('sources', nargs='*',
+                        help="文字列を集める .py ファイル（省略時は FONT_CONSUMERS から届くモジュール）")
+    parser.add_argument('--bdf', default=DEFAULT_BDF)
+    parser.add_argument('--out', default=DEFAULT_OUT)
+    args = parser.parse_args()
+    build(args.sources or default_sources(), args.bdf, args.out)
+
+
+if __name__ == '__main__':
+    main()
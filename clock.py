@@ -0,0 +1,74 @@
+import time
+
+
+class GameClock:
+    """
+    固定タイムステップのゲーム時計。
+    描画のフレームごとに advance() で経過した実時間をアキュムレータに足し、
+    1ティック（1 / tick_rate 秒）分たまるごとにシミュレーションを1回進めさせる。
+    描画が遅れてもティックの回数で追いつくので、ティック数で数えているタイマーは実時間どおりに進む。
+
+    ただし1フレームで進めるのは max_steps 回までにする。それでも残った遅れは捨てる
+    （処理が追いつかないときに、追いつくための更新でさらに遅れる悪循環を防ぐ）。
+    追いつくために複数回進めたフレームでは、描画を最大 max_skipped_draws 回続けて省略できる。
+
+    描画のフレームレートとティックレートが同じときに、経過時間の揺らぎで
+    「0回・2回・0回…」と進め方がばらつかないよう、1ティックとの差が snap 秒以内の経過時間は
+    ちょうど1ティックとして扱う。
+    """
+    def __init__(self, tick_rate=60, max_steps=4, max_skipped_draws=1, snap=0.002):
+        self.tick_rate = tick_rate
+        self.tick_seconds = 1 / tick_rate
+        self.snap = snap
+        self.max_steps = max_steps
+        self.max_skipped_draws = max_skipped_draws
+        self.reset()
+
+    def reset(self, now=None):
+        self.last = time.perf_counter() if now is None else now
+        self.accumulator = 0.0
+        self.behind = False
+        self.skipped_in_row = 0
+        # 統計：進めたティック数、捨てた遅れ（秒）、省略した描画の回数
+        self.ticks = 0
+        self.dropped_seconds = 0.0
+        self.skipped_draws = 0
+
+    def advance(self, now=None):
+        """
+        前回からの経過時間を加え、このフレームで進めるティック数を返す
+        """
+        now = time.perf_counter() if now is None else now
+        elapsed = max(0.0, now - self.last)
+        self.last = now
+        if abs(elapsed - self.tick_seconds) < self.snap:
+            elapsed = self.tick_seconds
+        self.accumulator += elapsed
+        steps = int(self.accumulator / self.tick_seconds)
+        if steps > self.max_steps:
+            self.dropped_seconds += (steps - self.max_steps) * self.tick_seconds
+            self.accumulator -= (steps - self.max_steps) * self.tick_seconds
+            steps = self.max_steps
+        self.accumulator -= steps * self.tick_seconds
+        self.behind = steps > 1
+        self.ticks += steps
+        return steps
+
+    @property
+    def alpha(self):
+        """
+        次のティックまでの進み具合（0 以上 1 未満）。描画の補間に使える。
+        """
+        return self.accumulator / self.tick_seconds
+
+    def should_draw(self):
+        """
+        このフレームを描画するかどうか。
+        遅れを取り戻している最中のフレームは、続けて max_skipped_draws 回まで描画を省略する。
+        """
+        if self.behind and self.skipped_in_row < self.max_skipped_draws:
+            self.skipped_in_row += 1
+            self.skipped_draws += 1
+            return False
+        self.skipped_in_row = 0
+        return True
@@ -0,0 +1,73 @@
+"""
+弾幕パターンの発射器（エミッタ）。
+emit() に撃つ敵の位置と狙う向き（ラジアン）の配列を渡すと、全員分の弾を
+BulletStore.spawn_many() でまとめて追加する。1体が1回に撃つ弾の数は shots 個。
+発射器は状態を持たず、向きは狙う向きとティック数だけで決まる（スナップショットやリプレイで再現できる）。
+
+Engine.blue_emitter に入れると青の敵の弾がこのパターンになる（None なら従来どおり1発だけ狙って撃つ）。
+ボスなど他の敵からも同じ形で使える。
+
+    game.blue_emitter = Spiral(arms=3, speed=1.5, step=0.3)
+"""
+import math
+
+import numpy as np
+
+
+class Emitter:
+    """
+    狙う向きからのずれ offsets（ラジアン）の方向へ、速さ speed の弾を1体あたり len(offsets) 個撃つ
+    """
+    def __init__(self, offsets, speed):
+        self.offsets = np.asarray(offsets, dtype=np.float64)
+        self.speed = speed
+
+    @property
+    def shots(self):
+        return len(self.offsets)
+
+    def angles(self, aims, tick):
+        """
+        撃つ弾の向き（敵ごとに shots 個ずつ並べた2次元配列）を返す
+        """
+        return aims[:, None] + self.offsets
+
+    def emit(self, store, xs, ys, aims, tick=0):
+        """
+        ティック tick に位置 (xs, ys) の敵が向き aims を狙って撃った弾を store に追加し、
+        追加した範囲の slice を返す
+        """
+        angles = self.angles(np.asarray(aims, dtype=np.float64), tick).ravel()
+        return store.spawn_many(np.repeat(xs, self.shots), np.repeat(ys, self.shots),
+                                np.cos(angles) * self.speed, np.sin(angles) * self.speed)
+
+
+class Radial(Emitter):
+    """
+    全方位に等間隔で count 発撃つ（1発目は狙った向き）
+    """
+    def __init__(self, count, speed):
+        super().__init__(np.arange(count) * (2 * math.pi / count), speed)
+
+
+class Spread(Emitter):
+    """
+    狙った向きを中心に、角度 arc（ラジアン）の扇形に count 発撃つ
+    """
+    def __init__(self, count, arc, speed):
+        offsets = np.linspace(-arc / 2, arc / 2, count) if count > 1 else np.zeros(1)
+        super().__init__(offsets, speed)
+
+
+class Spiral(Radial):
+    """
+    arms 本の腕を持つ渦巻き。全体の向きを1ティックに step（ラジアン）ずつ回す。
+    狙う向きは使わず、ティック数から決まる向きに撃つ。
+    """
+    def __init__(self, arms, speed, step):
+        super().__init__(arms, speed)
+        self.step = step
+
+    def angles(self, aims, tick):
+        phase = (tick * self.step) % (2 * math.pi)
+        return np.broadcast_to(self.offsets + phase, (len(aims), self.shots))
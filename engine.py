@@ -0,0 +1,1098 @@
+import argparse
+import math
+import random
+import struct
+import time
+import zlib
+
+import numpy as np
+
+from entities import (
+    BLUE,
+    CYAN,
+    ENEMY_TYPES,
+    HOMING_SPEED,
+    BulletStore,
+    EnemyStore,
+    SatelliteStore,
+    TokenStore,
+)
+from flowfield import FlowField
+from profiler import FrameProfiler
+from sectors import SectorPool
+from skills import REGISTRY, SKILLS, STAGES, STATS
+from spatial import SpatialHash
+from timeline import Timeline, Wave
+
+# 1秒あたりのティック数。タイマーはすべてティック数で数えるので、秒で決めたものはこれを掛けて使う。
+TICK_RATE = 60
+
+# 電撃フィールドの再充電にかかるティック数（20秒）
+ELECTRIC_FIELD_COOLDOWN = 20 * TICK_RATE
+
+# 定期的に湧く群れ（timeline.Wave）。間隔と数は Engine の属性から読む
+WAVES = (
+    Wave('green_ring', 'ring', 'green', size='green_ring_size', every='green_ring_interval', distance=150),
+    Wave('cyan_wave', 'band', 'cyan', size='cyan_wave_size', every='cyan_wave_interval', priority=1),
+)
+
+# 水色の帯が湧く角（プレイヤーから見た x, y の向き）：右上・左上・右下・左下
+BAND_CORNERS = ((1, -1), (-1, -1), (1, 1), (-1, 1))
+
+# Engine.snapshot() に書くスカラーの状態：(属性名, struct の型)
+SNAPSHOT_FIELDS = (
+    ('player_x', 'd'), ('player_y', 'd'), ('player_size', 'q'), ('player_speed', 'd'),
+    ('base_player_speed', 'd'),
+    ('max_hp', 'q'), ('player_hp', 'q'), ('invincible', '?'), ('invincible_timer', 'q'),
+    ('blink_timer', 'q'),
+    ('player_bullet_speed', 'd'), ('enemy_bullet_speed', 'd'), ('bullet_size', 'q'),
+    ('exp_token_size', 'q'), ('exp_token_speed', 'd'), ('exp_count', 'q'),
+    ('exp_token_magnet_radius', 'q'), ('exp_token_merge_interval', 'q'),
+    ('exp_token_merge_cell', 'q'), ('max_exp_tokens', 'q'),
+    ('skill_level', 'q'), ('next_skill_threshold', 'd'), ('show_skill_select', '?'),
+    ('electric_field_active', '?'), ('electric_field_radius', 'q'),
+    ('electric_field_damage', 'q'), ('electric_field_cooldown', 'q'),
+    ('homing_bullet_speed', 'd'),
+    ('enemy_size', 'q'), ('enemy_speed', 'd'), ('spawn_interval', 'q'), ('spawn_timer', 'q'),
+    ('bullet_cooldown', 'q'), ('cooldown_time', 'q'), ('base_cooldown_time', 'q'), ('min_cooldown', 'q'),
+    ('game_over', '?'), ('paused', '?'), ('score', 'q'), ('level', 'q'),
+    ('base_spawn_interval', 'q'), ('event_timer', 'q'), ('tick_count', 'q'),
+    ('skill_threshold_quadratic', 'q'), ('skill_threshold_linear', 'q'),
+    ('level_threshold_quadratic', 'q'), ('level_threshold_linear', 'q'),
+    ('spawn_interval_step', 'q'), ('min_spawn_interval', 'q'),
+    ('green_ring_interval', 'q'), ('green_ring_size', 'q'),
+    ('cyan_wave_interval', 'q'), ('cyan_wave_size', 'q'),
+)
+SNAPSHOT_MAGIC = b'PXS6'
+SNAPSHOT_HEADER = struct.Struct('<4s' + ''.join(fmt for _, fmt in SNAPSHOT_FIELDS))
+# 乱数の状態：バージョン, gauss_next があるか, gauss_next, 内部状態の長さ
+SNAPSHOT_RNG = struct.Struct('<B?dH')
+# NumPy の乱数（PCG64）の状態：state と inc の下位・上位64ビット, has_uint32, uinteger
+SNAPSHOT_NP_RNG = struct.Struct('<QQQQ?I')
+# スキルの key を NUL で区切った文字列の長さ（選んだスキルと選択肢、取得済みのスキルの2つ）
+SNAPSHOT_NAMES = struct.Struct('<I')
+
+
+def split_u128(value):
+    """
+    128ビットの整数を (下位64ビット, 上位64ビット) に分ける
+    """
+    return value & 0xFFFFFFFFFFFFFFFF, value >> 64
+
+
+class InputState:
+    """
+    1ティック分の入力。エンジンは pyxel を直接読まず、入力ソースからこれを受け取る。
+    """
+    __slots__ = ('click', 'key_t', 'key_u', 'key_y', 'mouse_x', 'mouse_y', 'move', 'reset')
+
+    def __init__(self, mouse_x=128, mouse_y=128, move=False, click=False,
+                 key_t=False, key_y=False, key_u=False, reset=False):
+        self.mouse_x = mouse_x
+        self.mouse_y = mouse_y
+        # マウス左ボタンを押し続けている（プレイヤー移動）
+        self.move = move
+        # マウス左ボタンをこのティックで押した（スキル選択）
+        self.click = click
+        # デバッグキー T / Y / U をこのティックで押した
+        self.key_t = key_t
+        self.key_y = key_y
+        self.key_u = key_u
+        # ゲームオーバー画面でリセットボタンを押した
+        self.reset = reset
+
+
+class NullInput:
+    """
+    何も操作しない入力ソース（ヘッドレス実行用）
+    """
+    def read(self):
+        return InputState()
+
+
+class Engine:
+    """
+    ゲームの状態とシミュレーションをすべて持つヘッドレスなエンジン。
+    pyxel に依存せず、乱数は seed で初期化した専用の Random、入力は input_source から受け取るので、
+    ウィンドウなしで好きなだけ update() を回せる。描画は main.py の App が担当する。
+    """
+    def __init__(self, seed=None, input_source=None):
+        """
+        ゲームの初期化処理を行うコンストラクタ。
+        seed を省略すると毎回異なる乱数列になる。
+        """
+        self.seed = seed
+        self.rng = random.Random(seed)
+        # 配列でまとめて引く乱数（群れの配置など）。生成器を作るのは重いので、self.rng から seed を引いて1つだけ作る
+        self.np_rng = np.random.Generator(np.random.PCG64(self.rng.getrandbits(64)))
+        self.input_source = input_source if input_source is not None else NullInput()
+        self.input = InputState()
+        
+        # -----------------------
+        # プレイヤー関連の設定
+        # -----------------------
+        self.player_x = 0
+        self.player_y = 0
+        self.player_size = 8
+        # 移動速度はスキルの補正を base_player_speed にかけて決める（resolve_stats）
+        self.base_player_speed = 2
+        self.player_speed = self.base_player_speed
+        self.max_hp = 10
+        self.player_hp = self.max_hp
+        self.invincible = False
+        self.invincible_timer = 0
+        self.blink_timer = 0
+        
+        # -----------------------
+        # 弾関連の設定
+        # -----------------------
+        self.player_bullets = BulletStore()
+        self.enemy_bullets = BulletStore(capacity=1024)
+        self.player_bullet_speed = 4
+        self.enemy_bullet_speed = 2
+        self.bullet_size = 3
+        # 青の敵の弾幕パターン（emitters.py の発射器）。None なら1発だけプレイヤーを狙って撃つ
+        self.blue_emitter = None
+        
+        # -----------------------
+        # 経験値トークン関連の設定
+        # -----------------------
+        self.exp_tokens = TokenStore()
+        self.exp_token_size = 4
+        self.exp_token_speed = 1.5
+        self.exp_count = 0
+        # この距離より近いトークンはプレイヤーに吸い寄せる
+        self.exp_token_magnet_radius = 30
+        # 吸い寄せ範囲の外のトークンを、このティック間隔でセルごとに1つにまとめる
+        self.exp_token_merge_interval = 30
+        self.exp_token_merge_cell = 8
+        # 生存中のトークンの上限（超えたらセルを広げてまとめる）
+        self.max_exp_tokens = 256
+        
+        # 「次のスキル取得に必要な累計経験値」を管理する仕組み
+        # n回目に必要な累計経験値は quadratic * n^2 + linear * n
+        self.skill_threshold_quadratic = 5
+        self.skill_threshold_linear = 15
+        self.skill_level = 1
+        self.next_skill_threshold = self.get_skill_threshold(self.skill_level)
+        
+        # -----------------------
+        # スキル関連の設定
+        # -----------------------
+        # 取得したスキルの key（取得した順。同じスキルを重ねて取ると何度も入る）
+        self.skills = []
+        # 取得したスキルのうち、毎ティックの処理を持つもの（段階ごと、呼ぶ順）と描画を持つもの。
+        # スキルを取得したときとリセットしたときだけ rebuild_systems() で作り直す
+        self.combat_systems = ()
+        self.bullet_systems = ()
+        self.draw_systems = ()
+        self.satellites = SatelliteStore()
+        # 電撃フィールド（スキル electric_field で有効になる）
+        self.electric_field_active = False
+        self.electric_field_radius = 20
+        self.electric_field_damage = 1
+        self.electric_field_cooldown = 0
+        # 誘導弾（スキル homing_bullets）の速さ
+        self.homing_bullet_speed = self.player_bullet_speed
+        self.show_skill_select = False
+        self.skill_options = []
+        self.selected_skill = None
+        
+        # -----------------------
+        # 敵関連の設定
+        # -----------------------
+        self.enemies = EnemyStore()
+        self.enemy_size = 8
+        self.enemy_speed = 1.5
+        
+        # 衝突判定用の空間ハッシュ
+        self.enemy_grid = SpatialHash(self.enemy_size)
+        # 追尾する敵が進む向きを引く流れ場（flowfield.FlowField）。None なら全員がプレイヤーへの向きをそれぞれ計算する。
+        # 地形がなければ向きを計算するのと速さは変わらず（追尾する敵が3000体ほどで並ぶ）、向きがわずかに変わるので
+        # 既定では使わない（--flow-field で有効にする）
+        self.flow_field = None
+        
+        # 敵の更新の詳細度（LOD）：(距離, 周期) の組を距離の昇順に並べる。
+        # プレイヤーからその距離以上離れた敵は、追尾の向きと弾のタイマーを周期ティックごとにまとめて更新する
+        # （移動そのものは毎ティック行う）。空にすると全員を毎ティック更新する
+        self.enemy_lod_bands = ((200, 2), (300, 4))
+        # 1ティックに更新する敵の数の上限（近くの敵は必ず更新し、遠くの敵を次に回す）。None なら無制限
+        self.enemy_lod_budget = 400
+        # 敵の多いティックをセクターに分けて並列に更新するスレッドプール（sectors.SectorPool）。
+        # None なら1スレッドで順に更新する（結果はどちらでも同じ）
+        self.sector_pool = None
+
+        # 通常の敵スポーン
+        self.spawn_interval = 30
+        self.spawn_timer = 0
+        
+        # -----------------------
+        # 弾のクールダウン設定
+        # -----------------------
+        self.bullet_cooldown = 0
+        # 発射間隔はスキルの補正を base_cooldown_time にかけて決める（min_cooldown より短くはしない）
+        self.base_cooldown_time = 30
+        self.cooldown_time = self.base_cooldown_time
+        self.min_cooldown = 5
+        
+        # -----------------------
+        # ゲーム状態の管理
+        # -----------------------
+        self.game_over = False
+        self.paused = False
+        self.score = 0
+        self.level = 1
+        # レベル n に上がるのに必要なスコアは level_threshold_quadratic * n^2 + level_threshold_linear * n
+        # （スキルの閾値とは別に調整できる）
+        self.level_threshold_quadratic = 5
+        self.level_threshold_linear = 15
+        self.base_spawn_interval = 30
+        # レベルが1上がるごとに spawn_interval を spawn_interval_step ずつ縮める（min_spawn_interval まで）
+        self.spawn_interval_step = 2
+        self.min_spawn_interval = 10
+        self.last_key_pressed = None
+        
+        # -----------------------
+        # イベント管理用タイマー
+        # -----------------------
+        self.event_timer = 0
+        self.tick_count = 0
+        # 定期的に湧く群れの間隔（ティック数）と数
+        self.green_ring_interval = 30 * TICK_RATE
+        self.green_ring_size = 30
+        self.cyan_wave_interval = 45 * TICK_RATE
+        self.cyan_wave_size = 50
+        # 群れの予定表。配置は湧く lead ティック前から前もって作り、湧いた群れの敵は1ティックに spawn_budget 体ずつ出す
+        # （None なら一度に全員）
+        self.timeline = Timeline(WAVES)
+        self.spawn_budget = 16
+
+        # 区間ごとの処理時間の計測（既定では無効）
+        self.profiler = FrameProfiler()
+
+    def get_skill_threshold(self, nth):
+        """
+        n回目のスキル取得に必要な累計経験値を返す。
+        既定では 5n^2 + 15n の形で増えていく。
+        """
+        return self.skill_threshold_quadratic * (nth**2) + self.skill_threshold_linear * nth
+
+    def get_level_threshold(self, level):
+        """
+        レベル level から1つ上がるのに必要なスコアを返す。
+        既定では 5n^2 + 15n の形で増えていく。
+        """
+        return self.level_threshold_quadratic * (level**2) + self.level_threshold_linear * level
+    
+    def run(self, ticks):
+        """
+        update() を ticks 回、待ち時間なしで続けて実行する
+        """
+        for _ in range(ticks):
+            self.update()
+
+    def update(self):
+        """
+        メインの更新メソッド。1ティックごとに呼び出す。
+        """
+        self.profiler.begin_tick()
+        self.input = self.input_source.read()
+        self.tick_count += 1
+
+        # ゲームオーバー時はリセットの入力だけを受け付ける
+        if self.game_over:
+            if self.input.reset:
+                self.reset_game()
+            return
+        
+        # スキル選択画面が表示されている場合
+        if self.show_skill_select:
+            self.update_skill_select()
+        else:
+            self.update_game()
+
+        self.profiler.set_counts(len(self.enemies), len(self.player_bullets) + len(self.enemy_bullets),
+                                 len(self.exp_tokens))
+
+    def entity_stores(self):
+        """
+        エンティティの置き場をすべて決まった順に返す（チェックサムとスナップショットの順番）
+        """
+        return (self.enemies, self.player_bullets, self.enemy_bullets, self.exp_tokens, self.satellites)
+
+    def checksum(self):
+        """
+        シミュレーションの状態（プレイヤー・エンティティの位置・乱数の状態など）の CRC32 を返す。
+        リプレイの再生で、記録したときと状態がずれていないかを確かめるのに使う。
+        """
+        crc = zlib.crc32(struct.pack(
+            '<ddqqqqq??', self.player_x, self.player_y, self.player_hp, self.score,
+            self.exp_count, self.tick_count, self.event_timer, self.game_over, self.show_skill_select))
+        for store in self.entity_stores():
+            n = store.count
+            for column in (store.alive, store.x, store.y):
+                crc = zlib.crc32(column[:n].tobytes(), crc)
+        crc = zlib.crc32(np.array(self.rng.getstate()[1], dtype=np.uint32).tobytes(), crc)
+        return crc
+
+    def snapshot(self):
+        """
+        シミュレーションの状態をすべてバイト列にする（pickle は使わない）。
+        入力ソース・プロファイラ・LOD の設定・発射器（blue_emitter）・群れの定義は含めない
+        （群れの予定と待ち行列は含める）。restore() で元に戻せる。
+        """
+        version, internal, gauss_next = self.rng.getstate()
+        np_state = self.np_rng.bit_generator.state
+        names = '\0'.join([self.selected_skill or ''] +
+                           [option.key for option in self.skill_options]).encode('utf-8')
+        skills = '\0'.join(self.skills).encode('utf-8')
+        parts = [
+            SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, *[getattr(self, name) for name, _ in SNAPSHOT_FIELDS]),
+            SNAPSHOT_RNG.pack(version, gauss_next is not None, gauss_next or 0.0, len(internal)),
+            np.array(internal, dtype=np.uint32).tobytes(),
+            SNAPSHOT_NP_RNG.pack(*split_u128(np_state['state']['state']), *split_u128(np_state['state']['inc']),
+                                 bool(np_state['has_uint32']), np_state['uinteger']),
+            SNAPSHOT_NAMES.pack(len(names)),
+            names,
+            SNAPSHOT_NAMES.pack(len(skills)),
+            skills,
+        ]
+        parts.extend(store.pack() for store in self.entity_stores())
+        parts.append(self.timeline.pack())
+        return b''.join(parts)
+
+    def restore(self, data):
+        """
+        snapshot() で作ったバイト列から状態を戻す。空間ハッシュは次のティックで作り直される。
+        能力値はスナップショットの値をそのまま使い、スキルの処理の一覧だけを作り直す。
+        """
+        values = SNAPSHOT_HEADER.unpack_from(data, 0)
+        if values[0] != SNAPSHOT_MAGIC:
+            raise ValueError("not an engine snapshot")
+        for (name, _), value in zip(SNAPSHOT_FIELDS, values[1:]):
+            setattr(self, name, value)
+        offset = SNAPSHOT_HEADER.size
+
+        version, has_gauss, gauss_next, length = SNAPSHOT_RNG.unpack_from(data, offset)
+        offset += SNAPSHOT_RNG.size
+        internal = np.frombuffer(data, dtype=np.uint32, count=length, offset=offset)
+        offset += internal.nbytes
+        self.rng.setstate((version, tuple(internal.tolist()), gauss_next if has_gauss else None))
+
+        state_lo, state_hi, inc_lo, inc_hi, has_uint32, uinteger = SNAPSHOT_NP_RNG.unpack_from(data, offset)
+        offset += SNAPSHOT_NP_RNG.size
+        self.np_rng.bit_generator.state = {
+            'bit_generator': 'PCG64',
+            'state': {'state': state_hi << 64 | state_lo, 'inc': inc_hi << 64 | inc_lo},
+            'has_uint32': int(has_uint32),
+            'uinteger': uinteger,
+        }
+
+        (length,) = SNAPSHOT_NAMES.unpack_from(data, offset)
+        offset += SNAPSHOT_NAMES.size
+        names = data[offset:offset + length].decode('utf-8').split('\0')
+        offset += length
+        self.selected_skill = names[0] or None
+        self.skill_options = [REGISTRY[key] for key in names[1:]]
+
+        (length,) = SNAPSHOT_NAMES.unpack_from(data, offset)
+        offset += SNAPSHOT_NAMES.size
+        self.skills = [key for key in data[offset:offset + length].decode('utf-8').split('\0') if key]
+        offset += length
+        self.rebuild_systems()
+
+        for store in self.entity_stores():
+            offset = store.unpack(data, offset)
+        self.timeline.unpack(data, offset)
+        self.enemy_grid.clear()
+
+    def update_skill_select(self):
+        """
+        スキル選択画面の更新処理
+        """
+        # マウスクリックでスキル決定
+        if self.input.click:
+            mx = self.input.mouse_x
+            my = self.input.mouse_y
+            
+            # スキル1の領域 (60, 90) - (200, 125)
+            if 60 <= mx <= 200 and 90 <= my <= 125:
+                self.selected_skill = self.skill_options[0].key
+                self.grant_skill(self.selected_skill)
+                self.finish_skill_select()
+                return
+                
+            # スキル2の領域 (60, 125) - (200, 160)
+            if 60 <= mx <= 200 and 125 <= my <= 160:
+                self.selected_skill = self.skill_options[1].key
+                self.grant_skill(self.selected_skill)
+                self.finish_skill_select()
+                return
+                
+            # スキル3の領域 (60, 160) - (200, 195)
+            if 60 <= mx <= 200 and 160 <= my <= 195:
+                self.selected_skill = self.skill_options[2].key
+                self.grant_skill(self.selected_skill)
+                self.finish_skill_select()
+                return
+
+    def finish_skill_select(self):
+        """
+        スキル選択が終わった後の処理。
+        - スキルウィンドウを閉じる
+        - 次のスキル閾値を再計算する
+        """
+        self.show_skill_select = False
+        self.paused = False
+        
+        # 次のスキル閾値を設定
+        self.skill_level += 1
+        self.next_skill_threshold = self.get_skill_threshold(self.skill_level)
+
+    def update_game(self):
+        """
+        メインのゲームロジックをすべてここで処理
+        """
+        prof = self.profiler
+
+        # ------------------------------------------------------------
+        # デバッグ用：Tキーで経験値トークンを20個獲得
+        # ------------------------------------------------------------
+        if self.input.key_t:
+            self.exp_count += 20
+            self.score += 20
+
+        # ------------------------------------------------------------
+        # デバッグ用：Yキー(緑色一斉包囲), Uキー(水色の帯状大群)
+        # ------------------------------------------------------------
+        if self.input.key_y:
+            self.spawn_green_ring(num_enemies=20, distance=150)
+        if self.input.key_u:
+            self.spawn_cyan_wave(num_enemies=30)
+
+        # ------------------------------------------------------------
+        # スコアを元にしたレベル管理
+        # ------------------------------------------------------------
+        new_level = 1
+        while self.score >= self.get_level_threshold(new_level):
+            new_level += 1
+        if new_level > self.level:
+            self.level = new_level
+            self.spawn_interval = max(self.min_spawn_interval,
+                                      self.base_spawn_interval - self.level * self.spawn_interval_step)
+
+        # ------------------------------------------------------------
+        # プレイヤー移動（マウス左クリックで中央からマウス位置方向へ移動）
+        # ------------------------------------------------------------
+        if self.input.move:
+            dx = self.input.mouse_x - 128
+            dy = self.input.mouse_y - 128
+            dist = math.hypot(dx, dy)
+            if dist > 0:
+                self.player_x += dx / dist * self.player_speed
+                self.player_y += dy / dist * self.player_speed
+
+        # ------------------------------------------------------------
+        # 通常敵のスポーン
+        # ------------------------------------------------------------
+        self.spawn_timer += 1
+        if self.spawn_timer >= self.spawn_interval:
+            self.spawn_enemy()
+            self.spawn_timer = 0
+
+        # ------------------------------------------------------------
+        # イベント管理（予定表で時刻の来た群れを待ち行列に積み、1ティックに spawn_budget 体まで出す）
+        # ------------------------------------------------------------
+        self.event_timer += 1
+        self.timeline.advance(self, self.event_timer)
+        queue = self.timeline.queue
+        if len(queue):
+            self.spawn_plan(*queue.pop(len(queue) if self.spawn_budget is None else self.spawn_budget))
+
+        prof.mark('spawn')
+
+        # ------------------------------------------------------------
+        # 敵の移動や弾発射（全員分を一括で計算）
+        # ------------------------------------------------------------
+        enemies = self.enemies
+        n = enemies.count
+        ex = enemies.x[:n]
+        ey = enemies.y[:n]
+        evx = enemies.vx[:n]
+        evy = enemies.vy[:n]
+        etype = enemies.type_id[:n]
+
+        # このティックに向きを決め直す敵を選ぶ（遠くの敵は数ティックに1回）
+        due = self.enemy_lod_due(n)
+        dt = enemies.lod_age[due]
+        type_due = etype[due]
+
+        # 青は1秒ごとにプレイヤーへ向けて弾を撃つ（タイマーは前回から経ったティック数分進める）。
+        # 狙う向きは元の実装と同じく移動前の位置から決め、弾は移動後の位置から出す
+        blue = type_due == BLUE
+        enemies.shoot_timer[due[blue]] += dt[blue]
+        shooters = due[np.flatnonzero(blue & (enemies.shoot_timer[due] >= TICK_RATE))]
+        # 弾は進む向きではなくプレイヤーへまっすぐ狙う
+        aim_x, aim_y, _ = self.heading_to_player(ex[shooters], ey[shooters])
+
+        # 向きを決め直してから、向きを決め直さなかった敵も含めて全員を毎ティック動かす
+        if self.flow_field is not None:
+            self.flow_field.update(self.player_x, self.player_y)
+        pool = self.sector_pool
+        parallel = pool is not None and n >= pool.min_enemies
+        if parallel:
+            dist = pool.move_enemies(self, due, self.enemy_grid.cell_size)
+        else:
+            dist = self.steer_enemies(due)
+            ex += evx
+            ey += evy
+
+        if len(shooters):
+            if self.blue_emitter is None:
+                self.enemy_bullets.spawn_many(ex[shooters], ey[shooters],
+                                              aim_x * self.enemy_bullet_speed,
+                                              aim_y * self.enemy_bullet_speed)
+            else:
+                self.blue_emitter.emit(self.enemy_bullets, ex[shooters], ey[shooters],
+                                       np.arctan2(aim_y, aim_x), self.tick_count)
+            enemies.shoot_timer[shooters] -= TICK_RATE
+
+        # 向きを決め直した敵は、プレイヤーからの距離で次に決め直すまでのティック数を決める
+        enemies.lod_age[due] = 0
+        enemies.lod_wait[due] = self.enemy_lod_wait(due, dist)
+
+        # 画面外判定
+        margin = 180
+        screen_x = ex - self.player_x + 128
+        screen_y = ey - self.player_y + 128
+        enemies.despawn_mask((screen_x < -margin) | (screen_x > 256 + margin) |
+                             (screen_y < -margin) | (screen_y > 256 + margin))
+
+        # 移動後の位置で空間ハッシュを作り直す
+        self.enemy_grid.rebuild(ex, ey, enemies.alive[:n], sort=pool.sort_keys if parallel else None)
+
+        # ------------------------------------------------------------
+        # プレイヤーと敵の衝突判定
+        # ------------------------------------------------------------
+        if not self.invincible:
+            for i in self.enemy_grid.query(self.player_x, self.player_y, self.player_size).tolist():
+                dist_pe = math.hypot(self.player_x - enemies.x[i], self.player_y - enemies.y[i])
+                if dist_pe < self.player_size:
+                    self.player_hp -= 3
+                    self.kill_enemy(i, reward=False)
+                    if self.player_hp <= 0:
+                        self.player_hp = 0
+                        self.game_over = True
+                    else:
+                        self.invincible = True
+                        self.invincible_timer = 3 * TICK_RATE
+                    break
+
+        prof.mark('enemies')
+
+        # ------------------------------------------------------------
+        # 敵の弾（プレイヤーとの衝突判定）
+        # ------------------------------------------------------------
+        bullets = self.enemy_bullets
+        nb = bullets.count
+        if not self.invincible and nb:
+            dist_pb = np.hypot(bullets.x[:nb] - self.player_x, bullets.y[:nb] - self.player_y)
+            hit = np.flatnonzero((dist_pb < self.player_size) & bullets.alive[:nb])
+            # 1ティックに当たるのは添字の最も小さい1発だけ
+            if len(hit):
+                self.player_hp -= 1
+                if self.player_hp <= 0:
+                    self.player_hp = 0
+                    self.game_over = True
+                bullets.despawn(int(hit[0]))
+
+        prof.mark('enemy_bullets')
+
+        # ------------------------------------------------------------
+        # 無敵処理
+        # ------------------------------------------------------------
+        if self.invincible:
+            self.invincible_timer -= 1
+            self.blink_timer += 1
+            if self.invincible_timer <= 0:
+                self.invincible = False
+                self.blink_timer = 0
+
+        prof.mark('invincible')
+
+        # ------------------------------------------------------------
+        # 取得したスキルの処理（電撃フィールド・衛星など）
+        # ------------------------------------------------------------
+        for system in self.combat_systems:
+            system.update(self)
+            prof.mark(system.key)
+
+        # ------------------------------------------------------------
+        # 弾のクールダウン
+        # ------------------------------------------------------------
+        if self.bullet_cooldown > 0:
+            self.bullet_cooldown -= 1
+
+        # ------------------------------------------------------------
+        # 自動誘導弾発射
+        # ------------------------------------------------------------
+        if self.bullet_cooldown <= 0 and len(self.enemies) > 0:
+            nearest_enemy = self.enemy_grid.nearest(self.player_x, self.player_y)
+            
+            if nearest_enemy is not None:
+                dx = float(self.enemies.x[nearest_enemy]) - self.player_x
+                dy = float(self.enemies.y[nearest_enemy]) - self.player_y
+                angle = math.atan2(dy, dx)
+
+                self.player_bullets.spawn(self.player_x, self.player_y,
+                                          math.cos(angle) * self.player_bullet_speed,
+                                          math.sin(angle) * self.player_bullet_speed)
+                self.bullet_cooldown = self.cooldown_time
+
+        prof.mark('auto_aim')
+
+        # ------------------------------------------------------------
+        # 弾の更新（両方の弾をまとめて進め、画面外に出た弾を消す）& 敵との衝突判定
+        # ------------------------------------------------------------
+        for system in self.bullet_systems:
+            system.update(self)
+        left = self.player_x - 128
+        top = self.player_y - 128
+        self.player_bullets.advance(left, top, left + 256, top + 256)
+        self.enemy_bullets.advance(left, top, left + 256, top + 256)
+        self.hit_enemies_with_bullets()
+
+        prof.mark('bullets')
+
+        # ------------------------------------------------------------
+        # 経験値トークンの更新（吸い寄せと取得を一括で計算）
+        # ------------------------------------------------------------
+        tokens = self.exp_tokens
+        nt = tokens.count
+        dx = tokens.x[:nt] - self.player_x
+        dy = tokens.y[:nt] - self.player_y
+        # 吸い寄せの計算は、まず四角い範囲で絞り込んだトークンだけにする
+        magnet = self.exp_token_magnet_radius
+        candidates = np.flatnonzero((np.abs(dx) < magnet) & (np.abs(dy) < magnet))
+        distance = np.hypot(dx[candidates], dy[candidates])
+        near = (distance < magnet) & (distance > 0)
+        pulled = candidates[near]
+        pull = self.exp_token_speed * 2 / distance[near]
+        tokens.x[pulled] -= dx[pulled] * pull
+        tokens.y[pulled] -= dy[pulled] * pull
+
+        picked = candidates[(distance < self.player_size) & tokens.alive[candidates]]
+        self.exp_count += int(tokens.value[picked].sum())
+        mask = np.zeros(nt, dtype=bool)
+        mask[picked] = True
+        tokens.despawn_mask(mask)
+
+        if (self.event_timer % self.exp_token_merge_interval == 0 or
+                len(tokens) > self.max_exp_tokens):
+            self.merge_exp_tokens()
+
+        prof.mark('exp_tokens')
+
+        # ------------------------------------------------------------
+        # 「次のスキル取得に必要な経験値」を超えたか
+        # ------------------------------------------------------------
+        if (self.exp_count >= self.next_skill_threshold
+            and not self.show_skill_select):
+            self.show_skill_select = True
+            self.paused = True
+            self.generate_skill_options()
+
+        prof.mark('skill_threshold')
+
+        # このフレームで削除の印が付いたものをまとめて取り除く
+        self.enemies.flush()
+        self.player_bullets.flush()
+        self.enemy_bullets.flush()
+        self.exp_tokens.flush()
+        prof.mark('flush')
+
+    def heading_to_player(self, xs, ys):
+        """
+        位置 (xs, ys) からプレイヤーへの単位ベクトル (ux, uy) と距離の配列を返す（距離0なら右向き）
+        """
+        dx = self.player_x - xs
+        dy = self.player_y - ys
+        dist = np.hypot(dx, dy)
+        ux = np.divide(dx, dist, out=np.ones(len(dist)), where=dist > 0)
+        uy = np.divide(dy, dist, out=np.zeros(len(dist)), where=dist > 0)
+        return ux, uy, dist
+
+    def update_electric_field(self):
+        """
+        電撃フィールド：充電が終わっていれば半径内の敵にダメージを与え、1体でも倒したら再充電を始める
+        """
+        if not self.electric_field_active:
+            self.electric_field_cooldown -= 1
+            if self.electric_field_cooldown <= 0:
+                self.electric_field_active = True
+
+        if self.electric_field_active:
+            enemy_hit = False
+            enemies = self.enemies
+            candidates = self.enemy_grid.query(
+                self.player_x, self.player_y, self.electric_field_radius)
+            for i in candidates.tolist():
+                distance = math.hypot(self.player_x - enemies.x[i], self.player_y - enemies.y[i])
+                if distance < self.electric_field_radius:
+                    enemies.hp[i] -= self.electric_field_damage
+                    if enemies.hp[i] <= 0:
+                        self.kill_enemy(i)
+                        enemy_hit = True
+            if enemy_hit:
+                self.electric_field_active = False
+                self.electric_field_cooldown = ELECTRIC_FIELD_COOLDOWN
+
+    def steer_enemies(self, due):
+        """
+        添字 due の敵の速度を決め直し、プレイヤーまでの距離の配列を返す。
+        赤・青・緑はプレイヤーへ向かう単位ベクトル方向に進む（流れ場から引く。距離0なら右向き）。
+        水色は生成時の速度のまま直進する。
+        """
+        enemies = self.enemies
+        if self.flow_field is None:
+            ux, uy, dist = self.heading_to_player(enemies.x[due], enemies.y[due])
+        else:
+            ux, uy, dist = self.flow_field.steer(enemies.x[due], enemies.y[due])
+        type_due = enemies.type_id[due]
+        homing = type_due != CYAN
+        speed = HOMING_SPEED[type_due] * self.enemy_speed
+        enemies.vx[due[homing]] = ux[homing] * speed[homing]
+        enemies.vy[due[homing]] = uy[homing] * speed[homing]
+        return dist
+
+    def steer_homing_bullets(self):
+        """
+        プレイヤーの弾を、添字の順にそれぞれ最も近い敵の方向へ向け直す。
+        1発ずつ「向け直す→進む→当たった敵を倒す」を順に行っていた処理と同じ相手を狙うように、
+        向け直した弾がこのティックの移動の後に当たる敵はその場で倒して弾を消し、後の弾の狙う先から外す。
+        画面外に出る弾もここで消す（消す順番で置き場の並びが決まるので、1発ずつの処理と同じ順に消す）。
+        弾の移動は、この後の BulletStore.advance でまとめて行う。
+        """
+        bullets = self.player_bullets
+        enemies = self.enemies
+        grid = self.enemy_grid
+        speed = self.homing_bullet_speed
+        size = self.enemy_size
+        left = self.player_x - 128
+        top = self.player_y - 128
+        for i in np.flatnonzero(bullets.alive[:bullets.count]).tolist():
+            nearest_enemy = grid.nearest(bullets.x[i], bullets.y[i])
+            if nearest_enemy is None:
+                break
+            dx = float(enemies.x[nearest_enemy] - bullets.x[i])
+            dy = float(enemies.y[nearest_enemy] - bullets.y[i])
+            angle = math.atan2(dy, dx)
+            vx = bullets.vx[i] = math.cos(angle) * speed
+            vy = bullets.vy[i] = math.sin(angle) * speed
+            # 進んだ後の位置（画面外に出る弾は当たらずに消える）
+            x = float(bullets.x[i]) + vx
+            y = float(bullets.y[i]) + vy
+            if x < left or x > left + 256 or y < top or y > top + 256:
+                bullets.despawn(i)
+                continue
+            # 最も近い敵でも、進んだ分を引いて size 以上離れていれば当たる敵はいない
+            if math.hypot(dx, dy) >= size + speed + 1:
+                continue
+            for j in grid.query(x, y, size).tolist():
+                if math.hypot(x - enemies.x[j], y - enemies.y[j]) < size:
+                    self.kill_enemy(j)
+                    bullets.despawn(i)
+                    break
+
+    def hit_enemies_with_bullets(self):
+        """
+        プレイヤーの弾と敵の衝突判定。当たった (弾, 敵) の組を集め（bullet_hits）、
+        弾の添字の昇順に、まだ生きている敵のうち添字の最も小さい1体を倒す。
+        """
+        bullets = self.player_bullets
+        live = np.flatnonzero(bullets.alive[:bullets.count])
+        pool = self.sector_pool
+        if pool is not None and len(live) >= pool.min_bullets and len(self.enemy_grid) >= pool.min_enemies:
+            bullet_ids, enemy_ids = pool.bullet_hits(self, live, self.enemy_grid.cell_size)
+        else:
+            bullet_ids, enemy_ids = self.bullet_hits(live)
+        for i, j in zip(bullet_ids.tolist(), enemy_ids.tolist()):
+            if bullets.alive[i] and self.enemy_grid.alive[j]:
+                self.kill_enemy(j)
+                bullets.despawn(i)
+
+    def bullet_hits(self, live):
+        """
+        添字 live（昇順）の弾の近くの敵を空間ハッシュからまとめて集め、(弾, 敵) の組の距離を一括で計算する。
+        当たった組を弾の添字の昇順、同じ弾の中では敵の添字の昇順に、弾の添字と敵の添字の2つの配列で返す。
+        """
+        bullets = self.player_bullets
+        enemies = self.enemies
+        rows, candidates = self.enemy_grid.query_many(bullets.x[live], bullets.y[live], self.enemy_size)
+        bullet_ids = live[rows]
+        hit = np.hypot(bullets.x[bullet_ids] - enemies.x[candidates],
+                       bullets.y[bullet_ids] - enemies.y[candidates]) < self.enemy_size
+        return bullet_ids[hit], candidates[hit]
+
+    def enemy_lod_wait(self, due, dist):
+        """
+        添字 due の敵について、プレイヤーからの距離 dist から次に向きを決め直すまでのティック数を返す。
+        周期 p の敵は ID でずらして p ティックに1回ずつ順番に更新する
+        （同じティックに湧いた敵がいっせいに更新されないように）。
+        """
+        period = np.ones(len(due), dtype=np.int64)
+        for threshold, band_period in self.enemy_lod_bands:
+            period[dist >= threshold] = band_period
+        return period - (self.enemies.ids[due] + self.tick_count) % period
+
+    def enemy_lod_due(self, n):
+        """
+        このティックに向きを決め直す敵の添字を返す。全員の lod_age を1増やし、lod_wait を1減らす。
+        その数が enemy_lod_budget を超えるときは、遠くの敵のうち長く待っているものから選び、
+        残りは lod_wait が0以下のまま次のティックに回す。
+        """
+        enemies = self.enemies
+        age = enemies.lod_age[:n]
+        wait = enemies.lod_wait[:n]
+        age += 1
+        wait -= 1
+        due_mask = (wait <= 0) & enemies.alive[:n]
+        due = np.flatnonzero(due_mask)
+        budget = self.enemy_lod_budget
+        if budget is not None and len(due) > budget:
+            # 前回から1ティックしか経っていない敵は、毎ティック更新している近くの敵
+            far = due[age[due] > 1]
+            room = max(0, budget - (len(due) - len(far)))
+            if len(far) > room:
+                order = np.argpartition(-age[far], room) if room else slice(None)
+                due_mask[far[order][room:]] = False
+                due = np.flatnonzero(due_mask)
+        return due
+
+    def merge_exp_tokens(self):
+        """
+        吸い寄せ範囲の外にある経験値トークンを、近いものどうし1つにまとめる。
+        それでも max_exp_tokens を超えていれば、セルを倍々に広げてまとめ直す。
+        """
+        tokens = self.exp_tokens
+        n = tokens.count
+        reach = self.exp_token_magnet_radius + self.exp_token_merge_cell
+        eligible = np.hypot(tokens.x[:n] - self.player_x, tokens.y[:n] - self.player_y) >= reach
+        cell = self.exp_token_merge_cell
+        tokens.merge(cell, eligible)
+        while len(tokens) > self.max_exp_tokens and cell < 1024:
+            cell *= 2
+            tokens.merge(cell, eligible)
+
+    def kill_enemy(self, i, reward=True):
+        """
+        添字 i の敵を倒す。reward が真ならスコアと経験値トークンを与える。
+        """
+        self.enemies.despawn(i)
+        self.enemy_grid.remove(i)
+        if reward:
+            self.score += 1
+            self.exp_tokens.spawn(self.enemies.x[i], self.enemies.y[i])
+
+    def spawn_enemy(self):
+        """
+        一定距離離れた円周上に1体だけランダムなタイプの敵をスポーンさせる
+        """
+        angle = self.rng.uniform(0, math.pi * 2)
+        spawn_radius = 180
+        spawn_x = self.player_x + math.cos(angle) * spawn_radius
+        spawn_y = self.player_y + math.sin(angle) * spawn_radius
+        
+        enemy_type = self.rng.choice(['red', 'blue', 'green'])
+        
+        self.enemies.spawn(spawn_x, spawn_y, enemy_type)
+
+    def spawn_green_ring(self, num_enemies=8, distance=120):
+        """
+        緑色の敵を円形に大量配置して包囲させるイベント（その場で全員を出す）
+        """
+        self.spawn_plan(*self.plan_ring(num_enemies, 'green', distance))
+
+    def spawn_cyan_wave(self, num_enemies=120):
+        """
+        水色の帯状大群をスポーン（その場で全員を出す）
+        """
+        self.spawn_plan(*self.plan_band(num_enemies, 'cyan'))
+
+    def spawn_plan(self, dx, dy, vx, vy, type_id):
+        """
+        配置（プレイヤーからの相対位置・速度・タイプの配列）どおりに敵をまとめて出す
+        """
+        self.enemies.spawn_many(self.player_x + dx, self.player_y + dy, type_id, vx, vy)
+
+    def plan_ring(self, size, enemy, distance=120):
+        """
+        プレイヤーを中心に半径 distance の円周上に等間隔に並べる配置（止まった状態で湧き、あとは追尾する）
+        """
+        angle = (2 * math.pi / size) * np.arange(size)
+        return np.cos(angle) * distance, np.sin(angle) * distance, 0.0, 0.0, ENEMY_TYPES.index(enemy)
+
+    def plan_band(self, size, enemy, distance=180, width=120, height=80, speed=5, spread=0.2):
+        """
+        斜め4方向のどれか（プレイヤーから x, y とも distance 離れた点）を中心にした width x height の帯に散らばり、
+        プレイヤーの方向（±spread ラジアンのぶれ付き）へ速さ speed で直進する配置
+        """
+        sign_x, sign_y = self.rng.choice(BAND_CORNERS)
+        # 全員分の乱数は NumPy の乱数でまとめて引く
+        uniform = self.np_rng.uniform
+        dx = sign_x * distance + uniform(-width / 2, width / 2, size)
+        dy = sign_y * distance + uniform(-height / 2, height / 2, size)
+        angle = np.arctan2(-dy, -dx) + uniform(-spread, spread, size)
+        return dx, dy, np.cos(angle) * speed, np.sin(angle) * speed, ENEMY_TYPES.index(enemy)
+
+    def add_satellite(self):
+        """
+        衛星を追加し、既存の衛星を等間隔に再配置
+        """
+        satellites = self.satellites
+        total = satellites.count + 1
+        satellites.angle[:satellites.count] = (2 * math.pi / total) * np.arange(satellites.count)
+        satellites.spawn((2 * math.pi / total) * (total - 1))
+        satellites.place(self.player_x, self.player_y)
+
+    def update_satellites(self):
+        """
+        すべての衛星の角度を進めて位置を計算し、敵との接触をまとめて判定する。
+        敵の候補は、どの衛星にも届きうるプレイヤー中心の範囲から1回だけ取り出す。
+        倒す順番は「最初に当たった衛星の番号、敵の添字」の順で、衛星を1基ずつ処理した場合と同じになる。
+        """
+        satellites = self.satellites
+        n = satellites.count
+        if n == 0:
+            return
+        angle = satellites.angle[:n]
+        angle += satellites.speed[:n]
+        angle[angle > math.pi * 2] -= math.pi * 2
+        satellites.place(self.player_x, self.player_y)
+
+        radius = satellites.size[:n] + self.enemy_size
+        reach = float(satellites.distance[:n].max() + radius.max())
+        candidates = self.enemy_grid.query(self.player_x, self.player_y, reach)
+        if len(candidates) == 0:
+            return
+        enemies = self.enemies
+        dist = np.hypot(satellites.x[:n, None] - enemies.x[candidates],
+                        satellites.y[:n, None] - enemies.y[candidates])
+        hits = dist < radius[:, None]
+        hit = hits.any(axis=0)
+        if not hit.any():
+            return
+        victims = candidates[hit]
+        first = hits[:, hit].argmax(axis=0)
+        for i in victims[np.lexsort((victims, first))].tolist():
+            self.kill_enemy(i)
+
+    def reset_game(self):
+        """
+        ゲームの状態を初期化する
+        """
+        self.player_x = 0
+        self.player_y = 0
+        self.player_hp = self.max_hp
+        self.score = 0
+        self.exp_count = 0
+        self.player_bullets.clear()
+        self.enemy_bullets.clear()
+        self.enemies.clear()
+        self.exp_tokens.clear()
+        self.enemy_grid.clear()
+        self.skills.clear()
+        self.satellites.clear()
+        self.game_over = False
+        self.paused = False
+        self.show_skill_select = False
+        self.level = 1
+        self.spawn_interval = self.base_spawn_interval
+        self.event_timer = 0
+        self.timeline.reset()
+
+        self.electric_field_active = False
+        self.electric_field_cooldown = 0
+
+        self.skill_level = 1
+        self.next_skill_threshold = self.get_skill_threshold(self.skill_level)
+        # スキルの補正をなくした能力値に戻す
+        self.resolve_stats()
+        self.rebuild_systems()
+
+    def grant_skill(self, key):
+        """
+        スキル key（skills.REGISTRY の key）を取得する。
+        取得したときの効果を行い、能力値とスキルの処理の一覧を作り直す。
+        """
+        self.skills.append(key)
+        REGISTRY[key].apply(self)
+        self.resolve_stats()
+        self.rebuild_systems()
+
+    def resolve_stats(self):
+        """
+        スキルの補正がかかる能力値（skills.STATS）を、base_<能力値> に取得済みのスキルの補正を
+        取得した順にかけて計算し直す。スキルを取得したときとリセットしたときだけ呼ぶ。
+        """
+        stats = {stat: getattr(self, 'base_' + stat) for stat in STATS}
+        for key in self.skills:
+            for modifier in REGISTRY[key].modifiers:
+                stats[modifier.stat] = modifier.apply(self, stats[modifier.stat])
+        for stat, value in stats.items():
+            setattr(self, stat, value)
+
+    def rebuild_systems(self):
+        """
+        取得したスキルから、毎ティック呼ぶ処理（段階ごとに order の順）と描画の一覧を作り直す。
+        同じスキルを重ねて取っても処理は1回だけ呼ぶ。
+        """
+        picked = [REGISTRY[key] for key in dict.fromkeys(self.skills)]
+        systems = {stage: [] for stage in STAGES}
+        for skill in sorted(picked, key=lambda skill: skill.order):
+            if skill.stage is not None:
+                systems[skill.stage].append(skill)
+        self.combat_systems = tuple(systems['combat'])
+        self.bullet_systems = tuple(systems['bullets'])
+        self.draw_systems = tuple(skill for skill in picked if skill.draws)
+
+    def generate_skill_options(self):
+        """
+        スキル選択画面に表示するスキルを、取得できるスキルから最大3つ選ぶ
+        """
+        available_skills = [
+            skill for skill in SKILLS
+            if skill.offered and skill.available(self, self.skills.count(skill.key))
+        ]
+
+        self.skill_options = self.rng.sample(available_skills, min(3, len(available_skills)))
+
+def main():
+    """
+    ウィンドウなしで指定ティック数だけシミュレーションを回し、処理時間を表示する
+    """
+    parser = argparse.ArgumentParser(description="ヘッドレスでゲームを実行する")
+    parser.add_argument('--ticks', type=int, default=3600)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=0,
+                        help="セクターに分けて並列に更新するスレッドの数（0 なら1スレッド）")
+    parser.add_argument('--flow-field', action='store_true', help="追尾する敵の向きを流れ場から引く")
+    args = parser.parse_args()
+
+    game = Engine(seed=args.seed)
+    if args.workers:
+        game.sector_pool = SectorPool(workers=args.workers)
+    if args.flow_field:
+        game.flow_field = FlowField()
+    start = time.perf_counter()
+    game.run(args.ticks)
+    elapsed = time.perf_counter() - start
+    print(f"ticks={args.ticks} seed={args.seed} elapsed={elapsed:.3f}s "
+          f"({elapsed / args.ticks * 1000:.3f} ms/tick)")
+    print(f"score={game.score} exp={game.exp_count} hp={game.player_hp} "
+          f"game_over={game.game_over} enemies={len(game.enemies)}")
+
+
+if __name__ == '__main__':
+    main()
+
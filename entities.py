@@ -0,0 +1,427 @@
+import struct
+from types import MappingProxyType
+
+import numpy as np
+
+# 敵タイプ（type_id はこのタプルの添字）
+ENEMY_TYPES = ('red', 'blue', 'green', 'cyan')
+RED, BLUE, GREEN, CYAN = range(len(ENEMY_TYPES))
+
+# 追尾タイプごとの速度倍率（enemy_speed に掛ける。水色は追尾しない）
+HOMING_SPEED = np.array([1.5, 0.5, 0.2, 0.0])
+
+# タイプごとの描画色
+ENEMY_COLORS = (8, 12, 11, 13)
+
+# Arena.pack() の先頭：count, live, next_id, 空き ID の数, 削除待ちの数
+ARENA_HEADER = struct.Struct('<IIIII')
+
+
+class Arena:
+    """
+    世代付きハンドルを持つ Struct-of-Arrays 形式のエンティティ置き場。
+
+    有効なデータは各列の先頭 count 件に詰めて保持する。despawn() は削除の印を
+    付けてコマンドバッファに積むだけなので、フレーム中は添字が変わらない。
+    フレームの最後に flush() を1回呼ぶと、末尾の要素で穴を埋める形（swap-remove）で
+    まとめて取り除く。並び順は保たれない。
+
+    フレームをまたいでエンティティを参照したい場合は handle() で世代付きハンドルを取り、
+    resolve() で現在の添字に戻す。削除済みのエンティティのハンドルは None になる。
+    """
+    # 列名 -> dtype（サブクラスで定義する）
+    fields = MappingProxyType({})
+
+    def __init__(self, capacity=256):
+        self.count = 0
+        self.live = 0
+        self.pending = []
+        self.free_ids = []
+        self.next_id = 0
+        self.allocate(capacity)
+
+    def allocate(self, capacity):
+        for name, dtype in self.fields.items():
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+        self.alive = np.zeros(capacity, dtype=bool)
+        # 添字 -> ID と ID -> 添字の対応、ID ごとの世代
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.where = np.zeros(capacity, dtype=np.int64)
+        self.generation = np.zeros(capacity, dtype=np.uint32)
+
+    def columns(self):
+        """
+        swap-remove で一緒に動かす列の一覧
+        """
+        return [getattr(self, name) for name in self.fields] + [self.alive, self.ids]
+
+    def __len__(self):
+        return self.live
+
+    def reserve(self, extra):
+        """
+        extra 件を追加できるだけの容量を確保する（足りなければ倍々で拡張）
+        """
+        needed = self.count + extra
+        capacity = len(self.alive)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        old_columns = self.columns()
+        old_where = self.where
+        old_generation = self.generation
+        self.allocate(capacity)
+        for new_column, old_column in zip(self.columns(), old_columns):
+            new_column[:self.count] = old_column[:self.count]
+        self.where[:self.next_id] = old_where[:self.next_id]
+        self.generation[:self.next_id] = old_generation[:self.next_id]
+
+    def push(self):
+        """
+        末尾に1件分の領域を確保して添字を返す。列の値は呼び出し側で設定する。
+        """
+        self.reserve(1)
+        i = self.count
+        if self.free_ids:
+            entity_id = self.free_ids.pop()
+        else:
+            entity_id = self.next_id
+            self.next_id += 1
+        self.ids[i] = entity_id
+        self.where[entity_id] = i
+        self.alive[i] = True
+        self.count += 1
+        self.live += 1
+        return i
+
+    def push_many(self, k):
+        """
+        末尾に k 件分の領域をまとめて確保し、先頭の添字を返す（push() を k 回呼んだのと同じ ID を割り当てる）
+        """
+        self.reserve(k)
+        start = self.count
+        reuse = min(k, len(self.free_ids))
+        entity_ids = np.empty(k, dtype=np.int64)
+        if reuse:
+            entity_ids[:reuse] = self.free_ids[-reuse:][::-1]
+            del self.free_ids[-reuse:]
+        entity_ids[reuse:] = np.arange(self.next_id, self.next_id + k - reuse)
+        self.next_id += k - reuse
+        self.ids[start:start + k] = entity_ids
+        self.where[entity_ids] = np.arange(start, start + k)
+        self.alive[start:start + k] = True
+        self.count += k
+        self.live += k
+        return start
+
+    def handle(self, i):
+        """
+        添字 i のエンティティの世代付きハンドルを返す
+        """
+        entity_id = int(self.ids[i])
+        return (int(self.generation[entity_id]) << 32) | entity_id
+
+    def resolve(self, handle):
+        """
+        ハンドルを現在の添字に変換する。削除済み（削除待ちを含む）なら None。
+        """
+        entity_id = handle & 0xFFFFFFFF
+        if entity_id >= self.next_id or int(self.generation[entity_id]) != handle >> 32:
+            return None
+        i = int(self.where[entity_id])
+        if not self.alive[i]:
+            return None
+        return i
+
+    def despawn(self, i):
+        """
+        添字 i のエンティティに削除の印を付けてコマンドバッファに積む（O(1)、2回目以降は無視）
+        """
+        if self.alive[i]:
+            self.alive[i] = False
+            self.live -= 1
+            self.pending.append(i)
+
+    def despawn_mask(self, mask):
+        """
+        先頭 count 件に対する真偽値マスクで、まとめて削除の印を付ける
+        """
+        dead = np.flatnonzero(mask & self.alive[:self.count])
+        if len(dead):
+            self.alive[dead] = False
+            self.live -= len(dead)
+            self.pending.extend(dead.tolist())
+
+    def flush(self):
+        """
+        コマンドバッファに積まれた削除をまとめて実行する。
+        新しい count より後ろに残っている生存エンティティを、前側の穴へ移動させる。
+        """
+        if not self.pending:
+            return
+        dead = np.array(self.pending, dtype=np.intp)
+        self.pending.clear()
+        new_count = self.count - len(dead)
+        dead_ids = self.ids[dead]
+        holes = dead[dead < new_count]
+        if len(holes):
+            tail = np.arange(new_count, self.count)
+            movers = tail[self.alive[new_count:self.count]]
+            for column in self.columns():
+                column[holes] = column[movers]
+            self.where[self.ids[holes]] = holes
+        self.alive[new_count:self.count] = False
+        self.generation[dead_ids] += 1
+        self.free_ids.extend(dead_ids.tolist())
+        self.count = new_count
+
+    def pack(self):
+        """
+        中身（先頭 count 件の列、ID の対応と世代、空き ID、削除待ち）をバイト列にする
+        """
+        n = self.count
+        parts = [ARENA_HEADER.pack(n, self.live, self.next_id, len(self.free_ids), len(self.pending))]
+        parts.extend(column[:n].tobytes() for column in self.columns())
+        parts.append(self.where[:self.next_id].tobytes())
+        parts.append(self.generation[:self.next_id].tobytes())
+        parts.append(np.array(self.free_ids + self.pending, dtype=np.int64).tobytes())
+        return b''.join(parts)
+
+    def unpack(self, data, offset=0):
+        """
+        pack() で作ったバイト列 data の offset から中身を読み込み、読み終えた位置を返す。
+        容量が足りるときは今の配列をそのまま使う。
+        """
+        n, live, next_id, free_count, pending_count = ARENA_HEADER.unpack_from(data, offset)
+        offset += ARENA_HEADER.size
+        capacity = len(self.alive)
+        if capacity < max(n, next_id):
+            while capacity < max(n, next_id):
+                capacity *= 2
+            self.allocate(capacity)
+        else:
+            self.alive[n:self.count] = False
+            self.generation[next_id:self.next_id] = 0
+        for column, count in ([(column, n) for column in self.columns()] +
+                              [(self.where, next_id), (self.generation, next_id)]):
+            column[:count] = np.frombuffer(data, dtype=column.dtype, count=count, offset=offset)
+            offset += column.itemsize * count
+        ids = np.frombuffer(data, dtype=np.int64, count=free_count + pending_count, offset=offset).tolist()
+        offset += 8 * (free_count + pending_count)
+        self.free_ids = ids[:free_count]
+        self.pending = ids[free_count:]
+        self.count = n
+        self.live = live
+        self.next_id = next_id
+        return offset
+
+    def clear(self):
+        """
+        すべてのエンティティを削除する。既存のハンドルはすべて無効になる。
+        """
+        self.alive[:self.count] = False
+        self.generation[:self.next_id] += 1
+        self.free_ids = list(range(self.next_id - 1, -1, -1))
+        self.pending.clear()
+        self.count = 0
+        self.live = 0
+
+
+class EnemyStore(Arena):
+    """
+    敵の置き場。1体ごとの dict の代わりに列を持ち、移動などを一括で計算できるようにする。
+    """
+    fields = MappingProxyType({
+        'x': np.float64,
+        'y': np.float64,
+        'vx': np.float64,
+        'vy': np.float64,
+        'type_id': np.int8,
+        'hp': np.int16,
+        'shoot_timer': np.int32,
+        # 更新の詳細度（LOD）：次に向きを決め直すまでのティック数と、前回から経ったティック数
+        'lod_wait': np.int32,
+        'lod_age': np.int32,
+    })
+
+    def spawn(self, x, y, type_name, vx=0.0, vy=0.0):
+        """
+        敵を1体追加し、その添字を返す
+        """
+        i = self.push()
+        self.x[i] = x
+        self.y[i] = y
+        self.vx[i] = vx
+        self.vy[i] = vy
+        self.type_id[i] = ENEMY_TYPES.index(type_name)
+        self.hp[i] = 3
+        self.shoot_timer[i] = 0
+        self.lod_wait[i] = 0
+        self.lod_age[i] = 0
+        return i
+
+    def spawn_many(self, x, y, type_id, vx=0.0, vy=0.0):
+        """
+        配列で渡した敵をまとめて追加し、追加した範囲の slice を返す（type_id は ENEMY_TYPES の添字。
+        type_id・vx・vy はスカラーでもよい）
+        """
+        k = len(x)
+        start = self.push_many(k)
+        added = slice(start, start + k)
+        self.x[added] = x
+        self.y[added] = y
+        self.vx[added] = vx
+        self.vy[added] = vy
+        self.type_id[added] = type_id
+        self.hp[added] = 3
+        self.shoot_timer[added] = 0
+        self.lod_wait[added] = 0
+        self.lod_age[added] = 0
+        return added
+
+    def nearest(self, x, y):
+        """
+        (x, y) に最も近い生存中の敵の添字を返す（いなければ None）。
+        距離が同じ場合は添字の小さい方を選ぶ。
+        """
+        n = self.count
+        if self.live == 0:
+            return None
+        dist = np.hypot(self.x[:n] - x, self.y[:n] - y)
+        dist[~self.alive[:n]] = np.inf
+        return int(np.argmin(dist))
+
+
+class BulletStore(Arena):
+    """
+    弾の置き場。プレイヤーの弾と敵の弾は別々の置き場にして、それぞれまとめて動かす。
+    """
+    fields = MappingProxyType({
+        'x': np.float64,
+        'y': np.float64,
+        'vx': np.float64,
+        'vy': np.float64,
+    })
+
+    def spawn(self, x, y, vx, vy):
+        i = self.push()
+        self.x[i] = x
+        self.y[i] = y
+        self.vx[i] = vx
+        self.vy[i] = vy
+        return i
+
+    def spawn_many(self, x, y, vx, vy):
+        """
+        配列（x, y はスカラーでもよい）で渡した弾をまとめて追加し、追加した範囲の slice を返す
+        """
+        k = len(vx)
+        start = self.push_many(k)
+        added = slice(start, start + k)
+        self.x[added] = x
+        self.y[added] = y
+        self.vx[added] = vx
+        self.vy[added] = vy
+        return added
+
+    def advance(self, left, top, right, bottom):
+        """
+        全弾を速度の分だけ進め、(left, top) - (right, bottom) の外に出た弾に削除の印を付ける
+        """
+        n = self.count
+        x = self.x[:n]
+        y = self.y[:n]
+        x += self.vx[:n]
+        y += self.vy[:n]
+        self.despawn_mask((x < left) | (x > right) | (y < top) | (y > bottom))
+
+
+class TokenStore(Arena):
+    """
+    経験値トークンの置き場。value は1つのトークンが持つ経験値（まとめられたトークンは2以上）。
+    """
+    fields = MappingProxyType({
+        'x': np.float64,
+        'y': np.float64,
+        'value': np.int32,
+    })
+
+    def spawn(self, x, y, value=1):
+        i = self.push()
+        self.x[i] = x
+        self.y[i] = y
+        self.value[i] = value
+        return i
+
+    def merge(self, cell_size, eligible):
+        """
+        eligible（先頭 count 件に対する真偽値マスク）が真のトークンを cell_size 四方のセルごとにまとめる。
+        同じセルに2つ以上あれば、添字が最小のものを経験値の合計を持つ1つのトークンにして
+        経験値で重み付けした重心へ移し、残りには削除の印を付ける。経験値の合計は変わらない。
+        まとめて消えたトークンの数を返す。
+        """
+        n = self.count
+        candidates = np.flatnonzero(eligible & self.alive[:n])
+        if len(candidates) < 2:
+            return 0
+        cx = np.floor(self.x[candidates] / cell_size).astype(np.int64)
+        cy = np.floor(self.y[candidates] / cell_size).astype(np.int64)
+        keys = (cx << 32) + cy
+        order = np.argsort(keys, kind='stable')
+        candidates = candidates[order]
+        keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        sizes = np.diff(np.r_[starts, len(keys)])
+        if (sizes == 1).all():
+            return 0
+        value = self.value[candidates]
+        total = np.add.reduceat(value, starts)
+        weight_x = np.add.reduceat(self.x[candidates] * value, starts)
+        weight_y = np.add.reduceat(self.y[candidates] * value, starts)
+        groups = sizes > 1
+        # 安定ソートなので、各セルの先頭が添字の最小のトークン
+        survivors = candidates[starts[groups]]
+        self.x[survivors] = weight_x[groups] / total[groups]
+        self.y[survivors] = weight_y[groups] / total[groups]
+        self.value[survivors] = total[groups]
+        merged = np.ones(len(candidates), dtype=bool)
+        merged[starts] = False
+        mask = np.zeros(n, dtype=bool)
+        mask[candidates[merged]] = True
+        self.despawn_mask(mask)
+        return int(np.count_nonzero(merged))
+
+
+class SatelliteStore(Arena):
+    """
+    衛星の置き場。角度をまとめて進め、位置（x, y）は1ティックに1回だけ計算して列に持つ。
+    """
+    fields = MappingProxyType({
+        'x': np.float64,
+        'y': np.float64,
+        'angle': np.float64,
+        'distance': np.float64,
+        'speed': np.float64,
+        'size': np.int16,
+        'color': np.int8,
+        'damage': np.int16,
+    })
+
+    def spawn(self, angle):
+        i = self.push()
+        self.angle[i] = angle
+        self.distance[i] = 40
+        self.speed[i] = 0.05
+        self.size[i] = 2
+        self.color[i] = 9
+        self.damage[i] = 1
+        return i
+
+    def place(self, center_x, center_y):
+        """
+        (center_x, center_y) を中心に、各衛星の位置を角度と距離から計算する
+        """
+        n = self.count
+        self.x[:n] = center_x + np.cos(self.angle[:n]) * self.distance[:n]
+        self.y[:n] = center_y + np.sin(self.angle[:n]) * self.distance[:n]
@@ -0,0 +1,176 @@
+import math
+
+import numpy as np
+
+# 8近傍のずれ (di, dj) と、1歩の長さ（セル単位）
+NEIGHBORS = ((-1, -1), (0, -1), (1, -1), (-1, 0), (1, 0), (-1, 1), (0, 1), (1, 1))
+STEPS = np.array([math.hypot(di, dj) for di, dj in NEIGHBORS])
+
+
+class FlowField:
+    """
+    プレイヤーを中心にした粗いグリッドの流れ場。追尾する敵はここから向きと距離を引くだけで進む向きを決める。
+
+    グリッドはプレイヤーのいるセルを中心に (2 * half_cells + 1) 四方。各セルについて、プレイヤーのいるセルの
+    中心を目標にした「進む向きの単位ベクトル」と「目標までの距離 [px]」を持つ。
+    update() は毎ティック呼び、プレイヤーが別のセルに移ったとき（または invalidate() の後）だけ作り直す。
+    障害物がなければ全セルが目標へ直進するので、中心からのずれだけで決まる表を最初に1回作って使い回す。
+
+    地形は blocked に「ワールドのセル座標の配列 (cell_x, cell_y) を受け取って通れないセルの真偽値配列を返す関数」を
+    入れて表す。地形があると、8近傍の最短経路の距離場を作り、障害物で遠回りになるセルは
+    距離が下がる隣のセルへ向かう。地形を変えたら invalidate() を呼ぶ。
+
+    セルの中心から引いた向きには最大でセルの半分ほどのずれがあるので、プレイヤーから direct_radius [px] 未満の敵と
+    グリッドの外の敵は、プレイヤーへの向きをそのまま計算する。
+    """
+    def __init__(self, cell_size=16, half_cells=20, direct_radius=48):
+        self.cell_size = cell_size
+        self.half_cells = half_cells
+        self.direct_radius = direct_radius
+        self.size = 2 * half_cells + 1
+        self.blocked = None
+        offsets = np.arange(self.size) - half_cells
+        self.offset_i, self.offset_j = np.meshgrid(offsets, offsets)
+        # 見通しの判定用：中心からのチェビシェフ距離ごとのセルの添字と、中心へ向かう線分上で1つ内側のセル
+        ring = np.maximum(np.abs(self.offset_i), np.abs(self.offset_j)).ravel()
+        scale = (ring - 1) / np.maximum(ring, 1)
+        parent_i = np.floor(self.offset_i.ravel() * scale + 0.5).astype(np.int64) + half_cells
+        parent_j = np.floor(self.offset_j.ravel() * scale + 0.5).astype(np.int64) + half_cells
+        self.rings = [(np.flatnonzero(ring == r), (parent_j * self.size + parent_i)[ring == r])
+                      for r in range(1, half_cells + 1)]
+        # 障害物がないときの表（セルの中心から目標への向きと距離）
+        dx = -self.offset_i * float(cell_size)
+        dy = -self.offset_j * float(cell_size)
+        dist = np.hypot(dx, dy)
+        self.open_dir_x = np.divide(dx, dist, out=np.ones_like(dist), where=dist > 0)
+        self.open_dir_y = np.divide(dy, dist, out=np.zeros_like(dist), where=dist > 0)
+        self.open_distance = dist
+        self.origin_x = None
+        self.origin_y = None
+        self.player_x = 0.0
+        self.player_y = 0.0
+        # 作り直した回数（プレイヤーがセルをまたいだ回数）
+        self.rebuilds = 0
+        # 目標へ直進するセル（False のセルは隣のセルへ向かう）
+        self.direct = np.ones(dist.shape, dtype=bool)
+        self.use_table(self.open_dir_x, self.open_dir_y, self.open_distance)
+
+    def invalidate(self):
+        """
+        次の update() で距離場を作り直させる（地形を変えたとき）
+        """
+        self.origin_x = None
+
+    def update(self, player_x, player_y):
+        """
+        プレイヤーの位置を渡す（1ティックに1回）。プレイヤーが別のセルに移っていれば流れ場を作り直す。
+        """
+        self.player_x = player_x
+        self.player_y = player_y
+        cs = self.cell_size
+        origin_x = math.floor(player_x / cs)
+        origin_y = math.floor(player_y / cs)
+        if origin_x != self.origin_x or origin_y != self.origin_y:
+            self.rebuild(origin_x, origin_y)
+
+    def use_table(self, dir_x, dir_y, distance):
+        """
+        セルごとの向きと距離の表を差し替える。目標へ直進できる近くのセルと一番外側のセルは
+        steer() で向きをそのまま計算する印を付ける。
+        """
+        self.dir_x = dir_x.ravel()
+        self.dir_y = dir_y.ravel()
+        self.distance = distance.ravel()
+        exact = self.direct & (self.open_distance < self.direct_radius)
+        exact[[0, -1], :] = True
+        exact[:, [0, -1]] = True
+        self.exact_cells = exact.ravel()
+
+    def rebuild(self, origin_x, origin_y):
+        """
+        プレイヤーのセル (origin_x, origin_y) を中心に、地形による経路の距離場を作り直す
+        """
+        self.origin_x = origin_x
+        self.origin_y = origin_y
+        self.rebuilds += 1
+        if self.blocked is None:
+            if not self.direct.all():
+                self.direct = np.ones_like(self.direct)
+                self.use_table(self.open_dir_x, self.open_dir_y, self.open_distance)
+            return
+
+        blocked = np.asarray(self.blocked(self.offset_i + origin_x, self.offset_j + origin_y), dtype=bool)
+        h = self.half_cells
+        # 斜めの移動は、通る2つの角のセルがどちらも通れるときだけ許す
+        wall = np.zeros((self.size + 2, self.size + 2), dtype=bool)
+        wall[1:-1, 1:-1] = blocked
+        step_cost = []
+        for (di, dj), step in zip(NEIGHBORS, STEPS):
+            extra = np.zeros((self.size, self.size))
+            if di and dj:
+                extra[wall[1:-1, 1 + di:self.size + 1 + di] | wall[1 + dj:self.size + 1 + dj, 1:-1]] = np.inf
+            step_cost.append(extra + step)
+
+        # 中心から外へ向かって、8近傍の距離の最小値を変化がなくなるまで伝える
+        cost = np.full((self.size + 2, self.size + 2), np.inf)
+        cost[1 + h, 1 + h] = 0.0
+        for _ in range(self.size * self.size):
+            inner = cost[1:-1, 1:-1]
+            relaxed = inner.copy()
+            for (di, dj), extra in zip(NEIGHBORS, step_cost):
+                np.minimum(relaxed, cost[1 + dj:self.size + 1 + dj, 1 + di:self.size + 1 + di] + extra,
+                           out=relaxed)
+            relaxed[blocked] = np.inf
+            relaxed[h, h] = 0.0
+            if np.array_equal(relaxed, inner):
+                break
+            cost[1:-1, 1:-1] = relaxed
+
+        # プレイヤーのセルが見通せるセルはプレイヤーへ直進し、それ以外は距離が最も下がる隣へ向かう。
+        # 見通せるのは、自分が通れて、中心へ向かう線分上で1つ内側のセルも見通せるセル
+        cost_inner = cost[1:-1, 1:-1]
+        visible = ~blocked.ravel()
+        for cells, parents in self.rings:
+            visible[cells] &= visible[parents]
+        self.direct = visible.reshape(blocked.shape) & np.isfinite(cost_inner)
+        through = np.stack([cost[1 + dj:self.size + 1 + dj, 1 + di:self.size + 1 + di] + extra
+                            for (di, dj), extra in zip(NEIGHBORS, step_cost)])
+        best = np.argmin(through, axis=0)
+        offsets = np.array(NEIGHBORS, dtype=np.float64) / STEPS[:, None]
+        next_x = offsets[best, 0]
+        next_y = offsets[best, 1]
+        # 通れないセルに入り込んだ敵は通れる隣へ出る。どこにもつながらないセルではその場にとどまる
+        through_cost = np.take_along_axis(through, best[None], axis=0)[0]
+        stuck = ~np.isfinite(through_cost)
+        next_x[stuck] = 0.0
+        next_y[stuck] = 0.0
+        path_distance = np.where(np.isfinite(cost_inner), cost_inner, through_cost) * self.cell_size
+        self.use_table(np.where(self.direct, self.open_dir_x, next_x),
+                       np.where(self.direct, self.open_dir_y, next_y),
+                       np.where(self.direct, self.open_distance, path_distance))
+
+    def steer(self, xs, ys):
+        """
+        位置 (xs, ys) の敵が進む向きの単位ベクトル (ux, uy) と、プレイヤーまでの距離の配列を返す
+        """
+        cs = self.cell_size
+        h = self.half_cells
+        last = self.size - 1
+        # グリッドの外は一番外側のセル（exact_cells が真）に寄せる
+        i = np.minimum(np.maximum(((xs - (self.origin_x - h) * cs) / cs).astype(np.int64), 0), last)
+        j = np.minimum(np.maximum(((ys - (self.origin_y - h) * cs) / cs).astype(np.int64), 0), last)
+        k = j * self.size + i
+        ux = self.dir_x[k]
+        uy = self.dir_y[k]
+        dist = self.distance[k]
+
+        # 近くの敵とグリッドの端より外の敵は、プレイヤーへの向きをそのまま計算する
+        exact = np.flatnonzero(self.exact_cells[k])
+        if len(exact):
+            dx = self.player_x - xs[exact]
+            dy = self.player_y - ys[exact]
+            d = np.hypot(dx, dy)
+            ux[exact] = np.divide(dx, d, out=np.ones(len(exact)), where=d > 0)
+            uy[exact] = np.divide(dy, d, out=np.zeros(len(exact)), where=d > 0)
+            dist[exact] = d
+        return ux, uy, dist
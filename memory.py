@@ -0,0 +1,168 @@
+"""
+ゲーム中のメモリ確保とガベージコレクション（GC）の管理。
+
+MemoryMode.start() は起動処理が終わった後に1回呼ぶ。エンティティの置き場をあらかじめ大きく確保し
+（群れが湧いた途中で配列を作り直さないように）、起動までに作ったオブジェクトを gc.freeze() で
+GC の対象から外し、自動の GC を止める。以後は毎ティック tick() を呼ぶと、
+スキル選択画面やゲームオーバーなど、ゲームが止まっている間に1回だけまとめて回収する。
+止まらないまま GC 対象のオブジェクトが young_limit 個を超えて増えたときだけ、ゲーム中に若い世代を回収する。
+
+あわせて、1ティックあたりに増えた GC 対象のオブジェクト数と確保中のメモリブロック数（どちらも解放分を
+差し引いた正味の数）と、GC 1回ごとの停止時間を記録する（自動の GC のままでも記録できる）。
+GC の記録は直近 history 回だけを残し、回数と停止時間の最大・合計は別に数えるので、長く遊んでも増え続けない。
+"""
+import gc
+import sys
+import time
+from collections import deque
+from types import MappingProxyType
+
+import numpy as np
+
+
+class MemoryMode:
+    """
+    enabled が偽なら GC は自動のままにして、計測だけを行う
+    """
+    # 起動時に確保しておくエンティティの数（Engine の属性名 -> 数）
+    pool_capacity = MappingProxyType({
+        'enemies': 2048,
+        'player_bullets': 256,
+        'enemy_bullets': 4096,
+        'exp_tokens': 512,
+        'satellites': 64,
+    })
+
+    def __init__(self, enabled=True, young_limit=20000, capacity=3600, history=256):
+        self.enabled = enabled
+        self.young_limit = young_limit
+        self.capacity = capacity
+        # 直近 capacity ティックの正味の確保数（リングバッファ）と、その合計
+        self.objects = np.zeros(capacity, dtype=np.int64)
+        self.blocks = np.zeros(capacity, dtype=np.int64)
+        self.objects_total = 0
+        self.ticks = 0
+        # 直近 history 回の GC の (ティック, 世代, 停止時間 [ms], 回収した数, ゲームが止まっていたか)
+        self.collections = deque(maxlen=history)
+        # 起動からの GC の回数・停止時間の集計（collections から古い記録が消えても残る）
+        self.collection_count = 0
+        self.collections_in_play = 0
+        self.gc_max_ms = 0.0
+        self.gc_max_in_play_ms = 0.0
+        self.gc_total_ms = 0.0
+        # overlay_lines() の文字列と、それを作ったときの GC の回数・1ティックの確保数（0.1 単位）
+        self.overlay = ('', '')
+        self.overlay_collections = -1
+        self.overlay_objects = None
+        self.paused = False
+        self.collected_in_pause = False
+        self.started = False
+        self.gc_start = 0.0
+        self.last_objects = 0
+        self.last_blocks = 0
+
+    def start(self, game=None):
+        """
+        起動処理の後に呼ぶ。game を渡すとその置き場を pool_capacity まで広げておく。
+        """
+        if game is not None:
+            for name, capacity in self.pool_capacity.items():
+                store = getattr(game, name)
+                store.reserve(capacity - store.count)
+        gc.collect()
+        gc.freeze()
+        if self.enabled:
+            gc.disable()
+        gc.callbacks.append(self.on_gc)
+        self.started = True
+        self.last_objects = gc.get_count()[0]
+        self.last_blocks = sys.getallocatedblocks()
+
+    def stop(self):
+        """
+        自動の GC に戻す
+        """
+        if not self.started:
+            return
+        gc.callbacks.remove(self.on_gc)
+        gc.unfreeze()
+        gc.enable()
+        self.started = False
+
+    def on_gc(self, phase, info):
+        if phase == 'start':
+            self.gc_start = time.perf_counter()
+            return
+        elapsed = (time.perf_counter() - self.gc_start) * 1000
+        self.collections.append((self.ticks, info['generation'], elapsed, info['collected'], self.paused))
+        self.collection_count += 1
+        self.gc_total_ms += elapsed
+        self.gc_max_ms = max(self.gc_max_ms, elapsed)
+        if not self.paused:
+            self.collections_in_play += 1
+            self.gc_max_in_play_ms = max(self.gc_max_in_play_ms, elapsed)
+        # 回収した世代より若い世代の数は0に戻るので、ここから数え直す
+        self.last_objects = gc.get_count()[0]
+
+    def tick(self, paused):
+        """
+        1ティックの更新が終わるたびに呼ぶ。paused はゲームが止まっているか（スキル選択画面・ゲームオーバーなど）。
+        """
+        objects = gc.get_count()[0]
+        blocks = sys.getallocatedblocks()
+        k = self.ticks % self.capacity
+        added = objects - self.last_objects
+        self.objects_total += added - int(self.objects[k])
+        self.objects[k] = added
+        self.blocks[k] = blocks - self.last_blocks
+        self.last_objects = objects
+        self.last_blocks = blocks
+        self.ticks += 1
+        self.paused = paused
+        if not self.enabled:
+            return
+        if paused:
+            if not self.collected_in_pause:
+                self.collected_in_pause = True
+                gc.collect()
+        else:
+            self.collected_in_pause = False
+            if objects > self.young_limit:
+                gc.collect(0)
+
+    def objects_per_tick(self):
+        """
+        直近 capacity ティックの1ティックあたりの正味の確保数
+        """
+        n = min(self.ticks, self.capacity)
+        return self.objects_total / n if n else 0.0
+
+    def overlay_lines(self):
+        """
+        プロファイラのオーバーレイに出す2行の文字列を返す。
+        毎フレーム呼ばれるので、表示する値が変わったときだけ作り直す。
+        """
+        objects = round(self.objects_per_tick() * 10)
+        if self.collection_count != self.overlay_collections or objects != self.overlay_objects:
+            self.overlay_collections = self.collection_count
+            self.overlay_objects = objects
+            gc_line = f"GC {self.collections_in_play}/{self.collection_count} max {self.gc_max_in_play_ms:.2f}"
+            self.overlay = (gc_line, f"obj/t {objects / 10:.1f}")
+        return self.overlay
+
+    def report(self):
+        """
+        記録をまとめた dict を返す（確保数は直近 capacity ティックの値から）
+        """
+        n = min(self.ticks, self.capacity)
+        return {
+            'ticks': self.ticks,
+            'objects_per_tick': self.objects_per_tick(),
+            'objects_max': int(self.objects[:n].max()) if n else 0,
+            'blocks_per_tick': float(self.blocks[:n].mean()) if n else 0.0,
+            'collections': self.collection_count,
+            'collections_in_play': self.collections_in_play,
+            'gc_max_ms': self.gc_max_ms,
+            'gc_max_in_play_ms': self.gc_max_in_play_ms,
+            'gc_total_ms': self.gc_total_ms,
+        }
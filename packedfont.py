@@ -0,0 +1,131 @@
+import struct
+
+import numpy as np
+
+MAGIC = b'PXF1'
+# マジック, フォントの高さ, アセント, グリフ数
+HEADER = struct.Struct('<4sBbH')
+# コードポイント, 送り幅, 幅, 高さ, x オフセット, y オフセット, ビットマップの位置
+INDEX_ENTRY = struct.Struct('<IbBBbbI')
+
+
+class PackedFont:
+    """
+    build_font.py で作ったバイナリフォント。
+    読み込み時には索引だけを読み、各グリフのビットマップは初めて描くときに展開する。
+    描画結果は pyxel.Font で元の BDF を使った pyxel.text と同じになる。
+    （フォントにない文字は幅0で読み飛ばし、改行で高さ分だけ下へ移る）
+    """
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.data = f.read()
+        magic, self.height, self.ascent, count = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC:
+            raise ValueError(f"not a packed font: {path}")
+        self.bitmap_start = HEADER.size + INDEX_ENTRY.size * count
+        # コードポイント -> 索引の値
+        self.index = {
+            entry[0]: entry[1:]
+            for entry in INDEX_ENTRY.iter_unpack(self.data[HEADER.size:self.bitmap_start])
+        }
+        # 展開済みのグリフ: コードポイント -> (送り幅, ビットマップ（真偽値の2次元配列）, 左端, 上端)
+        self.glyphs = {}
+        # draw() 用に、グリフを横に続く画素の並び [(dx, dy, 長さ), ...] にしたもの
+        self.runs = {}
+
+    def glyph(self, c):
+        """
+        文字 c のグリフを返す（フォントになければ None）
+        """
+        codepoint = ord(c)
+        glyph = self.glyphs.get(codepoint)
+        if glyph is not None:
+            return glyph
+        entry = self.index.get(codepoint)
+        if entry is None:
+            return None
+        dwidth, width, height, xoff, yoff, offset = entry
+        row_bytes = (width + 7) // 8
+        top = self.ascent - height - yoff
+        packed = np.frombuffer(self.data, dtype=np.uint8, count=row_bytes * height,
+                               offset=self.bitmap_start + offset)
+        bitmap = np.unpackbits(packed).reshape(height, row_bytes * 8)[:, :width].astype(bool)
+        glyph = (dwidth, bitmap, xoff, top)
+        self.glyphs[codepoint] = glyph
+        return glyph
+
+    def text_width(self, s):
+        """
+        pyxel.Font.text_width と同じく、いちばん長い行の幅を返す
+        """
+        widest = 0
+        for line in s.split('\n'):
+            width = 0
+            for c in line:
+                glyph = self.glyph(c)
+                if glyph is not None:
+                    width += glyph[0]
+            widest = max(widest, width)
+        return widest
+
+    def draw(self, target, x, y, s, col):
+        """
+        target（pyxel モジュールまたは pyxel.Image）に文字列を描く
+        """
+        x0 = x
+        for c in s:
+            if c == '\n':
+                x = x0
+                y += self.height
+                continue
+            glyph = self.glyph(c)
+            if glyph is None:
+                continue
+            runs = self.runs.get(c)
+            if runs is None:
+                runs = self.glyph_runs(glyph)
+                self.runs[c] = runs
+            for dx, dy, length in runs:
+                target.rect(x + dx, y + dy, length, 1, col)
+            x += glyph[0]
+
+    def glyph_runs(self, glyph):
+        """
+        グリフの各行を、横に続く画素の並び (dx, dy, 長さ) のリストにする
+        """
+        _, bitmap, left, top = glyph
+        height, width = bitmap.shape
+        padded = np.zeros((height, width + 2), dtype=np.int8)
+        padded[:, 1:-1] = bitmap
+        edges = np.diff(padded, axis=1)
+        rows, starts = np.nonzero(edges == 1)
+        _, ends = np.nonzero(edges == -1)
+        return [(left + x1, top + row, x2 - x1)
+                for row, x1, x2 in zip(rows.tolist(), starts.tolist(), ends.tolist())]
+
+    def paint(self, mask, x, y, s):
+        """
+        真偽値の2次元配列 mask の (x, y) に文字列を描く（はみ出した部分は切り捨てる）。
+        draw() と同じ画素が真になる。
+        """
+        mask_height, mask_width = mask.shape
+        x0 = x
+        for c in s:
+            if c == '\n':
+                x = x0
+                y += self.height
+                continue
+            glyph = self.glyph(c)
+            if glyph is None:
+                continue
+            dwidth, bitmap, left, top = glyph
+            gx = x + left
+            gy = y + top
+            height, width = bitmap.shape
+            x1 = max(gx, 0)
+            y1 = max(gy, 0)
+            x2 = min(gx + width, mask_width)
+            y2 = min(gy + height, mask_height)
+            if x1 < x2 and y1 < y2:
+                mask[y1:y2, x1:x2] |= bitmap[y1 - gy:y2 - gy, x1 - gx:x2 - gx]
+            x += dwidth
@@ -0,0 +1,156 @@
+import csv
+import json
+import time
+
+import numpy as np
+
+
+class FrameProfiler:
+    """
+    1フレームを区間（update の各処理・draw の各レイヤー）ごとに計測するプロファイラ。
+    mark(name) を呼ぶと、前回の mark（またはフレーム開始）からの経過時間を name の区間に加算する。
+    直近 capacity フレーム分をリングバッファに保持し、エンティティ数も一緒に記録する。
+
+    ウィンドウ版は描画の1フレームを begin_frame() / end_frame() で囲み、その間に進めた0回以上のティック
+    （Engine.update が begin_tick() を呼ぶ）の区間と描画の区間を同じ1行に加算する。
+    フレームで囲まずにティックを回すとき（ヘッドレス実行）は、1ティックを1フレームとして記録する。
+
+    無効な間は各メソッドが先頭の enabled 判定だけで戻るので、ほとんどコストがかからない。
+    """
+    # 記録するエンティティ数の種類
+    count_names = ('enemy_count', 'bullet_count', 'exp_token_count')
+
+    def __init__(self, capacity=600, max_sections=32, enabled=False):
+        self.capacity = capacity
+        self.enabled = enabled
+        self.sections = []
+        self.section_index = {}
+        self.times = np.zeros((capacity, max_sections))
+        self.counts = np.zeros((capacity, len(self.count_names)), dtype=np.int32)
+        self.frames = 0
+        self.current = [0.0] * max_sections
+        self.current_counts = (0, 0, 0)
+        self.last = 0.0
+        self.in_frame = False
+        # begin_frame() で始めたフレームの途中か（end_frame() まで）
+        self.frame_open = False
+
+    def set_enabled(self, enabled):
+        self.enabled = enabled
+        self.in_frame = False
+        self.frame_open = False
+
+    def begin_frame(self):
+        """
+        新しいフレームの計測を始める（前のフレームはここで確定する）
+        """
+        if not self.enabled:
+            return
+        if self.in_frame:
+            self.commit()
+        self.in_frame = True
+        self.frame_open = True
+        self.last = time.perf_counter()
+
+    def end_frame(self):
+        """
+        begin_frame() で始めたフレームを確定する
+        """
+        if not self.enabled or not self.in_frame:
+            return
+        self.commit()
+        self.in_frame = False
+        self.frame_open = False
+
+    def begin_tick(self):
+        """
+        1ティックの計測を始める。フレームの途中なら区間をそのフレームに加算し、
+        そうでなければこのティックを新しいフレームとして始める（前のティックはここで確定する）。
+        """
+        if not self.enabled:
+            return
+        if self.frame_open:
+            self.last = time.perf_counter()
+            return
+        if self.in_frame:
+            self.commit()
+        self.in_frame = True
+        self.last = time.perf_counter()
+
+    def resume(self):
+        """
+        計測の基準時刻を今にする。update と draw の間の時間を数えないために draw の先頭で呼ぶ。
+        """
+        if not self.enabled:
+            return
+        self.last = time.perf_counter()
+
+    def mark(self, name):
+        """
+        前回の mark からの経過時間を区間 name に加算する
+        """
+        if not self.enabled or not self.in_frame:
+            return
+        now = time.perf_counter()
+        index = self.section_index.get(name)
+        if index is None:
+            index = self.add_section(name)
+        self.current[index] += (now - self.last) * 1000
+        self.last = now
+
+    def set_counts(self, enemies, bullets, exp_tokens):
+        if not self.enabled:
+            return
+        self.current_counts = (enemies, bullets, exp_tokens)
+
+    def add_section(self, name):
+        index = len(self.sections)
+        if index >= self.times.shape[1]:
+            raise ValueError(f"too many profiler sections: {name}")
+        self.sections.append(name)
+        self.section_index[name] = index
+        return index
+
+    def commit(self):
+        row = self.frames % self.capacity
+        self.times[row] = self.current
+        self.counts[row] = self.current_counts
+        self.frames += 1
+        for i in range(len(self.sections)):
+            self.current[i] = 0.0
+
+    def samples(self, last=None):
+        """
+        記録済みのフレームを古い順に (区間ごとの時間[ms], エンティティ数) の配列で返す
+        """
+        stored = min(self.frames, self.capacity)
+        if last is not None:
+            stored = min(stored, last)
+        rows = (np.arange(self.frames - stored, self.frames) % self.capacity)
+        return self.times[rows, :len(self.sections)], self.counts[rows]
+
+    def rows(self):
+        """
+        書き出し用に、1フレーム1件の dict のリストを返す
+        """
+        times, counts = self.samples()
+        first = self.frames - len(times)
+        result = []
+        for offset, (frame_times, frame_counts) in enumerate(zip(times.tolist(), counts.tolist())):
+            row = {'frame': first + offset}
+            row.update(zip(self.sections, frame_times))
+            row['total_ms'] = sum(frame_times)
+            row.update(zip(self.count_names, frame_counts))
+            result.append(row)
+        return result
+
+    def export_csv(self, path):
+        fieldnames = ['frame'] + self.sections + ['total_ms'] + list(self.count_names)
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(self.rows())
+
+    def export_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'sections': self.sections, 'frames': self.rows()}, f, indent=1)
@@ -0,0 +1,306 @@
+"""
+入力ログのリプレイ。
+Engine は乱数を seed で初期化した専用の Random から、入力を input_source から受け取るので、
+seed と毎ティックの入力さえ残しておけば、同じプレイを何度でも再現できる。
+
+ファイルには seed と Engine の設定（流れ場を使うか）、1ティックごとの入力を差分・連長で詰めて zlib で圧縮したもの、
+それに checksum_interval ティックごとの Engine.checksum() を書く。
+再生ではチェックサムを比べて、記録したときと状態がずれたティックを見つける。
+
+    python main.py --record play.pxr [--flow-field]
+    python replay.py play.pxr [--profile profile.csv]
+"""
+import argparse
+import struct
+import time
+import zlib
+
+from engine import Engine, InputState
+from flowfield import FlowField
+from profiler import FrameProfiler
+
+MAGIC = b'PXR1'
+VERSION = 2
+# マジック, バージョン, 設定のフラグ, seed, ティックレート, チェックサムの間隔, ティック数, 入力ログのバイト数, チェックサムの数
+HEADER = struct.Struct('<4sBBQHHIII')
+# ティック数, チェックサム
+CHECKSUM_ENTRY = struct.Struct('<II')
+
+# 設定のフラグ：追尾する敵の向きを流れ場（flowfield.FlowField）から引く
+OPTION_FLOW_FIELD = 0x01
+
+# 1ティック分の記録の先頭バイト
+MOVE = 0x01
+CLICK = 0x02
+KEY_T = 0x04
+KEY_Y = 0x08
+KEY_U = 0x10
+RESET = 0x20
+# 続けてマウス座標の前のティックからの差分 (dx, dy) を zigzag 符号化した varint で書く
+MOUSE = 0x40
+# MOVE と組み合わせて使い、続けて varint で回数 n を書く。
+# マウス座標が変わらず、押した瞬間の入力もないティックが n 回続くことを表す
+RUN = 0x80
+
+EDGE_FLAGS = (('click', CLICK), ('key_t', KEY_T), ('key_y', KEY_Y), ('key_u', KEY_U), ('reset', RESET))
+
+
+def write_varint(out, value):
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, pos):
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def zigzag(value):
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def unzigzag(value):
+    return value >> 1 if value % 2 == 0 else -(value >> 1) - 1
+
+
+def encode_inputs(inputs):
+    """
+    InputState のリストをバイト列にする
+    """
+    out = bytearray()
+    mouse_x = 128
+    mouse_y = 128
+    run_move = False
+    run_length = 0
+
+    def flush_run():
+        if run_length == 1:
+            out.append(MOVE if run_move else 0)
+        elif run_length > 1:
+            out.append(RUN | (MOVE if run_move else 0))
+            write_varint(out, run_length)
+
+    for state in inputs:
+        flags = MOVE if state.move else 0
+        for name, flag in EDGE_FLAGS:
+            if getattr(state, name):
+                flags |= flag
+        dx = state.mouse_x - mouse_x
+        dy = state.mouse_y - mouse_y
+        if dx or dy:
+            flags |= MOUSE
+        if flags & ~MOVE == 0:
+            # 何も変わらないティックは連長でまとめる
+            if run_length and run_move != state.move:
+                flush_run()
+                run_length = 0
+            run_move = state.move
+            run_length += 1
+            continue
+        flush_run()
+        run_length = 0
+        out.append(flags)
+        if flags & MOUSE:
+            write_varint(out, zigzag(dx))
+            write_varint(out, zigzag(dy))
+            mouse_x = state.mouse_x
+            mouse_y = state.mouse_y
+    flush_run()
+    return bytes(out)
+
+
+def decode_inputs(data):
+    """
+    encode_inputs() で作ったバイト列を InputState のリストに戻す
+    """
+    inputs = []
+    mouse_x = 128
+    mouse_y = 128
+    pos = 0
+    while pos < len(data):
+        flags = data[pos]
+        pos += 1
+        move = bool(flags & MOVE)
+        if flags & RUN:
+            count, pos = read_varint(data, pos)
+            inputs.extend(InputState(mouse_x, mouse_y, move) for _ in range(count))
+            continue
+        if flags & MOUSE:
+            dx, pos = read_varint(data, pos)
+            dy, pos = read_varint(data, pos)
+            mouse_x += unzigzag(dx)
+            mouse_y += unzigzag(dy)
+        inputs.append(InputState(mouse_x, mouse_y, move, *(bool(flags & flag) for _, flag in EDGE_FLAGS)))
+    return inputs
+
+
+class Replay:
+    """
+    1回分のプレイの記録：seed と Engine の設定、毎ティックの入力、ティック数 -> チェックサム
+    """
+    def __init__(self, seed, tick_rate=60, checksum_interval=60, flow_field=False):
+        self.seed = seed
+        self.tick_rate = tick_rate
+        self.checksum_interval = checksum_interval
+        self.flow_field = flow_field
+        self.inputs = []
+        self.checksums = {}
+
+    def configure(self, engine):
+        """
+        記録したときの設定を engine に合わせる
+        """
+        if self.flow_field:
+            if engine.flow_field is None:
+                engine.flow_field = FlowField()
+        else:
+            engine.flow_field = None
+
+    def new_engine(self):
+        """
+        記録したときと同じ seed と設定の Engine を作る
+        """
+        engine = Engine(seed=self.seed)
+        self.configure(engine)
+        return engine
+
+    def save(self, path):
+        stream = zlib.compress(encode_inputs(self.inputs), 9)
+        options = OPTION_FLOW_FIELD if self.flow_field else 0
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, options, self.seed, self.tick_rate, self.checksum_interval,
+                                len(self.inputs), len(stream), len(self.checksums)))
+            f.write(stream)
+            f.writelines(CHECKSUM_ENTRY.pack(tick, checksum) for tick, checksum in sorted(self.checksums.items()))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version, options, seed, tick_rate, checksum_interval, ticks, stream_size, checksum_count = \
+            HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError(f"not a replay file: {path}")
+        if version != VERSION:
+            raise ValueError(f"unsupported replay version {version}: {path}")
+        replay = cls(seed, tick_rate, checksum_interval, flow_field=bool(options & OPTION_FLOW_FIELD))
+        start = HEADER.size
+        replay.inputs = decode_inputs(zlib.decompress(data[start:start + stream_size]))
+        if len(replay.inputs) != ticks:
+            raise ValueError(f"broken replay file: {path}")
+        start += stream_size
+        replay.checksums = dict(CHECKSUM_ENTRY.iter_unpack(
+            data[start:start + CHECKSUM_ENTRY.size * checksum_count]))
+        return replay
+
+
+class ReplayRecorder:
+    """
+    別の入力ソース source から読んだ入力を記録しながらそのまま渡す入力ソース。
+    attach() で記録する Engine を渡すと、checksum_interval ティックごとにチェックサムも記録し、
+    書き出すときにその Engine の設定も残す。
+    """
+    def __init__(self, source, seed, tick_rate=60, checksum_interval=60):
+        self.source = source
+        self.replay = Replay(seed, tick_rate, checksum_interval)
+        self.engine = None
+
+    def attach(self, engine):
+        self.engine = engine
+
+    def checkpoint(self):
+        """
+        直前のティックまで進めた状態のチェックサムを記録する
+        """
+        tick = len(self.replay.inputs)
+        if self.engine is not None and tick:
+            self.replay.checksums[tick] = self.engine.checksum()
+
+    def read(self):
+        # read() は次のティックの最初に呼ばれるので、ここで直前のティックの結果を記録できる
+        if len(self.replay.inputs) % self.replay.checksum_interval == 0:
+            self.checkpoint()
+        state = self.source.read()
+        self.replay.inputs.append(state)
+        return state
+
+    def save(self, path):
+        self.checkpoint()
+        if self.engine is not None:
+            self.replay.flow_field = self.engine.flow_field is not None
+        self.replay.save(path)
+
+
+class ReplayPlayer:
+    """
+    記録した入力を順に返す入力ソース（記録が尽きたら何も操作しない）
+    """
+    def __init__(self, replay):
+        self.inputs = replay.inputs
+        self.position = 0
+
+    def read(self):
+        if self.position >= len(self.inputs):
+            return InputState()
+        state = self.inputs[self.position]
+        self.position += 1
+        return state
+
+
+def play(replay, engine=None):
+    """
+    replay を待ち時間なしで再生する。engine を省略すると replay の seed で新しく作る。
+    engine の設定は記録したときに合わせる。
+    チェックサムが記録と食い違った最初のティック数を返す（最後まで一致すれば None）。
+    """
+    if engine is None:
+        engine = replay.new_engine()
+    replay.configure(engine)
+    engine.input_source = ReplayPlayer(replay)
+    for tick in range(1, len(replay.inputs) + 1):
+        engine.update()
+        expected = replay.checksums.get(tick)
+        if expected is not None and engine.checksum() != expected:
+            return tick
+    return None
+
+
+def main():
+    """
+    リプレイファイルを再生して、ずれがないかと処理時間を表示する
+    """
+    parser = argparse.ArgumentParser(description="リプレイを待ち時間なしで再生する")
+    parser.add_argument('path')
+    parser.add_argument('--profile', help="区間ごとの処理時間を CSV に書き出す")
+    args = parser.parse_args()
+
+    replay = Replay.load(args.path)
+    engine = replay.new_engine()
+    if args.profile:
+        engine.profiler = FrameProfiler(capacity=max(len(replay.inputs), 1), enabled=True)
+    start = time.perf_counter()
+    diverged = play(replay, engine)
+    elapsed = time.perf_counter() - start
+    ticks = len(replay.inputs)
+    print(f"ticks={ticks} ({ticks / replay.tick_rate:.1f}s of play) seed={replay.seed} "
+          f"flow_field={replay.flow_field} "
+          f"elapsed={elapsed:.3f}s ({elapsed / max(ticks, 1) * 1000:.3f} ms/tick)")
+    print(f"score={engine.score} exp={engine.exp_count} hp={engine.player_hp} "
+          f"checksums={len(replay.checksums)}")
+    if args.profile:
+        engine.profiler.export_csv(args.profile)
+    if diverged is not None:
+        raise SystemExit(f"replay diverged at tick {diverged}")
+
+
+if __name__ == '__main__':
+    main()
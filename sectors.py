@@ -0,0 +1,103 @@
+"""
+セクターに分けた並列の更新。
+Engine.sector_pool に SectorPool を入れると、敵の多いティックでは次の処理をセクターごとにスレッドプールで行う。
+
+- 敵の向きの決め直しと移動（Engine.steer_enemies と位置の更新）
+- 空間ハッシュの作り直し（セルキーの安定ソート）
+- プレイヤーの弾と敵の衝突判定で、当たった (弾, 敵) の組を集める処理
+
+セクターはプレイヤーの周り（敵が消えずにいられる範囲）をセルの列で x 方向に切った帯で、
+各セクターの処理は自分の添字の要素にしか書き込まない。セクターをまたぐ接触（隣の帯にいる敵に当たる弾）は、
+共有の空間ハッシュを読むだけで見つかる。結果は決まった順にまとめ直し（帯を x の小さい順につなぐ・
+(弾, 敵) の組を添字の順に並べる）、敵を倒す処理はまとめた後に1スレッドで行うので、
+1スレッドで順に更新した場合とビット単位で同じ状態になる。
+
+numpy の配列演算の多くは GIL を手放すので通常の CPython でも並列に進み、
+GIL のない（free-threaded）CPython では残りの Python の処理も並列になる。
+
+    game.sector_pool = SectorPool(workers=4)
+"""
+import itertools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+class SectorPool:
+    """
+    workers 本のスレッドで、sectors 個（省略時は workers 個）のセクターを並列に処理する。
+    敵が min_enemies 体未満・弾が min_bullets 発未満のときは並列にしない（スレッドに渡す手間の方が大きい）。
+    """
+    # セクターの番号は int8 に入れる（安定ソートが基数ソートになる）
+    max_sectors = 64
+
+    def __init__(self, workers=None, sectors=None, min_enemies=1024, min_bullets=64):
+        self.workers = workers or os.cpu_count() or 1
+        self.sectors = min(sectors or self.workers, self.max_sectors)
+        self.min_enemies = min_enemies
+        self.min_bullets = min_bullets
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='sector')
+
+    def close(self):
+        self.executor.shutdown()
+
+    def run(self, func, parts):
+        """
+        各セクターの添字の配列に func を並列に適用し、結果をセクターの順のリストで返す
+        """
+        if len(parts) == 1:
+            return [func(parts[0])]
+        return list(self.executor.map(func, parts))
+
+    def partition(self, cell_x):
+        """
+        セルの列の配列 cell_x の添字を、列の範囲で sectors 本の帯に分ける。
+        帯は x の小さい順、各帯の添字は昇順に並べたリストを返す（空の帯は除く）。
+        """
+        first = int(cell_x.min())
+        width = (int(cell_x.max()) - first) // self.sectors + 1
+        sector = ((cell_x - first) // width).astype(np.int8)
+        grouped = np.argsort(sector, kind='stable')
+        bounds = np.searchsorted(sector[grouped], np.arange(self.sectors + 1)).tolist()
+        return [grouped[a:b] for a, b in itertools.pairwise(bounds) if b > a]
+
+    def move_enemies(self, game, due, cell_size):
+        """
+        添字 due の敵の向きを決め直し（Engine.steer_enemies）、全員を速度の分だけ進める。
+        due の各敵のプレイヤーまでの距離の配列を返す。
+        """
+        enemies = game.enemies
+        n = enemies.count
+        due_mask = np.zeros(n, dtype=bool)
+        due_mask[due] = True
+        dist = np.empty(n)
+
+        def move(part):
+            mine = part[due_mask[part]]
+            dist[mine] = game.steer_enemies(mine)
+            enemies.x[part] += enemies.vx[part]
+            enemies.y[part] += enemies.vy[part]
+
+        self.run(move, self.partition(np.floor(enemies.x[:n] / cell_size).astype(np.int64)))
+        return dist[due]
+
+    def sort_keys(self, keys, cell_x):
+        """
+        SpatialHash のセルキー keys を安定ソートする添字の配列を返す（np.argsort(keys, kind='stable') と同じ）。
+        キーは列 cell_x が上位なので、列で切った帯ごとにソートして x の小さい順につなげばよい。
+        """
+        parts = self.partition(cell_x)
+        return np.concatenate(self.run(lambda part: part[np.argsort(keys[part], kind='stable')], parts))
+
+    def bullet_hits(self, game, live, cell_size):
+        """
+        添字 live の弾について、当たった (弾, 敵) の組を Engine.bullet_hits と同じ順で返す
+        """
+        bullets = game.player_bullets
+        parts = self.partition(np.floor(bullets.x[live] / cell_size).astype(np.int64))
+        results = self.run(lambda part: game.bullet_hits(live[part]), parts)
+        bullet_ids = np.concatenate([result[0] for result in results])
+        enemy_ids = np.concatenate([result[1] for result in results])
+        order = np.lexsort((enemy_ids, bullet_ids))
+        return bullet_ids[order], enemy_ids[order]
@@ -0,0 +1,158 @@
+"""
+スキルの登録簿。
+スキルは1つずつクラスにして、取得したときの効果（apply）、積み重なる能力値の補正（modifiers）、
+取得後に毎ティック行う処理（update）と描画（draw）を宣言する。スキルは状態を持たず、
+状態（衛星の置き場や電撃フィールドの充電など）はすべて Engine が持つ。
+
+Engine.grant_skill() でスキルを取得すると、能力値を取得済みのスキルの補正から計算し直し、
+有効な処理の一覧（Engine.combat_systems / bullet_systems / draw_systems）を作り直す。
+毎ティックはその一覧を順に呼ぶだけなので、取得していないスキルの処理は1ティックあたりのコストがかからない。
+
+    game.grant_skill('electric_field')
+"""
+
+# 毎ティックの処理を行う段階（Engine.update_game の中で呼ぶ位置）
+#   combat  : 無敵処理の後、自動照準の前（敵を倒す処理）
+#   bullets : プレイヤーの弾を進める直前
+STAGES = ('combat', 'bullets')
+
+
+class Modifier:
+    """
+    能力値 stat への補正。スキルを1回取得するごとに stat = stat * scale + add とし、
+    floor（数値か Engine の属性名）より小さくはしない。
+    能力値 stat の補正前の値は Engine の base_<stat> に置く。
+    """
+    def __init__(self, stat, add=0, scale=1, floor=None):
+        self.stat = stat
+        self.add = add
+        self.scale = scale
+        self.floor = floor
+
+    def apply(self, game, value):
+        value = value * self.scale + self.add
+        if self.floor is not None:
+            floor = getattr(game, self.floor) if isinstance(self.floor, str) else self.floor
+            value = max(floor, value)
+        return value
+
+
+class Skill:
+    """
+    スキルの基底クラス。key は内部の名前（スナップショットに書く）、name と description は選択画面の表示。
+    limit は取得できる回数の上限（None なら無制限）。offered が偽のスキルは選択肢に出さない。
+    stage が None でなければ、取得後はその段階で毎ティック update(game) を呼ぶ（同じ段階の中は order の順）。
+    draws が真なら、取得後は描画のたびに draw(app) を呼ぶ。
+    """
+    key = None
+    name = ''
+    description = ''
+    limit = None
+    offered = True
+    modifiers = ()
+    stage = None
+    order = 0
+    draws = False
+
+    def available(self, game, stacks):
+        """
+        選択肢に出せるか（stacks はこれまでに取得した回数）
+        """
+        return self.limit is None or stacks < self.limit
+
+    def apply(self, game):
+        """
+        取得したときに1回だけ行う効果
+        """
+
+    def update(self, game):
+        """
+        毎ティックの処理（stage が None でないスキルだけ呼ばれる）
+        """
+
+    def draw(self, app):
+        """
+        描画（draws が真のスキルだけ呼ばれる）
+        """
+
+
+class Satellite(Skill):
+    key = 'satellites'
+    name = '衛星砲'
+    description = 'プレイヤーを周回する補助砲台を追加'
+    stage = 'combat'
+    order = 1
+
+    def apply(self, game):
+        game.add_satellite()
+
+    def update(self, game):
+        game.update_satellites()
+
+
+class AttackSpeed(Skill):
+    key = 'attack_speed'
+    name = '攻撃速度アップ'
+    description = '弾の発射間隔がより短くなる'
+    modifiers = (Modifier('cooldown_time', add=-2, floor='min_cooldown'),)
+
+
+class FullHeal(Skill):
+    key = 'full_heal'
+    name = 'HP全回復'
+    description = 'プレイヤーのHPを最大値まで回復'
+
+    def apply(self, game):
+        game.player_hp = game.max_hp
+
+
+class SpeedUp(Skill):
+    key = 'speed_up'
+    name = 'スピードアップ'
+    description = 'プレイヤーの移動速度が1.5倍になる'
+    modifiers = (Modifier('player_speed', scale=1.5),)
+
+    def available(self, game, stacks):
+        return game.player_speed < 6
+
+
+class ElectricField(Skill):
+    key = 'electric_field'
+    name = '電撃フィールド'
+    description = 'プレイヤーの周囲に電撃フィールドを展開'
+    limit = 1
+    stage = 'combat'
+    order = 0
+    draws = True
+
+    def apply(self, game):
+        game.electric_field_active = True
+        game.electric_field_radius = 20
+        game.electric_field_damage = 1
+        game.electric_field_cooldown = 0
+
+    def update(self, game):
+        game.update_electric_field()
+
+    def draw(self, app):
+        app.draw_electric_field()
+
+
+class HomingBullets(Skill):
+    key = 'homing_bullets'
+    name = '誘導弾'
+    description = '弾が最も近い敵へ向かって曲がる'
+    limit = 1
+    # 選択肢には出さない（ベンチマークのシナリオなどから grant_skill で付ける）
+    offered = False
+    stage = 'bullets'
+
+    def update(self, game):
+        game.steer_homing_bullets()
+
+
+# 登録済みのスキル（選択肢の抽選はこの順の一覧から行う）
+SKILLS = (Satellite(), AttackSpeed(), FullHeal(), SpeedUp(), ElectricField(), HomingBullets())
+REGISTRY = {skill.key: skill for skill in SKILLS}
+# 補正のかかる能力値の名前
+STATS = tuple(dict.fromkeys(modifier.stat for skill in SKILLS for modifier in skill.modifiers))
@@ -0,0 +1,231 @@
+import math
+
+import numpy as np
+
+
+class SpatialHash:
+    """
+    一様グリッドによる空間ハッシュ。
+    座標配列をセル単位のバケットに振り分け、近傍セルだけを調べることで
+    衝突判定や最近傍探索の候補を絞り込む。エンティティは rebuild() に渡した配列の添字で扱う。
+
+    セルキーは (cx << 32) + cy の1つの整数にまとめ、キー順に並べた添字配列を持つ。
+    同じ cx の列は連続したキー範囲になるので、1列を二分探索1回で取り出せる。
+    """
+    # collect() でこの列数を超える範囲は、二分探索ではなく全件のマスクで取り出す
+    max_search_columns = 8
+    # nearest() はこの数以下なら全件を線形に走査した方が速い
+    linear_nearest_below = 1024
+    # rebuild() に渡した数がこれ以下なら、グリッド（キーのソート）を作らず、query() と query_many() も
+    # 全件を線形に走査する（benchmarks/bench_collision.py で、これより少ないとグリッドの方が遅い）
+    linear_query_below = 640
+    # query_many() で (点, エンティティ) の組がこれより多いときは、線形に走査せずにその場でグリッドを作る
+    linear_pairs_below = 2048
+
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.clear()
+
+    def __len__(self):
+        return self.live
+
+    def clear(self):
+        self.xs = np.zeros(0)
+        self.ys = np.zeros(0)
+        self.cell_x = np.zeros(0, dtype=np.int64)
+        self.cell_y = np.zeros(0, dtype=np.int64)
+        self.order = np.zeros(0, dtype=np.intp)
+        self.sorted_keys = np.zeros(0, dtype=np.int64)
+        self.alive = np.zeros(0, dtype=bool)
+        self.live = 0
+        # 全件を線形に走査するか（キー順の添字配列を作っていない）
+        self.linear = True
+        self.linear_x = np.zeros(0)
+        self.linear_y = np.zeros(0)
+        # 登録されているセルの範囲 (cx_min, cx_max, cy_min, cy_max)
+        self.bounds = None
+
+    def rebuild(self, xs, ys, alive=None, sort=None):
+        """
+        グリッドを xs, ys の座標で作り直す。
+        毎フレーム、敵の移動が終わった後に呼び出す。
+        alive を渡すと、偽になっている添字は最初から検索結果に含めない。
+        sort(keys, cell_x) を渡すと、セルキーを安定ソートする添字の計算をそれに任せる（SectorPool.sort_keys）。
+        """
+        self.xs = np.asarray(xs, dtype=float)
+        self.ys = np.asarray(ys, dtype=float)
+        if alive is None:
+            self.alive = np.ones(len(self.xs), dtype=bool)
+        else:
+            self.alive = np.array(alive, dtype=bool)
+        self.live = int(np.count_nonzero(self.alive))
+        self.linear = len(self.xs) <= self.linear_query_below
+        if self.linear:
+            # 生存していない添字の座標を NaN にした写し（NaN との比較は偽なので、距離の判定だけで除ける）。
+            # セルは collect() で必要になったときだけ計算する
+            self.linear_x = np.where(self.alive, self.xs, np.nan)
+            self.linear_y = np.where(self.alive, self.ys, np.nan)
+            self.cell_x = self.cell_y = None
+            self.order = np.zeros(0, dtype=np.intp)
+            self.sorted_keys = np.zeros(0, dtype=np.int64)
+            self.bounds = None
+        else:
+            self.build_grid(sort)
+
+    def build_grid(self, sort=None):
+        """
+        セルキーを計算してキー順の添字配列を作り、以後の検索をグリッドで行う
+        """
+        cx = np.floor(self.xs / self.cell_size).astype(np.int64)
+        cy = np.floor(self.ys / self.cell_size).astype(np.int64)
+        keys = (cx << 32) + cy
+        self.linear = False
+        self.cell_x = cx
+        self.cell_y = cy
+        self.order = np.argsort(keys, kind='stable') if sort is None else sort(keys, cx)
+        self.sorted_keys = keys[self.order]
+        if self.live:
+            self.bounds = (int(cx[self.alive].min()), int(cx[self.alive].max()),
+                           int(cy[self.alive].min()), int(cy[self.alive].max()))
+        else:
+            self.bounds = None
+
+    def remove(self, index):
+        """
+        添字 index のエンティティを以後の検索結果から外す
+        """
+        if self.alive[index]:
+            self.alive[index] = False
+            self.live -= 1
+            if self.linear:
+                self.linear_x[index] = self.linear_y[index] = np.nan
+
+    def collect(self, x0, x1, y0, y1):
+        """
+        セル範囲 [x0, x1] x [y0, y1] に入っている生存中の添字を昇順で返す
+        """
+        if self.linear:
+            cx = np.floor(self.xs / self.cell_size)
+            cy = np.floor(self.ys / self.cell_size)
+            return np.flatnonzero(self.alive & (cx >= x0) & (cx <= x1) & (cy >= y0) & (cy <= y1))
+        if self.bounds is None:
+            return np.zeros(0, dtype=np.intp)
+        x0 = max(x0, self.bounds[0])
+        x1 = min(x1, self.bounds[1])
+        if x0 > x1:
+            return np.zeros(0, dtype=np.intp)
+        if x1 - x0 >= self.max_search_columns:
+            cx = self.cell_x
+            cy = self.cell_y
+            return np.flatnonzero(self.alive & (cx >= x0) & (cx <= x1) & (cy >= y0) & (cy <= y1))
+        columns = np.arange(x0, x1 + 1, dtype=np.int64) << 32
+        lo = np.searchsorted(self.sorted_keys, columns + y0, side='left')
+        hi = np.searchsorted(self.sorted_keys, columns + y1, side='right')
+        if len(columns) == 1:
+            found = self.order[lo[0]:hi[0]]
+        else:
+            found = np.concatenate([
+                self.order[a:b] for a, b in zip(lo.tolist(), hi.tolist())
+            ])
+        found = found[self.alive[found]]
+        found.sort()
+        return found
+
+    def query(self, x, y, radius):
+        """
+        (x, y) から radius 未満の距離にいる可能性があるエンティティの添字を返す。
+        結果は添字の昇順なので、総当たりで「最初に当たった相手」を
+        選んでいた処理と同じ相手が選ばれる。正確な距離判定は呼び出し側で行う。
+        """
+        if self.linear:
+            return np.flatnonzero(np.hypot(self.linear_x - x, self.linear_y - y) < radius)
+        cs = self.cell_size
+        return self.collect(math.floor((x - radius) / cs), math.floor((x + radius) / cs),
+                            math.floor((y - radius) / cs), math.floor((y + radius) / cs))
+
+    def query_many(self, xs, ys, radius):
+        """
+        query() を複数の点 (xs[k], ys[k]) についてまとめて行う。
+        (点の番号, 添字) の組を2つの配列で返す。点の番号の昇順、同じ点の中では添字の昇順に並ぶ。
+        """
+        empty = np.zeros(0, dtype=np.intp)
+        if self.live == 0 or len(xs) == 0:
+            return empty, empty
+        if self.linear and len(xs) * len(self.xs) > self.linear_pairs_below:
+            self.build_grid()
+        if self.linear:
+            return np.nonzero(np.hypot(np.subtract.outer(xs, self.linear_x),
+                                       np.subtract.outer(ys, self.linear_y)) < radius)
+        cs = self.cell_size
+        x0 = np.floor((xs - radius) / cs).astype(np.int64)
+        y0 = np.floor((ys - radius) / cs).astype(np.int64)
+        y1 = np.floor((ys + radius) / cs).astype(np.int64)
+        # どの点も同じ列数を調べる（はみ出した列の候補は呼び出し側の距離判定で落ちる）
+        span = math.floor(2 * radius / cs) + 2
+        columns = (x0[:, None] + np.arange(span)) << 32
+        lo = np.searchsorted(self.sorted_keys, (columns + y0[:, None]).ravel(), side='left')
+        hi = np.searchsorted(self.sorted_keys, (columns + y1[:, None]).ravel(), side='right')
+        lengths = hi - lo
+        total = int(lengths.sum())
+        if total == 0:
+            return empty, empty
+        # 各範囲 [lo, hi) をつなげた位置の配列を作る
+        starts = np.cumsum(lengths) - lengths
+        positions = np.arange(total) + np.repeat(lo - starts, lengths)
+        rows = np.repeat(np.arange(len(xs)).repeat(span), lengths)
+        found = self.order[positions]
+        keep = self.alive[found]
+        rows = rows[keep]
+        found = found[keep]
+        ordered = np.lexsort((found, rows))
+        return rows[ordered], found[ordered]
+
+    def nearest(self, x, y):
+        """
+        (x, y) に最も近いエンティティの添字を返す（いなければ None）。
+        距離が同じ場合は添字の小さい方を選ぶので、全件を線形に走査した結果と一致する。
+
+        (x, y) のセルを中心とした正方形の範囲を倍々に広げながら探し、
+        見つかった最短距離が正方形の外側までの距離より短くなった時点で確定する。
+        """
+        if self.live == 0:
+            return None
+        if self.linear or self.live <= self.linear_nearest_below:
+            dist = np.hypot(self.xs - x, self.ys - y)
+            dist[~self.alive] = np.inf
+            return int(np.argmin(dist))
+        cs = self.cell_size
+        cx = math.floor(x / cs)
+        cy = math.floor(y / cs)
+        cx_min, cx_max, cy_min, cy_max = self.bounds
+        # 敵の密度から、1体は入っていそうな大きさの正方形から探し始める
+        area = (cx_max - cx_min + 1) * (cy_max - cy_min + 1)
+        r = max(1, math.ceil(math.sqrt(area / self.live) / 2))
+        while True:
+            found = self.collect(cx - r, cx + r, cy - r, cy + r)
+            covers_all = (cx - r <= cx_min and cx + r >= cx_max and
+                          cy - r <= cy_min and cy + r >= cy_max)
+            if len(found):
+                dist = np.hypot(self.xs[found] - x, self.ys[found] - y)
+                k = int(np.argmin(dist))
+                # 正方形の外にあるエンティティまでの距離の下限
+                outside = min(x - (cx - r) * cs, (cx + r + 1) * cs - x,
+                              y - (cy - r) * cs, (cy + r + 1) * cs - y)
+                if covers_all or dist[k] < outside:
+                    return int(found[k])
+            elif covers_all:
+                return None
+            r *= 2
+
+    def k_nearest(self, x, y, k, radius):
+        """
+        (x, y) から radius 未満の距離にあるエンティティを近い順に最大 k 件返す。
+        距離が同じ場合は添字の小さい方が先になる。
+        """
+        found = self.query(x, y, radius)
+        dist = np.hypot(self.xs[found] - x, self.ys[found] - y)
+        inside = dist < radius
+        found = found[inside]
+        dist = dist[inside]
+        nearest_first = np.argsort(dist, kind='stable')[:k]
+        return found[nearest_first]
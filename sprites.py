@@ -0,0 +1,145 @@
+import numpy as np
+import pyxel
+
+
+class SpriteAtlas:
+    """
+    敵・弾・経験値トークン・衛星の形をイメージバンクに焼き込んでおくアトラス。
+    同じ形（種類・大きさ・色）は1回だけ描き、以後は blt で貼り付ける。
+    形は使われたときに左上から行単位で詰めて置く。フレームの途中でいっぱいになったら、そのフレームで渡した
+    スプライトの場所を上書きしないように、残りの形は焼き込まずに直接描き、次の begin_frame() で全部描き直す。
+    背景は透明色 colkey で塗っておく（どのスプライトもこの色は使わない）。
+
+    スプライトは (u, v, 幅, 高さ)。焼き込めなかった形は (None, 形のキー, 幅, 高さ) で、draw_batch() が直接描く。
+    """
+    size = 256
+    colkey = 0
+
+    def __init__(self, image=0):
+        self.image = image
+        self.clear()
+
+    def clear(self):
+        pyxel.images[self.image].cls(self.colkey)
+        # 形のキー -> (u, v, 幅, 高さ)
+        self.sprites = {}
+        self.cursor_x = 0
+        self.cursor_y = 0
+        self.shelf_height = 0
+        # 場所が足りずに焼き込めなかった形があるか
+        self.full = False
+
+    def begin_frame(self):
+        """
+        フレームを描き始める前に呼ぶ。前のフレームでいっぱいになっていたら、ここで全部描き直す
+        """
+        if self.full:
+            self.clear()
+
+    def allocate(self, width, height):
+        """
+        幅 width、高さ height の場所を確保して (u, v) を返す（空きがなければ None）
+        """
+        if self.full:
+            return None
+        if self.cursor_x + width > self.size:
+            self.cursor_x = 0
+            self.cursor_y += self.shelf_height
+            self.shelf_height = 0
+        if self.cursor_y + height > self.size:
+            self.full = True
+            return None
+        u = self.cursor_x
+        v = self.cursor_y
+        self.cursor_x += width
+        self.shelf_height = max(self.shelf_height, height)
+        return u, v
+
+    def rect(self, width, height, col):
+        """
+        pyxel.rect(x, y, width, height, col) と同じ形のスプライトを返す
+        """
+        key = ('rect', width, height, col)
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            place = self.allocate(width, height)
+            if place is None:
+                return (None, key, width, height)
+            u, v = place
+            pyxel.images[self.image].rect(u, v, width, height, col)
+            sprite = (u, v, width, height)
+            self.sprites[key] = sprite
+        return sprite
+
+    def circ(self, radius, col):
+        """
+        pyxel.circ(x, y, radius, col) と同じ形のスプライトを返す（中心は (u + radius, v + radius)）
+        """
+        key = ('circ', radius, col)
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            size = 2 * radius + 1
+            place = self.allocate(size, size)
+            if place is None:
+                return (None, key, size, size)
+            u, v = place
+            pyxel.images[self.image].circ(u + radius, v + radius, radius, col)
+            sprite = (u, v, size, size)
+            self.sprites[key] = sprite
+        return sprite
+
+    def draw_batch(self, sprite, xs, ys):
+        """
+        左上の画面座標のリスト xs, ys に同じスプライトをまとめて描く
+        """
+        u, v, width, height = sprite
+        if u is None:
+            self.draw_direct(v, xs, ys)
+            return
+        image = self.image
+        colkey = self.colkey
+        blt = pyxel.blt
+        for x, y in zip(xs, ys):
+            blt(x, y, image, u, v, width, height, colkey)
+
+    def draw_direct(self, key, xs, ys):
+        """
+        アトラスに焼き込めなかった形 key を、左上の画面座標 xs, ys にそれぞれ直接描く
+        """
+        if key[0] == 'rect':
+            _, width, height, col = key
+            for x, y in zip(xs, ys):
+                pyxel.rect(x, y, width, height, col)
+        else:
+            _, radius, col = key
+            for x, y in zip(xs, ys):
+                pyxel.circ(x + radius, y + radius, radius, col)
+
+    def draw_sorted(self, sprites, kinds, xs, ys, width, height):
+        """
+        種類 kinds（0 から始まる整数の配列、種類が1つなら None でよい）ごとに sprites[種類] をまとめて描く。
+        xs, ys は左上の画面座標（整数の配列）で、どれも width x height の大きさとする。
+        画面 256x256 に少しもかからないものは描かない。
+        """
+        visible = (xs > -width) & (xs < self.size) & (ys > -height) & (ys < self.size)
+        if len(sprites) == 1:
+            self.draw_batch(sprites[0], xs[visible].tolist(), ys[visible].tolist())
+            return
+        kinds = kinds[visible]
+        order = np.argsort(kinds, kind='stable')
+        bounds = np.searchsorted(kinds[order], np.arange(len(sprites) + 1)).tolist()
+        xs = xs[visible][order].tolist()
+        ys = ys[visible][order].tolist()
+        for kind, sprite in enumerate(sprites):
+            start = bounds[kind]
+            end = bounds[kind + 1]
+            if start < end:
+                self.draw_batch(sprite, xs[start:end], ys[start:end])
+
+
+def screen_pixels(values):
+    """
+    pyxel と同じく、座標を最も近い整数のピクセル位置にする（0.5 は 0 から遠い方へ）
+    """
+    return np.trunc(values + np.copysign(0.5, values)).astype(np.int64)
+
@@ -0,0 +1,270 @@
+"""
+バランス調整用のバッチシミュレータ。
+自動操作のボット（BotInput）にヘッドレスの Engine を遊ばせ、パラメータの組み合わせごとに
+何ゲームも並列に（プロセスプールで全コアを使って）実行し、生存時間・スコア・エンティティ数のピーク・
+1ティックの処理時間を集計して表にする。
+
+パラメータは Engine の属性名で指定する（skill_threshold_quadratic / skill_threshold_linear、
+level_threshold_quadratic / level_threshold_linear、base_spawn_interval / spawn_interval_step /
+min_spawn_interval、base_cooldown_time / base_player_speed、green_ring_size / cyan_wave_size など）。
+スキルの閾値（skill_threshold_*）と、敵の湧く間隔を縮めるレベルの閾値（level_threshold_*）は別の属性なので、
+難しさの上がり方も変えたいときは両方を指定する。
+どの組み合わせも同じ seed の列で遊ぶので、組み合わせどうしの差に乱数のばらつきが入りにくい。
+
+    python sweep.py --param base_spawn_interval=20,30,40 --param skill_threshold_quadratic=4,5,6 --games 50
+    python sweep.py --games 200 --scaling
+"""
+import argparse
+import csv
+import itertools
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from engine import TICK_RATE, Engine, InputState
+from skills import REGISTRY, STATS
+
+# ゲーム中に base_<名前> から計算し直す属性（レベルが上がると spawn_interval、スキルを取ると STATS）。
+# 直接指定しても上書きされるので、base_<名前> の方を指定させる
+DERIVED_PARAMS = {name: 'base_' + name for name in ('spawn_interval', *STATS)}
+
+
+class BotInput:
+    """
+    スクリプトで動くボットの入力ソース。
+    decision_interval ティックごとに、danger_radius 内の敵と敵の弾から距離の2乗に反比例して逃げる向きを決め、
+    危険がなければ近くの経験値トークンへ向かう。
+    スキル選択画面では skill_priority に並べたスキルのキー（skills.py の key）の順に選ぶ
+    （HP が半分以下なら HP全回復 を優先する）。
+    """
+    skill_priority = ('electric_field', 'satellites', 'attack_speed', 'speed_up', 'full_heal')
+
+    def __init__(self, decision_interval=4, danger_radius=64, token_radius=160):
+        unknown = [key for key in self.skill_priority if key not in REGISTRY]
+        if unknown:
+            raise ValueError(f"unknown skills in skill_priority: {unknown}")
+        self.decision_interval = decision_interval
+        self.danger_radius = danger_radius
+        self.token_radius = token_radius
+        self.game = None
+        self.tick = 0
+        self.state = InputState()
+
+    def attach(self, game):
+        self.game = game
+
+    def read(self):
+        if self.game.show_skill_select:
+            return self.pick_skill()
+        if self.tick % self.decision_interval == 0:
+            self.state = self.steer()
+        self.tick += 1
+        return self.state
+
+    def pick_skill(self):
+        """
+        選ぶスキルの選択肢の中央をクリックする入力を返す
+        """
+        game = self.game
+        keys = [option.key for option in game.skill_options]
+        priority = list(self.skill_priority)
+        if game.player_hp * 2 <= game.max_hp:
+            priority.insert(0, 'full_heal')
+        choice = min(range(len(keys)),
+                     key=lambda k: priority.index(keys[k]) if keys[k] in priority else len(priority))
+        # 選択肢 k の領域は (60, 90 + 35k) - (200, 125 + 35k)
+        return InputState(mouse_x=130, mouse_y=107 + 35 * choice, click=True)
+
+    def steer(self):
+        """
+        移動する向きを決めて、画面中央からその向きへマウスを置いた入力を返す
+        """
+        game = self.game
+        px = game.player_x
+        py = game.player_y
+        fx = 0.0
+        fy = 0.0
+        radius2 = self.danger_radius ** 2
+        for store, weight in ((game.enemies, 1.0), (game.enemy_bullets, 2.0)):
+            n = store.count
+            dx = store.x[:n] - px
+            dy = store.y[:n] - py
+            d2 = dx * dx + dy * dy
+            near = store.alive[:n] & (d2 < radius2) & (d2 > 0)
+            if near.any():
+                fx -= weight * float((dx[near] / d2[near]).sum())
+                fy -= weight * float((dy[near] / d2[near]).sum())
+
+        if fx == 0.0 and fy == 0.0:
+            tokens = game.exp_tokens
+            n = tokens.count
+            if not tokens.live:
+                return InputState()
+            dx = tokens.x[:n] - px
+            dy = tokens.y[:n] - py
+            d2 = np.where(tokens.alive[:n], dx * dx + dy * dy, np.inf)
+            i = int(np.argmin(d2))
+            if d2[i] > self.token_radius ** 2:
+                return InputState()
+            fx = float(dx[i])
+            fy = float(dy[i])
+
+        length = math.hypot(fx, fy)
+        return InputState(mouse_x=128 + round(fx / length * 64), mouse_y=128 + round(fy / length * 64),
+                          move=True)
+
+
+def parse_param(text):
+    """
+    "name=1,2,3" を (name, [1, 2, 3]) にする（小数点があれば float）
+    """
+    name, values = text.split('=', 1)
+    return name, [float(v) if '.' in v else int(v) for v in values.split(',')]
+
+
+def play_game(task):
+    """
+    （ワーカー側）1ゲームをボットに遊ばせて結果を返す。task は (パラメータの dict, seed, 最大ティック数)。
+    """
+    params, seed, max_ticks = task
+    bot = BotInput()
+    game = Engine(seed=seed, input_source=bot)
+    bot.attach(game)
+    for name, value in params.items():
+        if name in DERIVED_PARAMS:
+            raise ValueError(f"{name} is recomputed during the game; use {DERIVED_PARAMS[name]} instead")
+        if not hasattr(game, name):
+            raise ValueError(f"unknown parameter: {name}")
+        setattr(game, name, value)
+    game.spawn_interval = game.base_spawn_interval
+    game.resolve_stats()
+    game.next_skill_threshold = game.get_skill_threshold(game.skill_level)
+
+    peak_enemies = peak_bullets = peak_tokens = 0
+    start = time.perf_counter()
+    for _ in range(max_ticks):
+        game.update()
+        peak_enemies = max(peak_enemies, len(game.enemies))
+        peak_bullets = max(peak_bullets, len(game.player_bullets) + len(game.enemy_bullets))
+        peak_tokens = max(peak_tokens, len(game.exp_tokens))
+        if game.game_over:
+            break
+    elapsed = time.perf_counter() - start
+    return {
+        'params': params,
+        'seed': seed,
+        'ticks': game.tick_count,
+        'died': game.game_over,
+        'score': game.score,
+        'skills': game.skill_level - 1,
+        'peak_enemies': peak_enemies,
+        'peak_bullets': peak_bullets,
+        'peak_exp_tokens': peak_tokens,
+        'ms_per_tick': elapsed * 1000 / max(game.tick_count, 1),
+    }
+
+
+def run_batch(tasks, workers):
+    """
+    tasks をプロセスプールで実行し、(結果のリスト, 経過秒) を返す。workers が1ならこのプロセスで実行する。
+    """
+    start = time.perf_counter()
+    if workers == 1:
+        results = [play_game(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(play_game, tasks, chunksize=max(1, len(tasks) // (workers * 8))))
+    return results, time.perf_counter() - start
+
+
+def summarize(results):
+    """
+    パラメータの組み合わせごとに結果を集計した dict のリストを返す
+    """
+    groups = {}
+    for result in results:
+        groups.setdefault(tuple(result['params'].items()), []).append(result)
+    rows = []
+    for key, group in groups.items():
+        seconds = np.array([r['ticks'] for r in group]) / TICK_RATE
+        rows.append({
+            **dict(key),
+            'games': len(group),
+            'died': sum(r['died'] for r in group) / len(group),
+            'survival_median_s': float(np.median(seconds)),
+            'survival_mean_s': float(seconds.mean()),
+            'score_mean': float(np.mean([r['score'] for r in group])),
+            'skills_mean': float(np.mean([r['skills'] for r in group])),
+            'peak_enemies': max(r['peak_enemies'] for r in group),
+            'peak_bullets': max(r['peak_bullets'] for r in group),
+            'peak_exp_tokens': max(r['peak_exp_tokens'] for r in group),
+            'ms_per_tick': float(np.mean([r['ms_per_tick'] for r in group])),
+        })
+    return rows
+
+
+def print_table(rows, names):
+    header = ' '.join(f"{name:>14}" for name in names)
+    print(f"{header} {'games':>6} {'died':>5} {'surv med s':>10} {'surv avg s':>10} {'score':>8} "
+          f"{'skills':>6} {'enemies':>7} {'bullets':>7} {'tokens':>6} {'ms/tick':>7}")
+    for row in rows:
+        values = ' '.join(f"{row[name]:>14}" for name in names)
+        print(f"{values} {row['games']:>6} {row['died']:>5.0%} {row['survival_median_s']:>10.1f} "
+              f"{row['survival_mean_s']:>10.1f} {row['score_mean']:>8.1f} {row['skills_mean']:>6.1f} "
+              f"{row['peak_enemies']:>7} {row['peak_bullets']:>7} {row['peak_exp_tokens']:>6} "
+              f"{row['ms_per_tick']:>7.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ボットでゲームをまとめて遊ばせてバランスを調べる")
+    parser.add_argument('--param', action='append', default=[],
+                        help="Engine の属性=値1,値2,... （複数指定で全組み合わせ）")
+    parser.add_argument('--games', type=int, default=20, help="組み合わせごとのゲーム数")
+    parser.add_argument('--minutes', type=float, default=5, help="1ゲームの最長時間（ゲーム内の分）")
+    parser.add_argument('--seed', type=int, default=0, help="最初のゲームの seed（以降は1ずつ増やす）")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="ワーカープロセスの数")
+    parser.add_argument('--csv', help="1ゲームごとの結果を CSV に書き出す")
+    parser.add_argument('--scaling', action='store_true',
+                        help="同じバッチをワーカー数 1, 2, 4, ... で実行してスループットを比べる")
+    args = parser.parse_args()
+
+    grid = [parse_param(text) for text in args.param]
+    names = [name for name, _ in grid]
+    max_ticks = int(args.minutes * 60 * TICK_RATE)
+    tasks = [(dict(zip(names, values)), args.seed + game, max_ticks)
+             for values in itertools.product(*[values for _, values in grid])
+             for game in range(args.games)]
+
+    if args.scaling:
+        counts = sorted({1 << k for k in range(int(math.log2(args.workers)) + 1)} | {args.workers})
+        print(f"{'workers':>7} {'games/min':>10} {'speedup':>8} {'efficiency':>10}")
+        base = None
+        for workers in counts:
+            _, elapsed = run_batch(tasks, workers)
+            rate = len(tasks) / elapsed * 60
+            base = base or rate
+            print(f"{workers:>7} {rate:>10.1f} {rate / base:>7.2f}x {rate / base / workers:>10.0%}")
+        return
+
+    results, elapsed = run_batch(tasks, args.workers)
+    print_table(summarize(results), names)
+    ticks = sum(r['ticks'] for r in results)
+    print(f"{len(results)} games, {ticks} ticks in {elapsed:.1f}s with {args.workers} workers: "
+          f"{len(results) / elapsed * 60:.1f} games/min, {ticks / elapsed:.0f} ticks/s")
+
+    if args.csv:
+        fieldnames = names + [key for key in results[0] if key != 'params']
+        with open(args.csv, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            for result in results:
+                row = {key: value for key, value in result.items() if key != 'params'}
+                row.update(result['params'])
+                writer.writerow(row)
+
+
+if __name__ == '__main__':
+    main()
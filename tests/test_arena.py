@@ -0,0 +1,103 @@
+from types import MappingProxyType
+
+import numpy as np
+
+from entities import Arena
+
+
+class ValueStore(Arena):
+    fields = MappingProxyType({'value': np.int64})
+
+    def spawn(self, value):
+        i = self.push()
+        self.value[i] = value
+        return i
+
+    def spawn_many(self, values):
+        start = self.push_many(len(values))
+        self.value[start:start + len(values)] = values
+        return start
+
+
+def values(store):
+    return store.value[:store.count].tolist()
+
+
+def test_stale_handle_is_rejected():
+    store = ValueStore(capacity=4)
+    i = store.spawn(10)
+    handle = store.handle(i)
+    assert store.resolve(handle) == i
+
+    store.despawn(i)
+    # 削除待ちの間も無効
+    assert store.resolve(handle) is None
+    store.flush()
+    assert store.resolve(handle) is None
+
+    # 同じ ID が再利用されても、世代が違うので古いハンドルは無効のまま
+    j = store.spawn(20)
+    assert store.ids[j] == handle & 0xFFFFFFFF
+    assert store.resolve(handle) is None
+    assert store.resolve(store.handle(j)) == j
+
+
+def test_handles_follow_swap_remove():
+    store = ValueStore(capacity=4)
+    handles = [store.handle(store.spawn(v)) for v in range(6)]
+    store.despawn(0)
+    store.flush()
+    for v, handle in enumerate(handles[1:], start=1):
+        assert store.value[store.resolve(handle)] == v
+
+
+def test_despawn_twice_in_one_tick():
+    store = ValueStore()
+    for v in range(5):
+        store.spawn(v)
+    store.despawn(2)
+    store.despawn(2)
+    store.despawn_mask(np.array([False, False, True, False, True]))
+    assert len(store) == 3
+    assert store.pending == [2, 4]
+    store.flush()
+    assert store.count == 3
+    assert sorted(values(store)) == [0, 1, 3]
+    # 同じ ID が空きに2回入らない
+    assert len(store.free_ids) == len(set(store.free_ids)) == 2
+
+
+def test_push_many_matches_push():
+    one = ValueStore(capacity=2)
+    many = ValueStore(capacity=2)
+    for store in (one, many):
+        for v in range(4):
+            store.spawn(v)
+        store.despawn(1)
+        store.despawn(3)
+        store.flush()
+    for v in range(4, 9):
+        one.spawn(v)
+    many.spawn_many(np.arange(4, 9))
+    assert values(one) == values(many)
+    assert one.ids[:one.count].tolist() == many.ids[:many.count].tolist()
+    assert one.where[:one.next_id].tolist() == many.where[:many.next_id].tolist()
+    assert one.next_id == many.next_id
+    assert one.free_ids == many.free_ids == []
+
+
+def test_push_many_then_flush_order():
+    store = ValueStore(capacity=2)
+    store.spawn_many(np.arange(6))
+    handles = [store.handle(i) for i in range(6)]
+    store.despawn(4)
+    store.despawn(1)
+    store.flush()
+    # 前側の穴 1 には、末尾の生存要素 5 が入る
+    assert values(store) == [0, 5, 2, 3]
+    assert [store.resolve(h) for h in handles] == [0, None, 2, 3, None, 1]
+    # 次の push_many は、最後に空いた ID から順に再利用する
+    start = store.spawn_many(np.array([6, 7, 8]))
+    assert start == 4
+    assert store.ids[4:7].tolist() == [handles[1] & 0xFFFFFFFF, handles[4] & 0xFFFFFFFF, 6]
+    assert values(store) == [0, 5, 2, 3, 6, 7, 8]
@@ -0,0 +1,21 @@
+import numpy as np
+
+from engine import TICK_RATE, Engine
+from flowfield import FlowField
+
+
+def test_blue_aims_from_position_before_moving():
+    game = Engine(seed=0)
+    # 流れ場に沿って動く敵は進む向きがプレイヤーへの向きとずれるので、移動の前後で狙う向きが変わる
+    game.flow_field = FlowField()
+    i = game.enemies.spawn(game.player_x + 70, game.player_y + 30, 'blue')
+    game.enemies.shoot_timer[i] = TICK_RATE - 1
+    x, y = game.enemies.x[i], game.enemies.y[i]
+    game.update()
+
+    bullets = game.enemy_bullets
+    assert bullets.count == 1
+    assert (bullets.x[0], bullets.y[0]) != (x, y)
+    aim = np.arctan2(game.player_y - y, game.player_x - x)
+    assert np.isclose(np.arctan2(bullets.vy[0], bullets.vx[0]), aim)
+    assert np.isclose(np.hypot(bullets.vx[0], bullets.vy[0]), game.enemy_bullet_speed)
@@ -0,0 +1,10 @@
+import build_font
+
+
+def test_font_has_every_consumer_glyph():
+    assert build_font.missing_by_consumer() == {}
+
+
+def test_demo_strings_are_collected():
+    chars = build_font.collect_characters(build_font.default_sources())
+    assert set('▲こんにちは') <= chars
@@ -0,0 +1,46 @@
+import random
+
+from engine import Engine, InputState
+from flowfield import FlowField
+from replay import Replay, ReplayRecorder, play
+
+
+class RandomInput:
+    """
+    マウスを乱数で動かし、ときどきクリックやスキルのキーを押す入力ソース
+    """
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+
+    def read(self):
+        rng = self.rng
+        return InputState(rng.randrange(256), rng.randrange(256), rng.random() < 0.8,
+                          click=rng.random() < 0.05, key_t=rng.random() < 0.02,
+                          key_y=rng.random() < 0.02, key_u=rng.random() < 0.02)
+
+
+def record(path, ticks, flow_field):
+    recorder = ReplayRecorder(RandomInput(7), seed=1234)
+    engine = Engine(seed=1234, input_source=recorder)
+    recorder.attach(engine)
+    if flow_field:
+        engine.flow_field = FlowField()
+    engine.run(ticks)
+    recorder.save(path)
+
+
+def test_replay_with_flow_field(tmp_path):
+    path = tmp_path / 'flow.pxr'
+    record(path, 1200, flow_field=True)
+    replay = Replay.load(path)
+    assert replay.flow_field
+    assert replay.checksums
+    assert play(replay) is None
+
+
+def test_replay_without_flow_field(tmp_path):
+    path = tmp_path / 'plain.pxr'
+    record(path, 1200, flow_field=False)
+    replay = Replay.load(path)
+    assert not replay.flow_field
+    assert play(replay) is None
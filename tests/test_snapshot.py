@@ -0,0 +1,66 @@
+import random
+
+import pytest
+
+from engine import Engine, InputState
+
+
+class Recorded:
+    """
+    記録した入力を順に返す入力ソース（2つの Engine に同じ入力を渡す）
+    """
+    def __init__(self, inputs):
+        self.inputs = iter(inputs)
+
+    def read(self):
+        return next(self.inputs, InputState())
+
+
+def random_inputs(seed, ticks):
+    rng = random.Random(seed)
+    return [InputState(rng.randrange(256), rng.randrange(256), rng.random() < 0.8,
+                       click=rng.random() < 0.05, key_t=rng.random() < 0.02,
+                       key_y=rng.random() < 0.02, key_u=rng.random() < 0.02)
+            for _ in range(ticks)]
+
+
+def busy_engine(seed):
+    engine = Engine(seed=seed)
+    # 群れを早く湧かせて、待ち行列と前もって作った配置も途中の状態に含める
+    engine.green_ring_interval = 300
+    engine.cyan_wave_interval = 450
+    return engine
+
+
+def test_restore_continues_identically():
+    inputs = random_inputs(3, 3000)
+    game = busy_engine(11)
+    game.input_source = Recorded(inputs[:1000])
+    game.run(1000)
+    data = game.snapshot()
+
+    copy = Engine(seed=99)
+    copy.restore(data)
+    assert copy.snapshot() == data
+
+    game.input_source = Recorded(inputs[1000:])
+    copy.input_source = Recorded(inputs[1000:])
+    for _ in range(2000):
+        game.update()
+        copy.update()
+        assert copy.checksum() == game.checksum()
+    assert copy.snapshot() == game.snapshot()
+
+
+def test_restore_keeps_rng_state():
+    game = busy_engine(5)
+    game.run(400)
+    copy = Engine(seed=6)
+    copy.restore(game.snapshot())
+    assert copy.rng.random() == game.rng.random()
+    assert copy.np_rng.random() == game.np_rng.random()
+
+
+def test_restore_rejects_other_data():
+    with pytest.raises(ValueError):
+        Engine(seed=0).restore(b'\0' * 1024)
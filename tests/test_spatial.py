@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from spatial import SpatialHash
+
+CELL = 8
+
+
+def nearest_reference(xs, ys, alive, x, y):
+    dist = np.hypot(xs - x, ys - y)
+    dist[~alive] = np.inf
+    return None if not alive.any() else int(np.argmin(dist))
+
+
+def k_nearest_reference(xs, ys, alive, x, y, k, radius):
+    dist = np.hypot(xs - x, ys - y)
+    inside = np.flatnonzero(alive & (dist < radius))
+    return inside[np.argsort(dist[inside], kind='stable')][:k].tolist()
+
+
+def scenes():
+    rng = np.random.default_rng(1)
+    for n in (0, 1, 5, 60, 700, 3000):
+        # 広い範囲にまばらに置き、空のセルが多くなるようにする
+        xs = rng.uniform(-600, 600, n)
+        ys = rng.uniform(-600, 600, n)
+        yield f'random-{n}', xs, ys
+    # セルの境界上の点と、同じ距離の点（添字の小さい方が先になるか）
+    grid = np.arange(-5, 6) * CELL
+    gx, gy = np.meshgrid(grid, grid)
+    yield 'boundaries', gx.ravel().astype(float), gy.ravel().astype(float)
+    # 同じ位置に重なった点
+    yield 'duplicates', np.repeat([0.0, 16.0, -8.0], 4), np.repeat([0.0, 8.0, 24.0], 4)
+    # グリッドで探す数に増やした、境界上の点
+    big = np.tile(np.arange(-40, 40) * CELL, 40).astype(float)
+    yield 'boundaries-large', big, np.repeat(np.arange(-20, 20) * CELL, 80).astype(float)
+
+
+def query_points():
+    rng = np.random.default_rng(2)
+    points = [(0.0, 0.0), (CELL, CELL), (-CELL, 4.0), (4.0, 4.0), (1000.0, -1000.0)]
+    points += [tuple(p) for p in rng.uniform(-650, 650, (40, 2)).tolist()]
+    return points
+
+
+@pytest.mark.parametrize('linear_below', [0, 10**9])
+@pytest.mark.parametrize('name, xs, ys', list(scenes()), ids=[s[0] for s in scenes()])
+def test_nearest_and_k_nearest_match_brute_force(name, xs, ys, linear_below):
+    grid = SpatialHash(CELL)
+    grid.linear_query_below = linear_below
+    grid.linear_nearest_below = linear_below
+    rng = np.random.default_rng(3)
+    alive = rng.random(len(xs)) < 0.8
+    grid.rebuild(xs, ys, alive)
+    # rebuild() の後に外したエンティティも結果に含めない
+    for i in np.flatnonzero(alive)[::7].tolist():
+        grid.remove(i)
+        alive[i] = False
+    for x, y in query_points():
+        assert grid.nearest(x, y) == nearest_reference(xs, ys, alive, x, y)
+        for k, radius in ((1, 8.0), (3, 16.0), (10, 40.0), (50, 300.0)):
+            assert grid.k_nearest(x, y, k, radius).tolist() == k_nearest_reference(xs, ys, alive, x, y, k, radius)
+
+
+@pytest.mark.parametrize('linear_below', [0, 10**9])
+def test_query_many_matches_brute_force(linear_below):
+    rng = np.random.default_rng(4)
+    xs = rng.uniform(-300, 300, 500)
+    ys = rng.uniform(-300, 300, 500)
+    grid = SpatialHash(CELL)
+    grid.linear_query_below = linear_below
+    alive = rng.random(500) < 0.9
+    grid.rebuild(xs, ys, alive)
+    px = np.append(rng.uniform(-300, 300, 30), [0.0, CELL])
+    py = np.append(rng.uniform(-300, 300, 30), [CELL, 0.0])
+    rows, found = grid.query_many(px, py, CELL)
+    for k, (x, y) in enumerate(zip(px.tolist(), py.tolist())):
+        near = found[rows == k]
+        hits = near[np.hypot(xs[near] - x, ys[near] - y) < CELL].tolist()
+        expected = np.flatnonzero(alive & (np.hypot(xs - x, ys - y) < CELL)).tolist()
+        assert hits == expected
+        candidates = grid.query(x, y, CELL)
+        assert candidates[np.hypot(xs[candidates] - x, ys[candidates] - y) < CELL].tolist() == expected
+        assert near.tolist() == sorted(near.tolist())
@@ -0,0 +1,50 @@
+import os
+import sys
+
+import pytest
+
+if sys.platform.startswith('linux') and not (os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY')):
+    os.environ.setdefault('SDL_VIDEODRIVER', 'offscreen')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+pyxel = pytest.importorskip('pyxel')
+
+from sprites import SpriteAtlas
+
+
+@pytest.fixture(scope='module')
+def atlas():
+    pyxel.init(256, 256)
+    return SpriteAtlas(image=0)
+
+
+def pixels(sprite):
+    u, v, width, height = sprite
+    image = pyxel.images[0]
+    return [image.pget(u + x, v + y) for y in range(height) for x in range(width)]
+
+
+def test_full_atlas_keeps_sprites_handed_out_this_frame(atlas):
+    atlas.clear()
+    atlas.begin_frame()
+    # 64x64 の四角は 16 個でアトラスが埋まる
+    handed_out = [atlas.rect(64, 64 - k // 8, 1 + k % 8) for k in range(16)]
+    before = [pixels(sprite) for sprite in handed_out]
+    overflow = atlas.rect(64, 64, 9)
+    circle = atlas.circ(20, 5)
+    # 焼き込めなかった形は直接描くスプライトになり、渡し済みの場所は上書きされない
+    assert overflow[0] is None and circle[0] is None
+    assert [pixels(sprite) for sprite in handed_out] == before
+    assert atlas.rect(64, 64, 1) == handed_out[0]
+
+    pyxel.cls(0)
+    atlas.draw_batch(overflow, [10], [20])
+    atlas.draw_batch(circle, [100], [100])
+    assert pyxel.pget(10, 20) == 9 and pyxel.pget(73, 83) == 9
+    assert pyxel.pget(120, 120) == 5
+
+    # 次のフレームの初めに描き直してから、また焼き込む
+    atlas.begin_frame()
+    assert not atlas.full
+    sprite = atlas.rect(64, 64, 9)
+    assert sprite[0] is not None
+    assert set(pixels(sprite)) == {9}
@@ -0,0 +1,190 @@
+from collections import OrderedDict
+
+import numpy as np
+import pyxel
+
+from packedfont import PackedFont
+
+# image.set に渡す、色番号 -> 16進数の1文字
+HEX_DIGITS = np.array(list('0123456789abcdef'))
+
+
+def draw_string(target, x, y, s, col, font=None):
+    """
+    target（pyxel モジュールまたは pyxel.Image）に文字列を描く。
+    font には pyxel.Font と PackedFont のどちらも使える。
+    """
+    if isinstance(font, PackedFont):
+        font.draw(target, x, y, s, col)
+    else:
+        target.text(x, y, s, col, font)
+
+
+def draw_text_with_border(x, y, s, col, bcol, font=None):
+    """
+    文字を描画する際に、縁取り（border）をつけるためのヘルパー関数。
+    キャッシュを使わずに毎回 9 回 pyxel.text を呼ぶ。
+    """
+    for dx in range(-1, 2):
+        for dy in range(-1, 2):
+            if dx != 0 or dy != 0:
+                draw_string(pyxel, x + dx, y + dy, s, bcol, font)
+    draw_string(pyxel, x, y, s, col, font)
+
+
+class TextCache:
+    """
+    文字列の描画結果をイメージバンクのアトラスに保存しておき、2回目からは blt 1回で描くキャッシュ。
+    (文字列, フォント, 色, 縁取りの色) の組ごとに1回だけラスタライズする。
+
+    アトラスは高さ slot_height の行に分け、各行の空いている横の区間に左から詰めて置く。
+    空きがなくなったら最近使われていないものから追い出す（LRU）。
+    行に収まらない文字列（改行を含む・幅が広すぎる）はキャッシュせずに直接描く。
+    """
+    size = 256
+
+    def __init__(self, image=1, slot_height=16):
+        self.image = image
+        self.slot_height = slot_height
+        self.rows = self.size // slot_height
+        # キー -> (行, x, 幅, 透明色)。末尾ほど最近使ったもの
+        self.entries = OrderedDict()
+        # 行ごとの空き区間 [x, 幅] のリスト（x の昇順）
+        self.free = [[[0, self.size]] for _ in range(self.rows)]
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        self.entries.clear()
+        self.free = [[[0, self.size]] for _ in range(self.rows)]
+
+    def text(self, x, y, s, col, font=None):
+        """
+        pyxel.text(x, y, s, col, font) と同じものを描く
+        """
+        self.draw(x, y, s, col, None, font)
+
+    def text_with_border(self, x, y, s, col, bcol, font=None):
+        """
+        draw_text_with_border(x, y, s, col, bcol, font) と同じものを描く
+        """
+        self.draw(x, y, s, col, bcol, font)
+
+    def draw(self, x, y, s, col, bcol, font):
+        key = (s, font, col, bcol)
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            entry = self.rasterize(key)
+            if entry is None:
+                if bcol is None:
+                    draw_string(pyxel, x, y, s, col, font)
+                else:
+                    draw_text_with_border(x, y, s, col, bcol, font)
+                return
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        row, slot_x, width, colkey = entry
+        # アトラスには縁取りの分だけ右下にずらして描いてある
+        pyxel.blt(x - 1, y - 1, self.image, slot_x, row * self.slot_height,
+                  width, self.slot_height, colkey)
+
+    def rasterize(self, key):
+        """
+        アトラスに場所を確保して文字列を描き、エントリを返す（収まらなければ None）
+        """
+        s, font, col, bcol = key
+        if '\n' in s:
+            return None
+        text_width = font.text_width(s) if font is not None else len(s) * pyxel.FONT_WIDTH
+        width = text_width + 2
+        if width > self.size:
+            return None
+        place = self.allocate(width)
+        while place is None and self.entries:
+            self.evict()
+            place = self.allocate(width)
+        if place is None:
+            return None
+
+        row, slot_x = place
+        slot_y = row * self.slot_height
+        # 文字にも縁取りにも使っていない色を透明色にする
+        colkey = next(c for c in range(16) if c != col and c != bcol)
+        image = pyxel.images[self.image]
+        image.clip(slot_x, slot_y, width, self.slot_height)
+        if isinstance(font, PackedFont):
+            self.compose(image, slot_x, slot_y, width, s, col, bcol, font, colkey)
+        else:
+            self.draw_into(image, slot_x, slot_y, width, s, col, bcol, font, colkey)
+        image.clip()
+
+        entry = (row, slot_x, width, colkey)
+        self.entries[key] = entry
+        return entry
+
+    def draw_into(self, image, slot_x, slot_y, width, s, col, bcol, font, colkey):
+        """
+        pyxel.Font（または組み込みフォント）の文字列を image.text で区画に描く
+        """
+        image.rect(slot_x, slot_y, width, self.slot_height, colkey)
+        if bcol is None:
+            draw_string(image, slot_x + 1, slot_y + 1, s, col, font)
+        else:
+            for dx in range(-1, 2):
+                for dy in range(-1, 2):
+                    if dx != 0 or dy != 0:
+                        draw_string(image, slot_x + 1 + dx, slot_y + 1 + dy, s, bcol, font)
+            draw_string(image, slot_x + 1, slot_y + 1, s, col, font)
+
+    def compose(self, image, slot_x, slot_y, width, s, col, bcol, font, colkey):
+        """
+        PackedFont の文字列を配列上で組み立て、image.set 1回で区画に書き込む
+        """
+        height = self.slot_height
+        # 縁取りが区画の外から1ピクセルはみ出して入ってくる分も含めて、周囲1ピクセル広く描く
+        mask = np.zeros((height + 2, width + 2), dtype=bool)
+        font.paint(mask, 2, 2, s)
+        pixels = np.full((height, width), colkey, dtype=np.uint8)
+        if bcol is not None:
+            border = np.zeros((height, width), dtype=bool)
+            for dx in range(-1, 2):
+                for dy in range(-1, 2):
+                    if dx != 0 or dy != 0:
+                        border |= mask[1 - dy:1 - dy + height, 1 - dx:1 - dx + width]
+            pixels[border] = bcol
+        pixels[mask[1:1 + height, 1:1 + width]] = col
+        image.set(slot_x, slot_y, [''.join(row) for row in HEX_DIGITS[pixels].tolist()])
+
+    def allocate(self, width):
+        """
+        幅 width の空き区間を探して (行, x) を返す（最初に見つかったもの）
+        """
+        for row, spans in enumerate(self.free):
+            for span in spans:
+                if span[1] >= width:
+                    slot_x = span[0]
+                    span[0] += width
+                    span[1] -= width
+                    if span[1] == 0:
+                        spans.remove(span)
+                    return row, slot_x
+        return None
+
+    def evict(self):
+        """
+        最近使われていないエントリを1つ追い出し、その区間を空きに戻す
+        """
+        _, (row, slot_x, width, _) = self.entries.popitem(last=False)
+        spans = self.free[row]
+        spans.append([slot_x, width])
+        spans.sort()
+        merged = [spans[0]]
+        for span in spans[1:]:
+            last = merged[-1]
+            if last[0] + last[1] == span[0]:
+                last[1] += span[1]
+            else:
+                merged.append(span)
+        self.free[row] = merged
@@ -0,0 +1,235 @@
+"""
+群れのスポーンの予定表（タイムライン）。
+群れは Wave のデータで定義し、Timeline が「次に湧くティック」の優先度付きキュー（heapq）で管理する。
+群れの配置（プレイヤーからの相対位置と速度）は、湧く lead ティック前から1ティックに1つずつ、群れの湧かない
+ティックに前もって作っておく。時刻の来た群れは作ってある配置を待ち行列（SpawnQueue）に積むだけにし、
+実際に敵を出すのは1ティックに budget 体までにする。大きな群れや、同じティックに重なった群れは
+数ティックかけて少しずつ現れるので、1フレームに負荷が集中しない。
+
+    waves = (Wave('green_ring', 'ring', 'green', size=30, every=1800, distance=150),
+             Wave('boss_ring', 'ring', 'red', size=60, start=3600, distance=200))
+"""
+import heapq
+import struct
+from types import MappingProxyType
+
+import numpy as np
+
+# Timeline.pack() の先頭：開始済みか, キューの件数, 登録順の通し番号, 作ってある配置の数
+TIMELINE_HEADER = struct.Struct('<?III')
+# 作ってある配置ごとの先頭：その群れの登録順の通し番号
+PREPARED_HEADER = struct.Struct('<I')
+# SpawnQueue.pack() の先頭：待っている敵の数
+QUEUE_HEADER = struct.Struct('<I')
+
+
+class Wave:
+    """
+    群れ1つの定義。shape は配置の形（Engine.plan_<shape> で配置を作る）、enemy は敵のタイプ、size は数。
+    start ティックに最初に湧き（省略時は every）、every ティックごとに繰り返す（0 なら1回だけ）。
+    size と every には数のほかに Engine の属性名も書ける（size は配置を作るとき、every は湧くときにその値を読む）。
+    同じティックに湧く群れは priority の小さい順に積む。params は配置の形ごとの設定。
+    """
+    def __init__(self, name, shape, enemy, size, every=0, start=None, priority=0, **params):
+        self.name = name
+        self.shape = shape
+        self.enemy = enemy
+        self.size = size
+        self.every = every
+        self.start = start
+        self.priority = priority
+        self.params = params
+
+    @staticmethod
+    def value(game, value):
+        return getattr(game, value) if isinstance(value, str) else value
+
+    def first_tick(self, game):
+        if self.start is not None:
+            return self.start
+        return self.value(game, self.every) or None
+
+    def plan(self, game):
+        """
+        この群れの配置 (プレイヤーからの相対位置 dx, dy, 速度 vx, vy, タイプ) の配列を返す
+        """
+        planner = getattr(game, 'plan_' + self.shape)
+        return planner(self.value(game, self.size), self.enemy, **self.params)
+
+
+class SpawnQueue:
+    """
+    湧かせる予定の敵の待ち行列（先に積んだものから出す）。
+    位置はプレイヤーからの相対位置で持ち、出すときのプレイヤーの位置に足す。
+    """
+    fields = MappingProxyType({
+        'dx': np.float64,
+        'dy': np.float64,
+        'vx': np.float64,
+        'vy': np.float64,
+        'type_id': np.int8,
+    })
+
+    def __init__(self, capacity=256):
+        for name, dtype in self.fields.items():
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+        # 待っている敵は [head, tail) の範囲
+        self.head = 0
+        self.tail = 0
+
+    def __len__(self):
+        return self.tail - self.head
+
+    def columns(self):
+        return [getattr(self, name) for name in self.fields]
+
+    def push(self, dx, dy, vx, vy, type_id):
+        """
+        配列で渡した敵を末尾に積む（type_id はスカラーでもよい）
+        """
+        k = len(dx)
+        n = len(self)
+        if self.tail + k > len(self.dx):
+            # 先頭の空きを詰め、それでも足りなければ倍々に広げる
+            capacity = len(self.dx)
+            while capacity < n + k:
+                capacity *= 2
+            for name, column in zip(self.fields, self.columns()):
+                moved = np.zeros(capacity, dtype=column.dtype)
+                moved[:n] = column[self.head:self.tail]
+                setattr(self, name, moved)
+            self.head = 0
+            self.tail = n
+        added = slice(self.tail, self.tail + k)
+        for column, values in zip(self.columns(), (dx, dy, vx, vy, type_id)):
+            column[added] = values
+        self.tail += k
+
+    def pop(self, k):
+        """
+        先頭から最大 k 件を取り出し、(dx, dy, vx, vy, type_id) の配列で返す
+        """
+        taken = slice(self.head, min(self.head + k, self.tail))
+        result = [column[taken].copy() for column in self.columns()]
+        self.head = taken.stop
+        if self.head == self.tail:
+            self.head = self.tail = 0
+        return result
+
+    def clear(self):
+        self.head = self.tail = 0
+
+    def pack(self):
+        parts = [QUEUE_HEADER.pack(len(self))]
+        parts.extend(column[self.head:self.tail].tobytes() for column in self.columns())
+        return b''.join(parts)
+
+    def unpack(self, data, offset=0):
+        """
+        pack() で作ったバイト列 data の offset から中身を読み込み、読み終えた位置を返す
+        """
+        (n,) = QUEUE_HEADER.unpack_from(data, offset)
+        offset += QUEUE_HEADER.size
+        values = []
+        for column in self.columns():
+            values.append(np.frombuffer(data, dtype=column.dtype, count=n, offset=offset))
+            offset += column.itemsize * n
+        self.clear()
+        self.push(*values)
+        return offset
+
+
+class Timeline:
+    """
+    waves（Wave の並び）の予定表。キューの要素は (湧くティック, 優先度, 登録順, waves の添字)。
+    最初の advance() で全部の群れを予定に入れる（それまでに Engine の属性を変えてもよい）。
+    湧くまで lead ティック以内の群れの配置は前もって作り、prepared（登録順 -> 配置の SpawnQueue）に置いておく。
+    lead が 0 なら湧くティックに作る。
+    """
+    def __init__(self, waves, lead=60):
+        self.waves = tuple(waves)
+        self.lead = lead
+        self.queue = SpawnQueue()
+        self.reset()
+
+    def reset(self):
+        self.heap = []
+        self.sequence = 0
+        self.started = False
+        self.prepared = {}
+        self.queue.clear()
+
+    def schedule(self, tick, index):
+        heapq.heappush(self.heap, (tick, self.waves[index].priority, self.sequence, index))
+        self.sequence += 1
+
+    def advance(self, game, now):
+        """
+        ティック now までに湧く群れの配置を作って待ち行列に積む。繰り返す群れは次の予定を入れる。
+        積んだ群れの数を返す。
+        """
+        if not self.started:
+            self.started = True
+            for index, wave in enumerate(self.waves):
+                tick = wave.first_tick(game)
+                if tick is not None:
+                    self.schedule(tick, index)
+        fired = 0
+        while self.heap and self.heap[0][0] <= now:
+            tick, _, sequence, index = heapq.heappop(self.heap)
+            wave = self.waves[index]
+            plan = self.prepared.pop(sequence, None)
+            if plan is None:
+                self.queue.push(*wave.plan(game))
+            else:
+                self.queue.push(*plan.pop(len(plan)))
+            fired += 1
+            every = wave.value(game, wave.every)
+            if every:
+                self.schedule(tick + every, index)
+        if not fired:
+            self.prepare(game, now)
+        return fired
+
+    def prepare(self, game, now):
+        """
+        湧くまで lead ティック以内で、まだ配置を作っていない群れのうち最初に湧くものの配置を1つだけ作る
+        """
+        if len(self.prepared) == len(self.heap) or self.heap[0][0] > now + self.lead:
+            return
+        for tick, _, sequence, index in sorted(self.heap):
+            if tick > now + self.lead:
+                return
+            if sequence not in self.prepared:
+                plan = self.waves[index].plan(game)
+                queue = SpawnQueue(max(len(plan[0]), 1))
+                queue.push(*plan)
+                self.prepared[sequence] = queue
+                return
+
+    def pack(self):
+        heap = np.array(self.heap, dtype=np.int64).reshape(-1, 4)
+        parts = [TIMELINE_HEADER.pack(self.started, len(heap), self.sequence, len(self.prepared)), heap.tobytes()]
+        for sequence, plan in sorted(self.prepared.items()):
+            parts.append(PREPARED_HEADER.pack(sequence))
+            parts.append(plan.pack())
+        parts.append(self.queue.pack())
+        return b''.join(parts)
+
+    def unpack(self, data, offset=0):
+        """
+        pack() で作ったバイト列 data の offset から予定と作ってある配置、待ち行列を読み込み、読み終えた位置を返す
+        """
+        self.started, length, self.sequence, prepared = TIMELINE_HEADER.unpack_from(data, offset)
+        offset += TIMELINE_HEADER.size
+        heap = np.frombuffer(data, dtype=np.int64, count=4 * length, offset=offset).reshape(-1, 4)
+        offset += heap.nbytes
+        # 要素の順番はそのまま（ヒープの条件を満たした並び）
+        self.heap = [tuple(entry) for entry in heap.tolist()]
+        self.prepared = {}
+        for _ in range(prepared):
+            (sequence,) = PREPARED_HEADER.unpack_from(data, offset)
+            plan = SpawnQueue()
+            offset = plan.unpack(data, offset + PREPARED_HEADER.size)
+            self.prepared[sequence] = plan
+        return self.queue.unpack(data, offset)